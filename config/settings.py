@@ -13,7 +13,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 import os
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,15 +49,56 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "expenses.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # Picked by the Accept header or ?format=: JSON encoded with orjson,
+    # byte-identical to rest_framework's JSONRenderer, or MessagePack
+    "DEFAULT_RENDERER_CLASSES": [
+        "expenses.renderers.ORJSONRenderer",
+        "expenses.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    # Picked by the Content-Type header
+    "DEFAULT_PARSER_CLASSES": [
+        "expenses.parsers.ORJSONParser",
+        "expenses.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
+# Seconds a user's is_active / is_staff flags are trusted without a query,
+# see expenses.authentication
+AUTH_USER_CACHE_TTL = config("AUTH_USER_CACHE_TTL", default=60, cast=int)
+
+# Serve expenses and categories with async views, for ASGI deployments
+# (config.asgi), see expenses.views.async_views
+EXPENSES_ASYNC_VIEWS = config("ASYNC_VIEWS", default=False, cast=bool)
+
+# Default page size of keyset-paginated lists, see expenses.pagination
+EXPENSES_PAGE_SIZE = config("PAGE_SIZE", default=100, cast=int)
+
+# Maximum number of expenses accepted by one batch create request
+EXPENSES_BATCH_MAX_SIZE = config("BATCH_MAX_SIZE", default=1000, cast=int)
+
+# Delta sync: rows written this many seconds before a sync are sent again by
+# the next one, and deletions are remembered for this many days
+SYNC_OVERLAP_SECONDS = config("SYNC_OVERLAP_SECONDS", default=60, cast=int)
+SYNC_TOMBSTONE_RETENTION_DAYS = config(
+    "SYNC_TOMBSTONE_RETENTION_DAYS", default=30, cast=int
+)
+
+# Send wall, database and application time of every request to clients in a
+# Server-Timing header, see expenses.middlewares.RequestMetricsMiddleware
+SERVER_TIMING = config("SERVER_TIMING", default=True, cast=bool)
+
 MIDDLEWARE = [
+    "expenses.middlewares.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "expenses.middlewares.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -99,6 +140,68 @@ DATABASES = {
         "PASSWORD": config("DB_PASSWORD"),
         "HOST": config("DB_HOST", default="localhost"),
         "PORT": config("DB_PORT", default="5432"),
+        # seconds a thread keeps its connection, 0 closes it after each request
+        "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=0, cast=int),
+        "CONN_HEALTH_CHECKS": config("DB_CONN_HEALTH_CHECKS", default=True, cast=bool),
+    }
+}
+
+# With DB_POOL every process keeps a pool of connections which requests
+# borrow for their duration, see expenses/backends/postgresql_pool. Threads
+# must not hold on to pooled connections, so CONN_MAX_AGE is ignored.
+if config("DB_POOL", default=False, cast=bool):
+    DATABASES["default"].update(
+        {
+            "ENGINE": "expenses.backends.postgresql_pool",
+            "CONN_MAX_AGE": 0,
+            "POOL": {
+                "MIN_SIZE": config("DB_POOL_MIN_SIZE", default=0, cast=int),
+                "MAX_SIZE": config("DB_POOL_MAX_SIZE", default=10, cast=int),
+                "TIMEOUT": config("DB_POOL_TIMEOUT", default=5.0, cast=float),
+                "MAX_IDLE": config("DB_POOL_MAX_IDLE", default=300.0, cast=float),
+            },
+        }
+    )
+
+# Read replicas as comma separated host[:port][/name] entries, the port and
+# database name default to the primary's. Reads are routed to them by
+# expenses.routers.PrimaryReplicaRouter, tests use the primary only.
+REPLICA_DATABASES = []
+for index, replica in enumerate(config("DB_REPLICAS", default="", cast=Csv())):
+    address, _, name = replica.partition("/")
+    host, _, port = address.partition(":")
+    alias = f"replica_{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "NAME": name or DATABASES["default"]["NAME"],
+        "TEST": {"MIRROR": "default"},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ["expenses.routers.PrimaryReplicaRouter"]
+
+# Seconds a user's reads stay on the primary after they write, should
+# exceed the replication lag
+DB_REPLICA_STICKY_SECONDS = config("DB_REPLICA_STICKY_SECONDS", default=10, cast=int)
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+# LocMem is per process, use a shared backend (e.g. Redis) when running
+# several workers so invalidations are seen by all of them
+
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default="expenses"),
+        "TIMEOUT": config("CACHE_TTL", default=300, cast=int),
+        "OPTIONS": {
+            "MAX_ENTRIES": config("CACHE_MAX_ENTRIES", default=10000, cast=int),
+        },
     }
 }
 
@@ -18,9 +18,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
 
+from expenses.views import metrics
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("expenses.urls")),
+    path("metrics", metrics),
     path("", RedirectView.as_view(url="/api/", permanent=False)),
 ]
@@ -1,11 +1,14 @@
 from django.contrib import admin
-from .models import Expense, Category
+from .models import Expense, ExpenseCategory, Category
+from .services.SearchService import search_descriptions
 
 # Register your models here.
 
 
 class CategoryInline(admin.TabularInline):
     model = Expense.categories.through
+    # spent_at is copied from the expense on save
+    fields = ["category"]
     extra = 1
     verbose_name = "Категория"
     verbose_name_plural = "Категории"
@@ -25,6 +28,16 @@ class ExpenseAdmin(admin.ModelAdmin):
     exclude = ("categories",)
     inlines = [CategoryInline]
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and "spent_at" in form.changed_data:
+            ExpenseCategory.objects.filter(expense=obj).update(spent_at=obj.spent_at)
+
+    def get_search_results(self, request, queryset, search_term):
+        # the GIN-indexed full-text search of the expenses list instead of
+        # an ILIKE '%term%' scan of every description
+        return search_descriptions(queryset, search_term), False
+
 
 admin.site.register(Expense, ExpenseAdmin)
 admin.site.register(Category, CategoryAdmin)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class ExpensesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "expenses"
+
+    def ready(self):
+        # connects signal handlers which drop cached user flags
+        from . import authentication  # noqa: F401
+
+        # connects the query timer to new database connections
+        from . import middlewares  # noqa: F401
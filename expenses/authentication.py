@@ -0,0 +1,115 @@
+""" All authentication backends are defined here """
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from expenses.routers import set_request_user
+
+
+User = get_user_model()
+
+
+def _flags_key(user_id) -> str:
+    return f"auth:user:{user_id}"
+
+
+class CachedTokenUser(TokenUser):
+    """
+    User built from validated token claims, without a `User` row
+
+    Only id, username and the cached is_active / is_staff / is_superuser
+    flags are available. Services use `user.pk` for `creator_id` filters.
+    """
+
+    def __init__(self, token, flags: dict):
+        super().__init__(token)
+        self.is_active = flags["is_active"]
+        self.is_staff = flags["is_staff"]
+        self.is_superuser = flags["is_superuser"]
+
+
+class CachedJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication which does not load the `User` row on every request
+
+    The user is built from token claims. Whether the user still exists and
+    is active is checked against a cache entry which lives for
+    AUTH_USER_CACHE_TTL seconds and is dropped whenever the user is saved
+    or deleted, so revocation takes effect within that TTL at worst.
+    """
+
+    def get_user(self, validated_token) -> CachedTokenUser:
+        user = super().get_user(validated_token)
+        return self._with_flags(user, self.get_user_flags(user.id))
+
+    async def aauthenticate(self, request) -> tuple[CachedTokenUser, any] | None:
+        """
+        Async version of authenticate for views running outside of DRF,
+        the cache and the database are only touched through async APIs
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token) -> CachedTokenUser:
+        user = super().get_user(validated_token)
+        return self._with_flags(user, await self.aget_user_flags(user.id))
+
+    @staticmethod
+    def _with_flags(user: TokenUser, flags: dict | None) -> CachedTokenUser:
+        if flags is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not flags["is_active"]:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        set_request_user(user.id)
+        return CachedTokenUser(user.token, flags)
+
+    @staticmethod
+    def get_user_flags(user_id) -> dict | None:
+        key = _flags_key(user_id)
+        flags = cache.get(key)
+        if flags is None:
+            flags = (
+                User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+                .values("is_active", "is_staff", "is_superuser")
+                .first()
+            )
+            # missing users are cached too, as an empty dict
+            cache.set(key, flags or {}, timeout=settings.AUTH_USER_CACHE_TTL)
+
+        return flags or None
+
+    @staticmethod
+    async def aget_user_flags(user_id) -> dict | None:
+        key = _flags_key(user_id)
+        flags = await cache.aget(key)
+        if flags is None:
+            flags = await (
+                User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+                .values("is_active", "is_staff", "is_superuser")
+                .afirst()
+            )
+            await cache.aset(key, flags or {}, timeout=settings.AUTH_USER_CACHE_TTL)
+
+        return flags or None
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user_flags(sender, instance, **kwargs) -> None:
+    cache.delete(_flags_key(getattr(instance, api_settings.USER_ID_FIELD)))
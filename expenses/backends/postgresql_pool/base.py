@@ -0,0 +1,108 @@
+"""PostgreSQL backend taking its connections from a per-process pool"""
+
+import os
+import threading
+
+from django.db.backends.postgresql import base
+
+from .creation import DatabaseCreation
+from .pool import ConnectionPool
+
+_lock = threading.Lock()
+# alias -> (connection parameters, pool) of the current process
+_pools: dict[str, tuple[dict, ConnectionPool]] = {}
+# pools inherited from the parent process, never used or closed because
+# their connections share sockets with the parent
+_inherited: list[ConnectionPool] = []
+
+
+def get_pool_stats() -> dict[str, dict]:
+    """
+    Get the state and counters of the pools of the serving process
+
+    Returns:
+        dict: {"<alias>": ConnectionPool.stats()}
+    """
+    with _lock:
+        pools = [
+            (alias, pool)
+            for alias, (_, pool) in _pools.items()
+            if pool.pid == os.getpid()
+        ]
+    return {alias: pool.stats() for alias, pool in pools}
+
+
+def close_pools() -> None:
+    """
+    Close the idle connections of all pools of the process
+    """
+    with _lock:
+        pools = [pool for _, pool in _pools.values()]
+        _pools.clear()
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close()
+        else:
+            _inherited.append(pool)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend whose connections are borrowed from a
+    ConnectionPool when django opens them and returned when it closes
+    them, so with CONN_MAX_AGE = 0 every request borrows a connection for
+    its duration only
+
+    Pool options are read from the POOL dict of the database settings:
+    MIN_SIZE, MAX_SIZE, TIMEOUT and MAX_IDLE, see ConnectionPool.
+    Reused connections are pinged first when CONN_HEALTH_CHECKS is set.
+    """
+
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        self.connection_pool = self.get_pool(conn_params)
+        connection = self.connection_pool.acquire()
+
+        # set by the parent for new connections only
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def get_pool(self, conn_params: dict) -> ConnectionPool:
+        """
+        Get the pool of this alias, creating it on first use, after a fork
+        and when the connection parameters change, e.g. for the test
+        database
+        """
+        with _lock:
+            params, pool = _pools.get(self.alias, (None, None))
+            if pool is not None and pool.pid == os.getpid() and params == conn_params:
+                return pool
+
+            if pool is not None:
+                if pool.pid == os.getpid():
+                    pool.close()
+                else:
+                    _inherited.append(pool)
+
+            options = self.settings_dict.get("POOL", {})
+            pool = ConnectionPool(
+                lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                min_size=options.get("MIN_SIZE", 0),
+                max_size=options.get("MAX_SIZE", 10),
+                timeout=options.get("TIMEOUT", 5.0),
+                max_idle=options.get("MAX_IDLE", 300.0),
+                check=self.settings_dict["CONN_HEALTH_CHECKS"],
+            )
+            _pools[self.alias] = (dict(conn_params), pool)
+            pool.fill()
+        return pool
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.connection_pool.release(
+                    self.connection, discard=self.errors_occurred
+                )
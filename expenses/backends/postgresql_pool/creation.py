@@ -0,0 +1,10 @@
+from django.db.backends.postgresql import creation
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # idle pooled connections to the test database would block DROP DATABASE
+        from .base import close_pools
+
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
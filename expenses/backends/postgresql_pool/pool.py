@@ -0,0 +1,229 @@
+"""Thread-safe pool of psycopg2 connections"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, connection as Connection
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """No connection became available within the pool timeout"""
+
+
+class ConnectionPool:
+    """
+    Pool of open connections shared by all threads of a process
+
+    Connections are handed out last in, first out, so a lightly loaded
+    process keeps reusing the same few connections and the rest reach
+    max_idle and are closed. Callers block for up to `timeout` seconds
+    when all max_size connections are in use.
+
+    Args:
+        connect: callable - opens a new connection
+        min_size: int - connections kept open while idle
+        max_size: int - maximum number of open connections
+        timeout: float - seconds to wait for a free connection
+        max_idle: float - seconds after which idle connections above
+            min_size are closed
+        check: bool - ping reused connections before handing them out
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Connection],
+        min_size: int = 0,
+        max_size: int = 10,
+        timeout: float = 5.0,
+        max_idle: float = 300.0,
+        check: bool = True,
+    ):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check = check
+        self.pid = os.getpid()
+
+        self._lock = threading.Condition()
+        self._idle: deque[tuple[Connection, float]] = deque()
+        self._size = 0
+        self._waiting = 0
+        self._counters = {
+            "acquired": 0,
+            "created": 0,
+            "closed": 0,
+            "timeouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+        }
+
+    def fill(self) -> None:
+        """
+        Open connections until min_size are open
+        """
+        while True:
+            with self._lock:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            self.release(self._open())
+
+    def acquire(self) -> Connection:
+        """
+        Take an idle connection or open a new one
+
+        Raises:
+            PoolTimeout: If no connection is free within the timeout
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            connection = self._take(deadline)
+            if connection is None:
+                return self._open()
+            if self._usable(connection):
+                return connection
+            self._discard(connection)
+
+    def release(self, connection: Connection, discard: bool = False) -> None:
+        """
+        Return a connection to the pool, rolling back any open transaction
+
+        Args:
+            connection: Connection - connection taken from this pool
+            discard: bool - close the connection instead of reusing it
+        """
+        if not discard and not connection.closed:
+            try:
+                if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+                # idle connections are kept in autocommit mode, so the
+                # health check doesn't open a transaction
+                connection.autocommit = True
+            except psycopg2.Error:
+                discard = True
+
+        if discard or connection.closed:
+            self._discard(connection)
+            return
+
+        expired = []
+        with self._lock:
+            self._idle.append((connection, time.monotonic()))
+            # the oldest idle connections are on the left
+            limit = time.monotonic() - self.max_idle
+            while (
+                self._idle and self._size > self.min_size and self._idle[0][1] <= limit
+            ):
+                expired.append(self._idle.popleft()[0])
+                self._size -= 1
+                self._counters["closed"] += 1
+            self._lock.notify()
+
+        for connection in expired:
+            connection.close()
+
+    def close(self) -> None:
+        """
+        Close all idle connections, connections in use are closed when
+        they are released
+        """
+        with self._lock:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._counters["closed"] += len(idle)
+            self.min_size = 0
+            self.max_idle = 0
+        for connection in idle:
+            connection.close()
+
+    def stats(self) -> dict[str, int | float]:
+        """
+        Get the pool state and counters since the pool was created
+
+        Returns:
+            dict: size, idle, in_use, waiting, max_size and acquired,
+                created, closed, timeouts, waits, wait_seconds counters
+        """
+        with self._lock:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                "max_size": self.max_size,
+                **self._counters,
+            }
+
+    def _take(self, deadline: float) -> Connection | None:
+        """
+        Pop an idle connection, or reserve a slot for a new one and return
+        None, waiting until the deadline while the pool is full
+        """
+        with self._lock:
+            self._counters["acquired"] += 1
+            started = None
+            try:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"No database connection available within {self.timeout}s"
+                        )
+                    if started is None:
+                        started = time.monotonic()
+                        self._counters["waits"] += 1
+                    self._waiting += 1
+                    self._lock.wait(remaining)
+                    self._waiting -= 1
+            finally:
+                if started is not None:
+                    self._counters["wait_seconds"] += time.monotonic() - started
+
+            if self._idle:
+                return self._idle.pop()[0]
+            self._size += 1
+            return None
+
+    def _open(self) -> Connection:
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            self._counters["created"] += 1
+        return connection
+
+    def _usable(self, connection: Connection) -> bool:
+        if connection.closed:
+            return False
+        if not self.check:
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _discard(self, connection: Connection) -> None:
+        with self._lock:
+            self._size -= 1
+            self._counters["closed"] += 1
+            self._lock.notify()
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
@@ -0,0 +1,530 @@
+"""Load test every API route with concurrent clients"""
+
+import datetime
+import json
+import random
+import statistics
+import threading
+import time
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from decimal import Decimal
+from io import StringIO
+from urllib.parse import urlencode
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import Client
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.utils import timezone
+
+from expenses.models import Category, Expense
+
+User = get_user_model()
+
+PASSWORD = "benchmark"
+# expenses written by the benchmark are dated from here on, one day per
+# client and request, so bulk delete removes exactly what batch and import
+# created
+WRITES_START = datetime.datetime(2100, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+@dataclass
+class Session:
+    """
+    One benchmark client, a logged in user with their seeded data
+    """
+
+    index: int
+    client: Client
+    user: User
+    password: str
+    refresh: str
+    expense_ids: list[str]
+    category_ids: list[str]
+    etag: str
+    next_page: str
+    today: str
+    last_quarter: str
+    rng: random.Random
+    created_expenses: list[str] = field(default_factory=list)
+    created_categories: list[str] = field(default_factory=list)
+
+    def get(self, path: str, **headers) -> HttpResponse:
+        return self.client.get(path, **headers)
+
+    def send(self, method: str, path: str, data: any) -> HttpResponse:
+        return getattr(self.client, method)(
+            path, json.dumps(data), content_type="application/json"
+        )
+
+    def write_day(self, index: int) -> datetime.datetime:
+        return WRITES_START + datetime.timedelta(days=self.index * 100_000 + index)
+
+    def expense_data(self) -> dict:
+        return {
+            "value": str(Decimal(self.rng.randint(100, 100_000)) / 100),
+            "spent_at": timezone.now().isoformat(),
+            "description": "benchmark",
+            "categories": self.rng.sample(self.category_ids, 1),
+        }
+
+
+def _created(response: HttpResponse, ids: list) -> HttpResponse:
+    if response.status_code == 201:
+        ids.append(response.json()["id"])
+    return response
+
+
+def _batch(session: Session, i: int) -> HttpResponse:
+    day = session.write_day(i).isoformat()
+    items = [{**session.expense_data(), "spent_at": day} for _ in range(10)]
+    return session.send("post", "/api/expenses/batch/", items)
+
+
+def _import(session: Session, i: int) -> HttpResponse:
+    day = session.write_day(i).isoformat()
+    rows = "".join(f"{n + 1}.50,{day},imported\n" for n in range(10))
+    upload = SimpleUploadedFile(
+        "expenses.csv", f"value,spent_at,description\n{rows}".encode()
+    )
+    return session.client.post("/api/expenses/import/", {"file": upload})
+
+
+def _bulk_delete(session: Session, i: int) -> HttpResponse:
+    day = session.write_day(i)
+    query = urlencode(
+        {
+            "start_date": day.isoformat(),
+            "end_date": (day + datetime.timedelta(hours=1)).isoformat(),
+        }
+    )
+    return session.client.delete(f"/api/expenses/bulk/?{query}")
+
+
+def _bulk_update(session: Session, i: int) -> HttpResponse:
+    category = session.rng.choice(session.category_ids)
+    return session.send(
+        "patch",
+        f"/api/expenses/bulk/?categories={category}&min_value=990",
+        {"description": f"bulk {i}"},
+    )
+
+
+def _stream(response: HttpResponse) -> HttpResponse:
+    # the export is only done once its last row is rendered
+    b"".join(response.streaming_content)
+    return response
+
+
+# name -> (request, expected status code), run in this order so writes
+# clean up after themselves and the dataset stays the same between runs
+ENDPOINTS = {
+    "GET /": (lambda s, i: s.get("/api/"), 200),
+    "GET /hello_ping/": (lambda s, i: s.get("/api/hello_ping/"), 200),
+    "GET /metrics": (lambda s, i: s.get("/metrics"), 200),
+    "POST /token/": (
+        lambda s, i: s.send(
+            "post",
+            "/api/token/",
+            {"username": s.user.username, "password": s.password},
+        ),
+        200,
+    ),
+    "POST /token/refresh/": (
+        lambda s, i: s.send("post", "/api/token/refresh/", {"refresh": s.refresh}),
+        200,
+    ),
+    "GET /expenses/": (lambda s, i: s.get("/api/expenses/"), 200),
+    "GET /expenses/ (next page)": (lambda s, i: s.get(s.next_page), 200),
+    "GET /expenses/ (date range)": (
+        lambda s, i: s.get(
+            f"/api/expenses/?start_date={s.last_quarter}&end_date={s.today}"
+        ),
+        200,
+    ),
+    "GET /expenses/ (value range)": (
+        lambda s, i: s.get("/api/expenses/?min_value=100&max_value=200"),
+        200,
+    ),
+    "GET /expenses/ (category)": (
+        lambda s, i: s.get(f"/api/expenses/?categories={s.rng.choice(s.category_ids)}"),
+        200,
+    ),
+    "GET /expenses/<id>/": (
+        lambda s, i: s.get(f"/api/expenses/{s.rng.choice(s.expense_ids)}/"),
+        200,
+    ),
+    "GET /expenses/ (not modified)": (
+        lambda s, i: s.get("/api/expenses/", HTTP_IF_NONE_MATCH=s.etag),
+        304,
+    ),
+    "GET /expenses/summary/": (lambda s, i: s.get("/api/expenses/summary/"), 200),
+    "GET /expenses/export/": (
+        lambda s, i: _stream(s.get("/api/expenses/export/?file_format=ndjson")),
+        200,
+    ),
+    "GET /sync/": (lambda s, i: s.get("/api/sync/"), 200),
+    "GET /categories/": (lambda s, i: s.get("/api/categories/"), 200),
+    "GET /categories/<id>/": (
+        lambda s, i: s.get(f"/api/categories/{s.rng.choice(s.category_ids)}/"),
+        200,
+    ),
+    "POST /expenses/": (
+        lambda s, i: _created(
+            s.send("post", "/api/expenses/", s.expense_data()), s.created_expenses
+        ),
+        201,
+    ),
+    "PUT /expenses/<id>/": (
+        lambda s, i: s.send(
+            "put",
+            f"/api/expenses/{s.created_expenses[i % len(s.created_expenses)]}/",
+            s.expense_data(),
+        ),
+        200,
+    ),
+    "DELETE /expenses/<id>/": (
+        lambda s, i: s.client.delete(f"/api/expenses/{s.created_expenses.pop()}/"),
+        204,
+    ),
+    "POST /categories/": (
+        lambda s, i: _created(
+            s.send("post", "/api/categories/", {"name": f"benchmark {i}"}),
+            s.created_categories,
+        ),
+        201,
+    ),
+    "PUT /categories/<id>/": (
+        lambda s, i: s.send(
+            "put",
+            f"/api/categories/{s.created_categories[i % len(s.created_categories)]}/",
+            {"name": f"renamed {i}"},
+        ),
+        200,
+    ),
+    "DELETE /categories/<id>/": (
+        lambda s, i: s.client.delete(f"/api/categories/{s.created_categories.pop()}/"),
+        204,
+    ),
+    "POST /expenses/batch/": (_batch, 201),
+    "POST /expenses/import/": (_import, 201),
+    "DELETE /expenses/bulk/": (_bulk_delete, 200),
+    "PATCH /expenses/bulk/": (_bulk_update, 200),
+}
+
+
+def percentile(values: list[float], percent: int) -> float:
+    """
+    Percentile of values with linear interpolation, like numpy's default
+    """
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a test database, call every API route with concurrent clients "
+        "and report latency percentiles, throughput and SQL queries per "
+        "route, optionally compared with a baseline from an earlier run"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--expenses-per-user", type=int, default=1000)
+        parser.add_argument("--categories-per-user", type=int, default=10)
+        parser.add_argument("--clients", type=int, default=4)
+        parser.add_argument(
+            "--requests", type=int, default=50, help="requests per client and route"
+        )
+        parser.add_argument(
+            "--warmup", type=int, default=2, help="unmeasured requests per client"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            help="only run routes whose name contains this, can be repeated",
+        )
+        parser.add_argument("--output", help="write results as JSON to this file")
+        parser.add_argument("--baseline", help="JSON results to compare with")
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            help="fail if any route's p95 is this many percent above the baseline",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="keep the test database and its seeded data between runs",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The benchmark runs against PostgreSQL only")
+        if options["clients"] > options["users"]:
+            raise CommandError("Every client needs its own user, raise --users")
+
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+
+        endpoints = {
+            name: endpoint
+            for name, endpoint in ENDPOINTS.items()
+            if not options["endpoint"]
+            or any(part in name for part in options["endpoint"])
+        }
+
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0, interactive=False, keepdb=options["keepdb"]
+        )
+        try:
+            self.seed(options)
+            results = self.run(endpoints, options)
+        finally:
+            connections.close_all()
+            teardown_databases(old_config, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        self.report(results, baseline)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(results, file, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline and options["max_regression"] is not None:
+            regressions = [
+                name
+                for name, change in self.compare(results, baseline).items()
+                if change["p95_ms"] > options["max_regression"]
+            ]
+            if regressions:
+                raise CommandError(f"p95 regressed for: {', '.join(regressions)}")
+
+    def seed(self, options: dict) -> None:
+        """
+        Create benchmark users with categories and expenses, unless a kept
+        test database already has them
+        """
+        if User.objects.filter(username__startswith="benchmark_").exists():
+            self.stdout.write("Reusing seeded data")
+            return
+
+        call_command(
+            "seed_data",
+            users=options["users"],
+            expenses_per_user=options["expenses_per_user"],
+            categories_per_user=options["categories_per_user"],
+            seed=options["seed"],
+            username_prefix="benchmark_",
+            password=PASSWORD,
+            stdout=StringIO(),
+        )
+
+    def login(self, index: int, user: User, seed: int) -> Session:
+        client = Client(raise_request_exception=False)
+        tokens = json.loads(
+            client.post(
+                "/api/token/",
+                {"username": user.username, "password": PASSWORD},
+                content_type="application/json",
+            ).content
+        )
+        client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {tokens['access']}"
+
+        page = client.get("/api/expenses/")
+        today = timezone.now().date()
+        return Session(
+            index=index,
+            client=client,
+            user=user,
+            password=PASSWORD,
+            refresh=tokens["refresh"],
+            expense_ids=[
+                str(pk)
+                for pk in Expense.objects.filter(creator=user).values_list(
+                    "id", flat=True
+                )
+            ],
+            category_ids=[
+                str(pk)
+                for pk in Category.objects.filter(creator=user).values_list(
+                    "id", flat=True
+                )
+            ],
+            etag=page["ETag"],
+            next_page=page.json()["next"] or "/api/expenses/",
+            rng=random.Random(seed * 1000 + index),
+            today=f"{today}T00:00:00Z",
+            last_quarter=f"{today - datetime.timedelta(days=91)}T00:00:00Z",
+        )
+
+    def run(self, endpoints: dict, options: dict) -> dict:
+        users = User.objects.filter(username__startswith="benchmark_").order_by("id")
+        sessions = [
+            self.login(index, user, options["seed"])
+            for index, user in enumerate(users[: options["clients"]])
+        ]
+        connections.close_all()
+
+        results = {
+            "meta": {
+                "started_at": timezone.now().isoformat(),
+                "django": django.get_version(),
+                "async_views": settings.EXPENSES_ASYNC_VIEWS,
+                "database": connection.settings_dict["NAME"],
+                **{
+                    key: options[key]
+                    for key in (
+                        "users",
+                        "expenses_per_user",
+                        "categories_per_user",
+                        "clients",
+                        "requests",
+                        "warmup",
+                        "seed",
+                    )
+                },
+            },
+            "endpoints": {},
+        }
+        for name, (request, expected) in endpoints.items():
+            results["endpoints"][name] = self.run_endpoint(
+                sessions, request, expected, options
+            )
+            self.stdout.write(f"{name} done")
+        return results
+
+    def run_endpoint(
+        self, sessions: list[Session], request, expected: int, options: dict
+    ) -> dict:
+        """
+        Send the request from every client at once, each client in its own
+        thread with its own database connections
+        """
+        warmup, count = options["warmup"], options["requests"]
+        latencies = []
+        queries = []
+        errors = []
+        lock = threading.Lock()
+        start = threading.Barrier(len(sessions) + 1)
+
+        def client(session: Session):
+            statements = [0]
+
+            def count_queries(execute, sql, params, many, context):
+                statements[0] += 1
+                return execute(sql, params, many, context)
+
+            own_latencies, own_queries, own_errors = [], [], []
+            try:
+                with ExitStack() as stack:
+                    for db in connections.all():
+                        stack.enter_context(db.execute_wrapper(count_queries))
+                    try:
+                        for i in range(warmup):
+                            request(session, i)
+                    finally:
+                        # releases the other clients if this one failed
+                        start.wait()
+
+                    for i in range(warmup, warmup + count):
+                        statements[0] = 0
+                        started = time.perf_counter()
+                        response = request(session, i)
+                        own_latencies.append((time.perf_counter() - started) * 1000)
+                        own_queries.append(statements[0])
+                        if response.status_code != expected:
+                            own_errors.append(response.status_code)
+            finally:
+                connections.close_all()
+                with lock:
+                    latencies.extend(own_latencies)
+                    queries.extend(own_queries)
+                    errors.extend(own_errors)
+
+        threads = [threading.Thread(target=client, args=(s,)) for s in sessions]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if not latencies:
+            raise CommandError("A benchmark client failed, see the traceback above")
+        return {
+            "requests": len(latencies),
+            "errors": len(errors),
+            "error_statuses": sorted(set(errors)),
+            "throughput_rps": round(len(latencies) / elapsed, 1),
+            "mean_ms": round(statistics.mean(latencies), 3),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "queries_per_request": round(statistics.mean(queries), 2),
+        }
+
+    @staticmethod
+    def compare(results: dict, baseline: dict) -> dict[str, dict[str, float]]:
+        """
+        Percent change of every metric for routes present in both runs
+        """
+        changes = {}
+        for name, current in results["endpoints"].items():
+            previous = baseline["endpoints"].get(name)
+            if previous is None:
+                continue
+            changes[name] = {
+                key: (
+                    (current[key] - previous[key]) / previous[key] * 100
+                    if previous[key]
+                    else 0.0
+                )
+                for key in (
+                    "p50_ms",
+                    "p95_ms",
+                    "p99_ms",
+                    "throughput_rps",
+                    "queries_per_request",
+                )
+            }
+        return changes
+
+    def report(self, results: dict, baseline: dict | None) -> None:
+        changes = self.compare(results, baseline) if baseline else {}
+        self.stdout.write(
+            f"{'route':<32}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'queries':>9}{'errors':>8}"
+            + (f"{'Δp50':>8}{'Δp95':>8}{'Δqueries':>10}" if baseline else "")
+        )
+        for name, result in results["endpoints"].items():
+            line = (
+                f"{name:<32}{result['throughput_rps']:>9.1f}"
+                f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                f"{result['p99_ms']:>9.2f}{result['queries_per_request']:>9.1f}"
+                f"{result['errors']:>8}"
+            )
+            if name in changes:
+                change = changes[name]
+                line += (
+                    f"{change['p50_ms']:>+7.0f}%{change['p95_ms']:>+7.0f}%"
+                    f"{change['queries_per_request']:>+9.0f}%"
+                )
+            self.stdout.write(line)
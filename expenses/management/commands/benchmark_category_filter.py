@@ -0,0 +1,90 @@
+"""Compare the join + DISTINCT and the EXISTS category filters"""
+
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from expenses.models import Expense
+from expenses.services import get_expense_rows_with_filters
+from expenses.services.ExpensesService import EXPENSE_LIST_FIELDS
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the first list page and the count of the given user's expenses "
+        "filtered by their most used categories, with the former join + "
+        "DISTINCT filter and with the EXISTS filters of both match modes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="user whose expenses are filtered")
+        parser.add_argument(
+            "--categories",
+            type=int,
+            default=3,
+            help="number of categories to filter by",
+        )
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--page-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} not found")
+
+        category_ids = [
+            str(row["category_id"])
+            for row in Expense.categories.through.objects.filter(expense__creator=user)
+            .values("category_id")
+            .annotate(expenses=Count("expense_id"))
+            .order_by("-expenses")[: options["categories"]]
+        ]
+        if not category_ids:
+            raise CommandError(f"User {user.username} has no categorized expenses")
+
+        ordering = ("-spent_at", "-id")
+        page_size = options["page_size"]
+        join = Expense.objects.filter(
+            creator_id=user.pk, categories__id__in=category_ids
+        ).distinct()
+        querysets = {
+            "join + distinct": join.values(*EXPENSE_LIST_FIELDS),
+            "exists, any": get_expense_rows_with_filters(
+                user, {"categories": category_ids}
+            ),
+            "exists, all": get_expense_rows_with_filters(
+                user, {"categories": category_ids, "categories_match": "all"}
+            ),
+        }
+
+        expected = list(querysets["join + distinct"].order_by(*ordering)[:page_size])
+        if list(querysets["exists, any"].order_by(*ordering)[:page_size]) != expected:
+            raise CommandError("The EXISTS filter returns another page than the join")
+
+        self.stdout.write(
+            f"{user.username}: {Expense.objects.filter(creator=user).count()} "
+            f"expenses, filtered by {len(category_ids)} categories, mean ms over "
+            f"{options['iterations']} runs"
+        )
+        self.stdout.write(
+            f"{'filter':<18}{'matches':>9}{'page ms':>10}{'count ms':>10}"
+        )
+        for name, queryset in querysets.items():
+            page, count = [], []
+            for _ in range(options["iterations"]):
+                started = time.perf_counter()
+                list(queryset.order_by(*ordering)[:page_size])
+                fetched = time.perf_counter()
+                matches = queryset.count()
+                count.append(time.perf_counter() - fetched)
+                page.append(fetched - started)
+            self.stdout.write(
+                f"{name:<18}{matches:>9}{statistics.mean(page) * 1000:>10.2f}"
+                f"{statistics.mean(count) * 1000:>10.2f}"
+            )
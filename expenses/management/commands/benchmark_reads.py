@@ -0,0 +1,127 @@
+"""Count database round trips of the read service functions"""
+
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from expenses.models import Expense
+from expenses.services import (
+    get_categories,
+    get_category_by_id,
+    get_changes_since,
+    get_expense_by_id,
+    get_expenses_summary,
+    get_expenses_with_filters,
+)
+from expenses.services.CacheService import bump_user_version
+from expenses.services.CategoriesService import CACHE_NAMESPACE
+
+User = get_user_model()
+
+
+class RoundTripCounter:
+    """
+    Execute wrapper counting statements and the transactions they ran in
+
+    Every transaction costs two more round trips, BEGIN and COMMIT. On
+    PostgreSQL they are not sent through execute wrappers, SQLite's
+    explicit BEGIN is counted with its transaction instead of as a
+    statement. Services open at most one transaction per call.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.transactions = 0
+        self.in_transaction = False
+
+    def __call__(self, execute, sql, params, many, context):
+        begin = sql == "BEGIN"
+        if begin or context["connection"].in_atomic_block:
+            if not self.in_transaction:
+                self.transactions += 1
+                self.in_transaction = True
+        else:
+            self.in_transaction = False
+
+        if not begin:
+            self.statements += 1
+        return execute(sql, params, many, context)
+
+    def start_call(self) -> None:
+        self.in_transaction = False
+
+    @property
+    def round_trips(self) -> int:
+        return self.statements + 2 * self.transactions
+
+
+class Command(BaseCommand):
+    help = (
+        "Call every read service function for the given user and report "
+        "statements, transactions and round trips per call"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="user whose data is read")
+        parser.add_argument("--iterations", type=int, default=100)
+        parser.add_argument("--page-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} not found")
+
+        expense = Expense.objects.filter(creator=user).first()
+        if expense is None:
+            raise CommandError(f"User {user.username} has no expenses")
+        category = expense.categories.first() or user.category_set.first()
+
+        page_size = options["page_size"]
+        paths = {
+            "list": lambda: list(
+                get_expenses_with_filters(user).order_by("-spent_at", "-id")[:page_size]
+            ),
+            "detail": lambda: get_expense_by_id(user, expense.id),
+            "summary": lambda: list(get_expenses_summary(user)),
+            "categories (cached)": lambda: get_categories(user),
+            "categories (cold)": lambda: (
+                bump_user_version(CACHE_NAMESPACE, user.pk),
+                get_categories(user),
+            ),
+            "sync": lambda: get_changes_since(user),
+        }
+        if category is not None:
+            paths["category detail (cached)"] = lambda: get_category_by_id(
+                user, category.id
+            )
+
+        self.stdout.write(
+            f"{'path':<28}{'statements':>12}{'transactions':>14}"
+            f"{'round trips':>13}{'mean ms':>10}"
+        )
+        for name, call in paths.items():
+            call()  # warm up caches and the connection
+            counter = RoundTripCounter()
+            timings = []
+            with ExitStack() as stack:
+                # reads may be routed to replicas
+                for db in connections.all():
+                    stack.enter_context(db.execute_wrapper(counter))
+                for _ in range(options["iterations"]):
+                    counter.start_call()
+                    started = time.perf_counter()
+                    call()
+                    timings.append((time.perf_counter() - started) * 1000)
+
+            iterations = options["iterations"]
+            self.stdout.write(
+                f"{name:<28}{counter.statements / iterations:>12.1f}"
+                f"{counter.transactions / iterations:>14.1f}"
+                f"{counter.round_trips / iterations:>13.1f}"
+                f"{statistics.mean(timings):>10.2f}"
+            )
@@ -0,0 +1,147 @@
+"""Compare the model serializer and the values() fast path of list pages
+and the wire formats they can be rendered in"""
+
+import io
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from expenses.parsers import MessagePackParser, ORJSONParser
+from expenses.renderers import MessagePackRenderer, ORJSONRenderer
+from expenses.serializers import ExpensesReadSerializer, expenses_list_data
+from expenses.services import (
+    get_categories_by_expense,
+    get_expense_rows_with_filters,
+    get_expenses_with_filters,
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Build a list page of the given user with ExpensesReadSerializer and "
+        "JSONRenderer and with values() rows, expenses_list_data and "
+        "ORJSONRenderer, check both give the same bytes and report the time "
+        "of each step, then compare size, encode and decode time of the page "
+        "in every response format"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="user whose expenses are listed")
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--page-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} not found")
+
+        page_size = options["page_size"]
+
+        def model_path():
+            expenses = list(
+                get_expenses_with_filters(user).order_by("-spent_at", "-id")[:page_size]
+            )
+            fetched = time.perf_counter()
+            data = ExpensesReadSerializer(expenses, many=True).data
+            serialized = time.perf_counter()
+            return fetched, serialized, JSONRenderer().render(data)
+
+        def fast_path():
+            rows = list(
+                get_expense_rows_with_filters(user).order_by("-spent_at", "-id")[
+                    :page_size
+                ]
+            )
+            categories = get_categories_by_expense(
+                [row["id"] for row in rows], [row["spent_at"] for row in rows]
+            )
+            fetched = time.perf_counter()
+            data = expenses_list_data(rows, categories)
+            serialized = time.perf_counter()
+            return fetched, serialized, ORJSONRenderer().render(data)
+
+        expected, content = model_path()[2], fast_path()[2]
+        if content != expected:
+            raise CommandError("The fast path does not render the same bytes")
+
+        self.stdout.write(
+            f"{page_size} expenses per page, mean ms over "
+            f"{options['iterations']} pages"
+        )
+        self.stdout.write(
+            f"{'path':<16}{'query':>9}{'serialize':>11}{'render':>9}"
+            f"{'serialize+render':>18}{'total':>9}"
+        )
+        results = {}
+        for name, call in (("model", model_path), ("fast", fast_path)):
+            timings = []
+            for _ in range(options["iterations"]):
+                started = time.perf_counter()
+                fetched, serialized, _ = call()
+                rendered = time.perf_counter()
+                timings.append(
+                    (fetched - started, serialized - fetched, rendered - serialized)
+                )
+            query, serialize, render = (
+                statistics.mean(column) * 1000 for column in zip(*timings)
+            )
+            results[name] = (query, serialize + render, query + serialize + render)
+            self.stdout.write(
+                f"{name:<16}{query:>9.2f}{serialize:>11.2f}{render:>9.2f}"
+                f"{serialize + render:>18.2f}{query + serialize + render:>9.2f}"
+            )
+
+        model, fast = results["model"], results["fast"]
+        self.stdout.write(
+            f"speedup: serialize+render {model[1] / fast[1]:.1f}x, "
+            f"total {model[2] / fast[2]:.1f}x"
+        )
+
+        rows = list(
+            get_expense_rows_with_filters(user).order_by("-spent_at", "-id")[:page_size]
+        )
+        data = {
+            "next": None,
+            "previous": None,
+            "results": expenses_list_data(
+                rows,
+                get_categories_by_expense(
+                    [row["id"] for row in rows], [row["spent_at"] for row in rows]
+                ),
+            ),
+        }
+        self.compare_formats(data, options["iterations"])
+
+    def compare_formats(self, data: dict, iterations: int) -> None:
+        formats = [
+            ("json (stdlib)", JSONRenderer(), JSONParser()),
+            ("json (orjson)", ORJSONRenderer(), ORJSONParser()),
+            ("msgpack", MessagePackRenderer(), MessagePackParser()),
+        ]
+        self.stdout.write(
+            f"\n{'format':<16}{'bytes':>9}{'encode ms':>11}{'decode ms':>11}"
+        )
+        for name, renderer, parser in formats:
+            content = renderer.render(data)
+            if parser.parse(io.BytesIO(content)) != data:
+                raise CommandError(f"{name} does not decode to the rendered data")
+
+            encode, decode = [], []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                renderer.render(data)
+                encoded = time.perf_counter()
+                parser.parse(io.BytesIO(content))
+                decode.append(time.perf_counter() - encoded)
+                encode.append(encoded - started)
+            self.stdout.write(
+                f"{name:<16}{len(content):>9}{statistics.mean(encode) * 1000:>11.3f}"
+                f"{statistics.mean(decode) * 1000:>11.3f}"
+            )
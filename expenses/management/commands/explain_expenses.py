@@ -0,0 +1,87 @@
+""" Print query plans of the expense filter paths """
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from expenses.models import Expense
+from expenses.services import get_expenses_with_filters
+from expenses.services.SearchService import search_words
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on every filter path of get_expenses_with_filters for "
+        "the given user so index usage can be checked after migrations"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="user whose expenses are queried")
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="execute the queries (EXPLAIN ANALYZE, BUFFERS)",
+        )
+        parser.add_argument(
+            "--page-size", type=int, default=100, help="LIMIT of the list query"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} not found")
+
+        bounds = Expense.objects.filter(creator=user).aggregate(
+            first=Min("spent_at"),
+            last=Max("spent_at"),
+            low=Min("value"),
+            high=Max("value"),
+        )
+        if bounds["first"] is None:
+            raise CommandError(f"User {user.username} has no expenses")
+
+        category_ids = list(
+            Expense.categories.through.objects.filter(expense__creator=user)
+            .values_list("category_id", flat=True)
+            .distinct()[:3]
+        )
+        paths = {
+            "list": {},
+            "date range": {
+                "start_date": bounds["first"],
+                "end_date": bounds["first"] + (bounds["last"] - bounds["first"]) / 10,
+            },
+            "value range": {
+                "min_value": bounds["high"] - (bounds["high"] - bounds["low"]) / 10,
+                "max_value": bounds["high"],
+            },
+            "categories": {"categories": [str(pk) for pk in category_ids]},
+        }
+        description = (
+            Expense.objects.filter(creator=user, description__gt="")
+            .values_list("description", flat=True)
+            .first()
+        )
+        words = search_words(description or "")
+        if words:
+            # prefix of a word the user has written
+            paths["search"] = {"q": words[0][:3]}
+
+        explain_options = {}
+        if options["analyze"]:
+            explain_options = {"analyze": True, "buffers": True}
+
+        for name, filters in paths.items():
+            ordering = ("-spent_at", "-id")
+            if "q" in filters:
+                ordering = ("-rank", *ordering)
+            queryset = get_expenses_with_filters(user, filters).order_by(*ordering)[
+                : options["page_size"]
+            ]
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {name}: {filters}"))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write("")
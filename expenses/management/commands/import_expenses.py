@@ -0,0 +1,67 @@
+""" Import expenses from a CSV file """
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from expenses.services import import_expenses_csv
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Import expenses of a user from CSV with columns value, spent_at and "
+        "optionally description and categories (names separated by ';')"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="owner of imported expenses")
+        parser.add_argument("path", help="CSV file to import")
+        parser.add_argument(
+            "--atomic",
+            action="store_true",
+            help="all-or-nothing: abort and roll back on the first invalid row",
+        )
+        parser.add_argument("--chunk-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} not found")
+
+        started = time.monotonic()
+
+        def progress(result: dict) -> None:
+            elapsed = time.monotonic() - started
+            rate = result["imported"] / elapsed if elapsed else 0
+            self.stdout.write(
+                f"imported {result['imported']} rows, skipped {result['skipped']} "
+                f"({rate:.0f} rows/s)"
+            )
+
+        with open(options["path"], newline="", encoding="utf-8-sig") as file:
+            try:
+                result = import_expenses_csv(
+                    user,
+                    file,
+                    atomic=options["atomic"],
+                    chunk_size=options["chunk_size"],
+                    progress=progress,
+                )
+            except ValidationError as e:
+                raise CommandError(str(e.detail[0] if e.detail else e))
+
+        for error in result["errors"]:
+            self.stderr.write(error)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result['imported']} expenses, skipped {result['skipped']}, "
+                f"created {result['created_categories']} categories in "
+                f"{time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,340 @@
+""" Partition expenses and their category links by spent_at month """
+
+import datetime
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from expenses.models import DailySpending, Expense, ExpenseCategory
+
+EXPENSES = Expense._meta.db_table
+LINKS = ExpenseCategory._meta.db_table
+# the partition key of both tables, links carry a copy of their expense's
+PARTITION_KEY = "spent_at"
+
+_MONTH_PARTITION = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def _add_months(month: datetime.date, months: int) -> datetime.date:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(month: datetime.date) -> str:
+    # months start at midnight in the current time zone, like TruncMonth
+    start = timezone.make_aware(datetime.datetime.combine(month, datetime.time()))
+    return start.isoformat()
+
+
+def _partition_name(table: str, month: datetime.date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def _partitioned_constraint(
+    kind: str, definition: str, referenced: str, keys: list, referenced_keys: list
+) -> str:
+    # unique keys of a partitioned table must contain the partition key
+    if kind in ("p", "u"):
+        keys = keys if PARTITION_KEY in keys else [*keys, PARTITION_KEY]
+        return f"{'PRIMARY KEY' if kind == 'p' else 'UNIQUE'} ({', '.join(keys)})"
+    # links reference their expense by (id, spent_at), which keeps them in
+    # the partition of its month, ON UPDATE CASCADE moves them along
+    if kind == "f" and referenced == EXPENSES:
+        return (
+            f"FOREIGN KEY ({', '.join([*keys, PARTITION_KEY])}) "
+            f"REFERENCES {EXPENSES} ({', '.join([*referenced_keys, PARTITION_KEY])}) "
+            "ON UPDATE CASCADE DEFERRABLE INITIALLY DEFERRED"
+        )
+    return definition
+
+
+class Command(BaseCommand):
+    help = (
+        "Partition the expenses and category links tables by spent_at month "
+        "on PostgreSQL with --convert, then create the partitions of the "
+        "coming months and detach partitions older than --retain months"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="copy both tables into partitioned tables, once, in a "
+            "maintenance window: the tables are locked while rows are copied",
+        )
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=3,
+            help="months after the current one to create partitions for",
+        )
+        parser.add_argument(
+            "--retain",
+            type=int,
+            help="months before the current one to keep attached, older "
+            "partitions are detached and archived, by default none are",
+        )
+        parser.add_argument(
+            "--archive-schema",
+            default="expenses_archive",
+            help="schema detached partitions are moved to",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning needs PostgreSQL")
+
+        this_month = timezone.localdate().replace(day=1)
+        with transaction.atomic(), connection.cursor() as cursor:
+            # pending deferred foreign key checks would make PostgreSQL
+            # refuse the ALTER TABLE statements below
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+            partitioned = self.is_partitioned(cursor)
+            if options["convert"]:
+                if partitioned:
+                    raise CommandError(f"{EXPENSES} is already partitioned")
+                # older servers can't move a referenced row to another
+                # partition when its spent_at changes
+                if connection.pg_version < 150000:
+                    raise CommandError("Partitioning needs PostgreSQL 15 or later")
+                self.convert(cursor)
+            elif not partitioned:
+                raise CommandError(
+                    f"{EXPENSES} is not partitioned, run with --convert first"
+                )
+
+            for offset in range(options["ahead"] + 1):
+                self.add_month(cursor, _add_months(this_month, offset))
+            if options["retain"] is not None:
+                self.archive(
+                    cursor,
+                    _add_months(this_month, -options["retain"]),
+                    options["archive_schema"],
+                )
+
+        self.stdout.write(self.style.SUCCESS("Partitions are up to date"))
+
+    def is_partitioned(self, cursor) -> bool:
+        cursor.execute(
+            "SELECT EXISTS (SELECT FROM pg_partitioned_table "
+            "WHERE partrelid = %s::regclass)",
+            [EXPENSES],
+        )
+        return cursor.fetchone()[0]
+
+    def convert(self, cursor) -> None:
+        """
+        Replace both tables with partitioned copies, one partition per month
+        with expenses and a default partition for the others
+
+        Constraints and indexes are created again on the partitioned
+        tables, see _partitioned_constraint.
+        """
+        cursor.execute(f"LOCK TABLE {EXPENSES}, {LINKS} IN ACCESS EXCLUSIVE MODE")
+        months = sorted(
+            {
+                timezone.localtime(month).date()
+                for month in Expense.objects.annotate(month=TruncMonth("spent_at"))
+                .values_list("month", flat=True)
+                .order_by()
+                .distinct()
+            }
+        )
+
+        tables = (EXPENSES, LINKS)
+        indexes = {table: self.index_definitions(cursor, table) for table in tables}
+        constraints = {
+            table: self.constraint_definitions(cursor, table) for table in tables
+        }
+        for table in tables:
+            cursor.execute(
+                f"CREATE TABLE {table}_partitioned (LIKE {table} "
+                "INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING IDENTITY "
+                "INCLUDING STORAGE INCLUDING COMMENTS) "
+                f"PARTITION BY RANGE ({PARTITION_KEY})"
+            )
+            for month in months:
+                self.create_partition(cursor, table, month, f"{table}_partitioned")
+            cursor.execute(
+                f"CREATE TABLE {table}_default PARTITION OF {table}_partitioned DEFAULT"
+            )
+
+        columns = ", ".join(self.columns(cursor, EXPENSES))
+        cursor.execute(
+            f"INSERT INTO {EXPENSES}_partitioned ({columns}) "
+            f"SELECT {columns} FROM {EXPENSES}"
+        )
+        # spent_at of the links is taken from the expenses, it may be stale
+        # in links written outside of the services
+        link_columns = self.columns(cursor, LINKS)
+        selected = ", ".join(
+            f"e.{column}" if column == PARTITION_KEY else f"l.{column}"
+            for column in link_columns
+        )
+        cursor.execute(
+            f"INSERT INTO {LINKS}_partitioned ({', '.join(link_columns)}) "
+            f"SELECT {selected} FROM {LINKS} l JOIN {EXPENSES} e ON e.id = l.expense_id"
+        )
+
+        cursor.execute(f"DROP TABLE {LINKS}, {EXPENSES}")
+        for table in tables:
+            cursor.execute(f"ALTER TABLE {table}_partitioned RENAME TO {table}")
+            for name, *constraint in constraints[table]:
+                cursor.execute(
+                    f"ALTER TABLE {table} ADD CONSTRAINT {name} "
+                    f"{_partitioned_constraint(*constraint)}"
+                )
+            # the definitions name the table, which now is the partitioned one
+            for definition in indexes[table]:
+                cursor.execute(definition)
+            self.reset_identities(cursor, table)
+            cursor.execute(f"ANALYZE {table}")
+
+        for month in months:
+            self.stdout.write(f"Created the partitions of {month:%Y-%m}")
+
+    def index_definitions(self, cursor, table: str) -> list[str]:
+        # indexes of constraints are created with their constraint
+        cursor.execute(
+            "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "WHERE i.indrelid = %s::regclass AND NOT EXISTS ("
+            "SELECT FROM pg_constraint c "
+            "WHERE c.conrelid = i.indrelid AND c.conindid = i.indexrelid)",
+            [table],
+        )
+        return [definition for (definition,) in cursor.fetchall()]
+
+    def constraint_definitions(self, cursor, table: str) -> list[tuple]:
+        # primary and unique keys first, foreign keys reference them
+        cursor.execute(
+            "SELECT c.conname, c.contype, pg_get_constraintdef(c.oid), "
+            "c.confrelid::regclass::text, "
+            "ARRAY(SELECT a.attname FROM unnest(c.conkey) WITH ORDINALITY k(n, i) "
+            "JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.n "
+            "ORDER BY k.i), "
+            "ARRAY(SELECT a.attname FROM unnest(c.confkey) WITH ORDINALITY k(n, i) "
+            "JOIN pg_attribute a ON a.attrelid = c.confrelid AND a.attnum = k.n "
+            "ORDER BY k.i) "
+            "FROM pg_constraint c WHERE c.conrelid = %s::regclass "
+            "ORDER BY c.contype = 'f', c.conname",
+            [table],
+        )
+        return cursor.fetchall()
+
+    def columns(self, cursor, table: str) -> list[str]:
+        # generated columns are computed by the database on insert
+        cursor.execute(
+            "SELECT attname FROM pg_attribute WHERE attrelid = %s::regclass "
+            "AND attnum > 0 AND NOT attisdropped AND attgenerated = '' "
+            "ORDER BY attnum",
+            [table],
+        )
+        return [column for (column,) in cursor.fetchall()]
+
+    def reset_identities(self, cursor, table: str) -> None:
+        # copied rows kept their ids, new ones continue after them
+        cursor.execute(
+            "SELECT attname FROM pg_attribute WHERE attrelid = %s::regclass "
+            "AND attidentity <> ''",
+            [table],
+        )
+        for (column,) in cursor.fetchall():
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence(%s, %s), max({column})) "
+                f"FROM {table}",
+                [table, column],
+            )
+
+    def partitions(self, cursor, table: str) -> dict[datetime.date, str]:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [table],
+        )
+        partitions = {}
+        for (name,) in cursor.fetchall():
+            match = _MONTH_PARTITION.search(name)
+            if match:
+                partitions[datetime.date(int(match[1]), int(match[2]), 1)] = name
+        return partitions
+
+    def create_partition(
+        self, cursor, table: str, month: datetime.date, parent: str | None = None
+    ) -> None:
+        cursor.execute(
+            f"CREATE TABLE {_partition_name(table, month)} "
+            f"PARTITION OF {parent or table} FOR VALUES "
+            f"FROM ('{_bound(month)}') TO ('{_bound(_add_months(month, 1))}')"
+        )
+
+    def add_month(self, cursor, month: datetime.date) -> None:
+        """
+        Create the partitions of a month if they don't exist yet, rows of
+        the month in the default partitions are moved to them
+        """
+        if month in self.partitions(cursor, EXPENSES):
+            return
+
+        start, end = _bound(month), _bound(_add_months(month, 1))
+        moved = []
+        # links first, they reference the expenses
+        for table in (LINKS, EXPENSES):
+            columns = ", ".join(self.columns(cursor, table))
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE {table}_moved AS SELECT {columns} "
+                f"FROM {table}_default WHERE {PARTITION_KEY} >= %s "
+                f"AND {PARTITION_KEY} < %s",
+                [start, end],
+            )
+            cursor.execute(
+                f"DELETE FROM {table}_default WHERE {PARTITION_KEY} >= %s "
+                f"AND {PARTITION_KEY} < %s",
+                [start, end],
+            )
+            moved.append((table, columns))
+
+        for table, columns in reversed(moved):
+            self.create_partition(cursor, table, month)
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_moved"
+            )
+            cursor.execute(f"DROP TABLE {table}_moved")
+        self.stdout.write(f"Created the partitions of {month:%Y-%m}")
+
+    def archive(self, cursor, oldest: datetime.date, schema: str) -> None:
+        """
+        Detach the partitions of months before oldest and move them to the
+        archive schema, the rollup rows of their days are deleted
+        """
+        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        partitions = {
+            table: self.partitions(cursor, table) for table in (LINKS, EXPENSES)
+        }
+        for month in sorted(partitions[EXPENSES]):
+            if month >= oldest:
+                break
+
+            # links first, the expenses can't be detached while referenced
+            for table in (LINKS, EXPENSES):
+                name = partitions[table].get(month)
+                if name is None:
+                    continue
+                cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                # archived rows must not block deleting users and categories
+                cursor.execute(
+                    "SELECT conname FROM pg_constraint "
+                    "WHERE conrelid = %s::regclass AND contype = 'f'",
+                    [name],
+                )
+                for (constraint,) in cursor.fetchall():
+                    cursor.execute(f"ALTER TABLE {name} DROP CONSTRAINT {constraint}")
+                cursor.execute(f"ALTER TABLE {name} SET SCHEMA {schema}")
+
+            DailySpending.objects.filter(
+                day__gte=month, day__lt=_add_months(month, 1)
+            ).delete()
+            self.stdout.write(f"Archived the partitions of {month:%Y-%m} to {schema}")
@@ -0,0 +1,22 @@
+""" Delete expired delta sync tombstones """
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from expenses.services import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete tombstones of deleted expenses and categories older than "
+        "SYNC_TOMBSTONE_RETENTION_DAYS"
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted} tombstones older than "
+                f"{settings.SYNC_TOMBSTONE_RETENTION_DAYS} days"
+            )
+        )
@@ -0,0 +1,82 @@
+""" Rebuild and verify the DailySpending rollup """
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from expenses.models import DailySpending, Expense
+from expenses.services.RollupService import rollup_from_expenses
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the DailySpending rollup from raw expenses and verify "
+        "that stored rows match the raw data"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="only compare the stored rollup with raw expenses",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            with transaction.atomic():
+                self.rebuild(options["batch_size"])
+
+        mismatches = self.check_rollup()
+        if mismatches:
+            for key, stored, expected in mismatches[:20]:
+                self.stderr.write(f"{key}: stored {stored}, expected {expected}")
+            raise CommandError(f"{len(mismatches)} rollup rows do not match")
+
+        self.stdout.write(self.style.SUCCESS("Rollup matches raw expenses"))
+
+    def rebuild(self, batch_size: int) -> None:
+        if connection.vendor == "postgresql":
+            # writers block on the rollup update until the rebuild commits,
+            # so no delta is applied twice or lost
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOCK TABLE {DailySpending._meta.db_table} IN EXCLUSIVE MODE"
+                )
+
+        DailySpending.objects.all().delete()
+        rows = rollup_from_expenses(Expense.objects.all())
+        DailySpending.objects.bulk_create(
+            (
+                DailySpending(
+                    creator_id=creator_id,
+                    category_id=category_id,
+                    day=day,
+                    total=total,
+                    count=count,
+                )
+                for (creator_id, category_id, day), (total, count) in rows.items()
+            ),
+            batch_size=batch_size,
+        )
+        self.stdout.write(f"Rebuilt {len(rows)} rollup rows")
+
+    def check_rollup(self) -> list[tuple]:
+        expected = rollup_from_expenses(Expense.objects.all())
+        stored = {
+            (creator_id, str(category_id) if category_id else None, day): [
+                total,
+                count,
+            ]
+            for creator_id, category_id, day, total, count in (
+                DailySpending.objects.values_list(
+                    "creator_id", "category_id", "day", "total", "count"
+                ).iterator()
+            )
+        }
+
+        mismatches = []
+        for key in expected.keys() | stored.keys():
+            if expected.get(key) != stored.get(key):
+                mismatches.append((key, stored.get(key), expected.get(key)))
+
+        return mismatches
@@ -0,0 +1,352 @@
+"""Generate deterministic synthetic users, categories and expenses"""
+
+import csv
+import datetime
+import io
+import math
+import random
+import time
+import uuid
+from decimal import Decimal
+from typing import Iterable
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from expenses.models import Category, DailySpending, Expense
+from expenses.services.RollupService import add_expense_deltas
+
+User = get_user_model()
+
+# category name -> median amount of its expenses
+CATEGORIES = {
+    "groceries": 40,
+    "restaurants": 35,
+    "coffee": 4,
+    "transport": 15,
+    "fuel": 60,
+    "rent": 900,
+    "utilities": 120,
+    "subscriptions": 12,
+    "health": 60,
+    "clothing": 70,
+    "entertainment": 25,
+    "travel": 300,
+    "gifts": 50,
+    "education": 100,
+    "pets": 30,
+    "home": 80,
+}
+UNCATEGORIZED_MEDIAN = 20
+MAX_VALUE = Decimal("99999999.99")
+# relative frequency of spending per weekday, Monday first
+WEEKDAY_WEIGHTS = [0.8, 0.75, 0.8, 0.85, 1.0, 1.0, 0.7]
+
+
+class Generator:
+    """
+    Synthetic data of one user, drawn from a random generator seeded with
+    the global seed and the user number, so a user's data does not depend
+    on the other options
+
+    - Expense values are log-normal around the median of their first
+      category, scaled by a per-user spending level.
+    - Categories follow a Zipf distribution in a per-user order, an
+      expense has 0 to max_fan_out of them, most have one.
+    - Dates are spread over the period with more spending on Fridays and
+      Saturdays, times of day around early afternoon.
+    """
+
+    def __init__(
+        self, seed: int, number: int, until: datetime.datetime, days: int
+    ) -> None:
+        self.rng = random.Random(f"{seed}-{number}")
+        self.until = until
+        self.days = days
+        self.level = self.rng.lognormvariate(0, 0.5)
+
+    def new_id(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def categories(self, count: int) -> list[tuple[uuid.UUID, str, int]]:
+        """
+        Returns:
+            list: (id, name, median) in order of decreasing popularity
+        """
+        names = list(CATEGORIES)
+        self.rng.shuffle(names)
+        categories = []
+        for n in range(count):
+            name = names[n % len(names)]
+            label = name if n < len(names) else f"{name} {n // len(names) + 1}"
+            categories.append((self.new_id(), label, CATEGORIES[name]))
+        return categories
+
+    def spent_at(self) -> datetime.datetime:
+        while True:
+            day = self.until - datetime.timedelta(
+                days=self.rng.randrange(1, self.days + 1)
+            )
+            if self.rng.random() < WEEKDAY_WEIGHTS[day.weekday()]:
+                break
+        hours = min(max(self.rng.gauss(14, 4), 0), 24 - 1e-6)
+        return day + datetime.timedelta(seconds=int(hours * 3600))
+
+    def value(self, median: float) -> Decimal:
+        value = median * self.level * self.rng.lognormvariate(0, 0.6)
+        return min(
+            max(Decimal(value).quantize(Decimal("0.01")), Decimal("0.01")), MAX_VALUE
+        )
+
+    def fan_out(self, max_fan_out: int, categories: int) -> int:
+        # no category for 10% of expenses, then each more is 3 times rarer
+        counts = range(min(max_fan_out, categories) + 1)
+        weights = [1] + [6 / 3 ** (k - 1) for k in counts[1:]]
+        return self.rng.choices(counts, weights)[0]
+
+    def pick(self, categories: list, weights: list[float], count: int) -> list:
+        picked = {}
+        while len(picked) < count:
+            category = self.rng.choices(categories, weights)[0]
+            picked[category[0]] = category
+        return list(picked.values())
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate users with categories and expenses from a seed, the same "
+        "options always produce the same data, and bulk load them with COPY "
+        "on PostgreSQL or batched bulk_create elsewhere"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--expenses-per-user", type=int, default=1000)
+        parser.add_argument("--categories-per-user", type=int, default=12)
+        parser.add_argument(
+            "--categories-per-expense",
+            type=int,
+            default=3,
+            help="maximum number of categories of an expense",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--until",
+            type=datetime.date.fromisoformat,
+            default=timezone.now().date(),
+            help="expenses are dated before this day, YYYY-MM-DD, defaults to today",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=3 * 365,
+            help="days before --until covered by expenses",
+        )
+        parser.add_argument("--username-prefix", default="user_")
+        parser.add_argument(
+            "--password", default="password", help="password of all generated users"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50_000,
+            help="expenses loaded per transaction",
+        )
+
+    def handle(self, *args, **options):
+        prefix = options["username_prefix"]
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f"Users named {prefix}* exist already, choose another --username-prefix"
+            )
+
+        until = datetime.datetime.combine(
+            options["until"], datetime.time(), tzinfo=datetime.timezone.utc
+        )
+        per_user = max(options["expenses_per_user"], 1)
+        users_per_batch = max(options["batch_size"] // per_user, 1)
+        load = self.copy if connection.vendor == "postgresql" else self.bulk_create
+        password = make_password(options["password"])
+
+        started = time.monotonic()
+        for first in range(0, options["users"], users_per_batch):
+            numbers = range(first, min(first + users_per_batch, options["users"]))
+            with transaction.atomic():
+                users = User.objects.bulk_create(
+                    User(username=f"{prefix}{n}", password=password) for n in numbers
+                )
+                load(*self.generate(users, numbers, until, options))
+            self.stdout.write(
+                f"Seeded {numbers.stop}/{options['users']} users "
+                f"in {time.monotonic() - started:.0f}s"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {options['users']} users with "
+                f"{options['users'] * options['expenses_per_user']} expenses"
+            )
+        )
+
+    def generate(
+        self, users: list, numbers: range, until: datetime.datetime, options: dict
+    ) -> tuple[list, list, list, list]:
+        """
+        Returns:
+            tuple: category, expense, category link and rollup rows of the
+                users, as tuples in the order used by copy and bulk_create
+        """
+        categories, expenses, links = [], [], []
+        deltas = {}
+        now = timezone.now()
+        for user, number in zip(users, numbers):
+            generator = Generator(options["seed"], number, until, options["days"])
+            owned = generator.categories(options["categories_per_user"])
+            weights = [1 / (rank + 1) for rank in range(len(owned))]
+            categories.extend((pk, name, user.pk) for pk, name, _ in owned)
+
+            for _ in range(options["expenses_per_user"]):
+                pk = generator.new_id()
+                spent_at = generator.spent_at()
+                fan_out = generator.fan_out(
+                    options["categories_per_expense"], len(owned)
+                )
+                picked = generator.pick(owned, weights, fan_out)
+                value = generator.value(
+                    picked[0][2] if picked else UNCATEGORIZED_MEDIAN
+                )
+                # entered some minutes to days after spending, never in the future
+                created_at = min(
+                    spent_at
+                    + datetime.timedelta(
+                        minutes=math.ceil(generator.rng.expovariate(1 / 600))
+                    ),
+                    now,
+                )
+                expenses.append((pk, value, spent_at, created_at, user.pk))
+                links.extend(
+                    (pk, category_id, spent_at) for category_id, _, _ in picked
+                )
+                add_expense_deltas(
+                    deltas,
+                    user.pk,
+                    (category_id for category_id, _, _ in picked),
+                    spent_at,
+                    value,
+                )
+
+        rollup = [
+            (uuid.uuid4(), creator_id, category_id, day, total, count)
+            for (creator_id, category_id, day), (total, count) in deltas.items()
+        ]
+        return categories, expenses, links, rollup
+
+    def copy(self, categories: list, expenses: list, links: list, rollup: list) -> None:
+        now = timezone.now().isoformat()
+        with connection.cursor() as cursor:
+            self.copy_rows(
+                cursor,
+                Category,
+                ["id", "created_at", "updated_at", "name", "creator_id"],
+                ((pk, now, now, name, creator) for pk, name, creator in categories),
+            )
+            self.copy_rows(
+                cursor,
+                Expense,
+                ["id", "created_at", "updated_at", "value", "spent_at", "creator_id"],
+                (
+                    (
+                        pk,
+                        created.isoformat(),
+                        created.isoformat(),
+                        value,
+                        spent.isoformat(),
+                        creator,
+                    )
+                    for pk, value, spent, created, creator in expenses
+                ),
+            )
+            self.copy_rows(
+                cursor,
+                Expense.categories.through,
+                ["expense_id", "category_id", "spent_at"],
+                (
+                    (expense, category, spent.isoformat())
+                    for expense, category, spent in links
+                ),
+            )
+            self.copy_rows(
+                cursor,
+                DailySpending,
+                [
+                    "id",
+                    "created_at",
+                    "updated_at",
+                    "creator_id",
+                    "category_id",
+                    "day",
+                    "total",
+                    "count",
+                ],
+                (
+                    (pk, now, now, creator, category, day.isoformat(), total, count)
+                    for pk, creator, category, day, total, count in rollup
+                ),
+            )
+
+    @staticmethod
+    def copy_rows(
+        cursor, model: type[models.Model], columns: list[str], rows: Iterable
+    ) -> None:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {model._meta.db_table} ({', '.join(columns)}) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+    def bulk_create(
+        self, categories: list, expenses: list, links: list, rollup: list
+    ) -> None:
+        # created_at and updated_at are set to the current time by the ORM
+        Category.objects.bulk_create(
+            (
+                Category(id=pk, name=name, creator_id=creator)
+                for pk, name, creator in categories
+            ),
+            batch_size=1000,
+        )
+        Expense.objects.bulk_create(
+            (
+                Expense(id=pk, value=value, spent_at=spent, creator_id=creator)
+                for pk, value, spent, _, creator in expenses
+            ),
+            batch_size=1000,
+        )
+        through = Expense.categories.through
+        through.objects.bulk_create(
+            (
+                through(expense_id=expense, category_id=category, spent_at=spent)
+                for expense, category, spent in links
+            ),
+            batch_size=1000,
+        )
+        DailySpending.objects.bulk_create(
+            (
+                DailySpending(
+                    id=pk,
+                    creator_id=creator,
+                    category_id=category,
+                    day=day,
+                    total=total,
+                    count=count,
+                )
+                for pk, creator, category, day, total, count in rollup
+            ),
+            batch_size=1000,
+        )
@@ -1,7 +1,14 @@
 """ All middlewares are defined here """
 
+import time
 import typing as tp
+from contextvars import ContextVar
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpRequest, HttpResponse
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.exceptions import NotFound, ValidationError
@@ -11,22 +18,198 @@ from rest_framework.status import (
     HTTP_500_INTERNAL_SERVER_ERROR,
 )
 
+from expenses import routers
+from expenses.services.MetricsService import record_request
+
 
 class MyExceptionMiddleware:
+    # async views are only served without a thread hop when every
+    # middleware in the chain supports async
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response: tp.Callable):
         self._get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request: Request) -> Response:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
         try:
             response = self._get_response(request)
-        except ValidationError as e:
-            return Response({"exception": str(e)}, status=HTTP_400_BAD_REQUEST)
-        except NotFound as e:
-            return Response({"exception": str(e)}, status=HTTP_404_NOT_FOUND)
         except Exception as e:
-            return Response(
-                {"exception": str(e)}, status=HTTP_500_INTERNAL_SERVER_ERROR
-            )
+            return self.handle_exception(e)
+
+        return response
+
+    async def __acall__(self, request: Request) -> Response:
+        try:
+            response = await self._get_response(request)
+        except Exception as e:
+            return self.handle_exception(e)
+
+        return response
+
+    @staticmethod
+    def handle_exception(exception: Exception) -> Response:
+        if isinstance(exception, ValidationError):
+            status = HTTP_400_BAD_REQUEST
+        elif isinstance(exception, NotFound):
+            status = HTTP_404_NOT_FOUND
+        else:
+            status = HTTP_500_INTERNAL_SERVER_ERROR
+
+        return Response({"exception": str(exception)}, status=status)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Track database routing decisions of every request, see
+    expenses.routers.PrimaryReplicaRouter
+
+    Requests with a session cookie (the admin) only use the primary.
+    A user who has written in a request is pinned to the primary for
+    DB_REPLICA_STICKY_SECONDS once the response is ready.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: tp.Callable):
+        self._get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = routers.start_request(primary=self.uses_session(request))
+        try:
+            return self._get_response(request)
+        finally:
+            state = routers.end_request(token)
+            if state.wrote and state.user_id is not None:
+                routers.pin_user(state.user_id)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        token = routers.start_request(primary=self.uses_session(request))
+        try:
+            return await self._get_response(request)
+        finally:
+            state = routers.end_request(token)
+            if state.wrote and state.user_id is not None:
+                await routers.apin_user(state.user_id)
+
+    @staticmethod
+    def uses_session(request: HttpRequest) -> bool:
+        return settings.SESSION_COOKIE_NAME in request.COOKIES
+
 
+_query_timer: ContextVar["QueryTimer | None"] = ContextVar("query_timer", default=None)
+
+
+class QueryTimer:
+    """
+    Number and duration of the queries of one request
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+def _time_query(execute, sql, params, many, context):
+    timer = _query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.seconds += time.perf_counter() - started
+        timer.queries += 1
+
+
+@receiver(connection_created, dispatch_uid="expenses_time_queries")
+def install_query_timer(sender, connection, **kwargs) -> None:
+    """
+    Time the queries of every connection, for the request that runs them
+
+    The request's timer is found in a context variable, which also reaches
+    the worker threads running the ORM calls of async views. The wrapper
+    goes first, execute_wrapper() blocks remove the last wrapper on exit.
+    """
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _time_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure wall time, database time and queries of every request
+
+    The measurements are sent to the client in a Server-Timing header when
+    SERVER_TIMING is on, and aggregated per route for the /metrics
+    endpoint, see MetricsService. Queries run while a streaming response
+    is consumed are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: tp.Callable):
+        self._get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timer = QueryTimer()
+        token = _query_timer.set(timer)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self._get_response(request)
+        finally:
+            _query_timer.reset(token)
+            self.finish(request, response, time.perf_counter() - started, timer)
         return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        timer = QueryTimer()
+        token = _query_timer.set(timer)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self._get_response(request)
+        finally:
+            _query_timer.reset(token)
+            self.finish(request, response, time.perf_counter() - started, timer)
+        return response
+
+    @staticmethod
+    def finish(
+        request: HttpRequest,
+        response: HttpResponse | None,
+        seconds: float,
+        timer: QueryTimer,
+    ) -> None:
+        match = getattr(request, "resolver_match", None)
+        # unknown URLs share one label, so scanners can't add label values
+        route = f"/{match.route}" if match else "unmatched"
+        status = response.status_code if response is not None else 500
+        record_request(
+            route, request.method, status, seconds, timer.seconds, timer.queries
+        )
+
+        if response is not None and settings.SERVER_TIMING:
+            response["Server-Timing"] = (
+                f"app;dur={(seconds - timer.seconds) * 1000:.1f}, "
+                f'db;dur={timer.seconds * 1000:.1f};desc="{timer.queries} queries", '
+                f"total;dur={seconds * 1000:.1f}"
+            )
@@ -0,0 +1,41 @@
+# Generated by Django 4.1.7 on 2026-10-17 19:44
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("expenses", "0001_initial"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="expense",
+            index=models.Index(
+                fields=["creator", "spent_at", "id"],
+                name="expense_creator_spent_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="expense",
+            index=models.Index(
+                fields=["creator", "value"],
+                name="expense_creator_value_idx",
+            ),
+        ),
+        # the auto-created unique constraint only covers (expense_id, category_id)
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS expense_categories_cat_exp_idx "
+                "ON expenses_expense_categories (category_id, expense_id);"
+            ),
+            reverse_sql=(
+                "DROP INDEX CONCURRENTLY IF EXISTS expense_categories_cat_exp_idx;"
+            ),
+        ),
+    ]
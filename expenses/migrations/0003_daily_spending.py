@@ -0,0 +1,122 @@
+# Generated by Django 4.1.7 on 2026-10-17 19:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+import uuid
+
+
+def build_rollup(apps, schema_editor):
+    # existing expenses are counted once, later writes apply deltas, see
+    # RollupService; aggregated here like rollup_from_expenses, so the
+    # migration doesn't depend on app code
+    db = schema_editor.connection.alias
+    Expense = apps.get_model("expenses", "Expense")
+    DailySpending = apps.get_model("expenses", "DailySpending")
+
+    categorized = (
+        Expense.categories.through.objects.using(db)
+        .annotate(day=TruncDate("expense__spent_at"))
+        .values_list("expense__creator_id", "category_id", "day")
+        .annotate(total=Sum("expense__value"), count=Count("expense_id"))
+        .order_by()
+    )
+    uncategorized = (
+        Expense.objects.using(db)
+        .filter(categories__isnull=True)
+        .annotate(day=TruncDate("spent_at"))
+        .values_list("creator_id", "day")
+        .annotate(total=Sum("value"), count=Count("id"))
+        .order_by()
+    )
+    rows = [
+        *categorized,
+        *(
+            (creator_id, None, day, total, count)
+            for creator_id, day, total, count in uncategorized
+        ),
+    ]
+    DailySpending.objects.using(db).bulk_create(
+        (
+            DailySpending(
+                creator_id=creator_id,
+                category_id=category_id,
+                day=day,
+                total=total,
+                count=count,
+            )
+            for creator_id, category_id, day, total, count in rows
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("expenses", "0002_expense_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailySpending",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("day", models.DateField()),
+                (
+                    "total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="expenses.category",
+                    ),
+                ),
+                (
+                    "creator",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="dailyspending",
+            index=models.Index(
+                fields=["creator", "day"], name="daily_spending_day_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailyspending",
+            constraint=models.UniqueConstraint(
+                fields=("creator", "category", "day"), name="daily_spending_unique"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="dailyspending",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("category__isnull", True)),
+                fields=("creator", "day"),
+                name="daily_spending_uncategorized_unique",
+            ),
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
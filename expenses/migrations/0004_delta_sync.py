@@ -0,0 +1,70 @@
+# Generated by Django 4.1.7 on 2026-10-17 19:53
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("expenses", "0003_daily_spending"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("expense", "Expense"), ("category", "Category")],
+                        max_length=16,
+                    ),
+                ),
+                ("object_id", models.UUIDField()),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name="category",
+            index=models.Index(
+                fields=["creator", "updated_at"], name="category_creator_updated_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="expense",
+            index=models.Index(
+                fields=["creator", "updated_at"], name="expense_creator_updated_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="tombstone",
+            name="creator",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tombstone",
+            index=models.Index(
+                fields=["creator", "created_at"], name="tombstone_creator_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.1.7 on 2026-10-17 20:31
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("expenses", "0004_delta_sync"),
+    ]
+
+    operations = [
+        # not a model field: Django 4.1 has no generated fields and would
+        # write to the column, see expenses.services.SearchService
+        migrations.RunSQL(
+            sql=(
+                "ALTER TABLE expenses_expense ADD COLUMN IF NOT EXISTS "
+                "description_search tsvector GENERATED ALWAYS AS "
+                "(to_tsvector('simple'::regconfig, coalesce(description, ''))) "
+                "STORED;"
+            ),
+            reverse_sql=(
+                "ALTER TABLE expenses_expense DROP COLUMN IF EXISTS description_search;"
+            ),
+        ),
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS expense_description_search_idx "
+                "ON expenses_expense USING GIN (description_search);"
+            ),
+            reverse_sql=(
+                "DROP INDEX CONCURRENTLY IF EXISTS expense_description_search_idx;"
+            ),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.1.7 on 2026-10-17 20:41
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def copy_spent_at(apps, schema_editor):
+    Expense = apps.get_model("expenses", "Expense")
+    ExpenseCategory = apps.get_model("expenses", "ExpenseCategory")
+    ExpenseCategory.objects.using(schema_editor.connection.alias).update(
+        spent_at=Subquery(
+            Expense.objects.filter(pk=OuterRef("expense_id")).values("spent_at")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0005_expense_description_search"),
+    ]
+
+    operations = [
+        # the auto-created through table becomes the ExpenseCategory model,
+        # its columns and constraints stay as they are
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="ExpenseCategory",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        (
+                            "category",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="expenses.category",
+                            ),
+                        ),
+                        (
+                            "expense",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                to="expenses.expense",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "db_table": "expenses_expense_categories",
+                        "unique_together": {("expense", "category")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="expense",
+                    name="categories",
+                    field=models.ManyToManyField(
+                        through="expenses.ExpenseCategory", to="expenses.category"
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="expensecategory",
+            name="spent_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(copy_spent_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="expensecategory",
+            name="spent_at",
+            field=models.DateTimeField(),
+        ),
+    ]
@@ -22,6 +22,14 @@ class Category(BaseModel):
     name = models.CharField(max_length=255)
     creator = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # delta sync, see SyncService
+            models.Index(
+                fields=["creator", "updated_at"], name="category_creator_updated_idx"
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -31,7 +39,129 @@ class Expense(BaseModel):
     spent_at = models.DateTimeField()
     description = models.TextField(blank=True, null=True)
     creator = models.ForeignKey(User, on_delete=models.CASCADE)
-    categories = models.ManyToManyField(Category)  # TODO: fix here?
+    categories = models.ManyToManyField(Category, through="ExpenseCategory")
+
+    class Meta:
+        indexes = [
+            # list / date range filters and keyset pagination by (spent_at, id)
+            models.Index(
+                fields=["creator", "spent_at", "id"], name="expense_creator_spent_idx"
+            ),
+            # min_value / max_value filters
+            models.Index(fields=["creator", "value"], name="expense_creator_value_idx"),
+            # delta sync, see SyncService
+            models.Index(
+                fields=["creator", "updated_at"], name="expense_creator_updated_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.value} - {self.spent_at}"
+
+
+class ExpenseCategoryQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # links created by expense.categories.add() and set() have no
+        # spent_at, it is copied from their expenses with one query
+        objs = list(objs)
+        missing = {link.expense_id for link in objs if link.spent_at is None}
+        if missing:
+            spent_at = dict(
+                Expense.objects.using(self.db)
+                .filter(id__in=missing)
+                .values_list("id", "spent_at")
+            )
+            for link in objs:
+                if link.spent_at is None:
+                    link.spent_at = spent_at.get(link.expense_id)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class ExpenseCategory(models.Model):
+    """
+    Link of an expense to one of its categories
+
+    spent_at is a copy of the expense's spent_at, the partition key of the
+    links when the expense tables are partitioned by month, see the
+    partition_expenses command. Services copy it on every write.
+    """
+
+    expense = models.ForeignKey(Expense, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    spent_at = models.DateTimeField()
+
+    objects = ExpenseCategoryQuerySet.as_manager()
+
+    class Meta:
+        # the table of the former auto-created through model
+        db_table = "expenses_expense_categories"
+        unique_together = [("expense", "category")]
+
+    def save(self, *args, **kwargs):
+        if self.spent_at is None:
+            self.spent_at = self.expense.spent_at
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.expense_id} - {self.category_id}"
+
+
+class DailySpending(BaseModel):
+    """
+    Rollup of expenses per (creator, category, day)
+
+    Maintained incrementally by the expenses services, an expense with
+    several categories is counted in each of them, expenses without
+    categories are counted in the row with an empty category.
+    """
+
+    creator = models.ForeignKey(User, on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True)
+    day = models.DateField()
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["creator", "category", "day"],
+                name="daily_spending_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["creator", "day"],
+                condition=models.Q(category__isnull=True),
+                name="daily_spending_uncategorized_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["creator", "day"], name="daily_spending_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.category} - {self.total}"
+
+
+class Tombstone(BaseModel):
+    """
+    Record of a deleted expense or category, so delta sync can report it
+
+    created_at is the deletion time.
+    """
+
+    EXPENSE = "expense"
+    CATEGORY = "category"
+    KIND_CHOICES = [(EXPENSE, "Expense"), (CATEGORY, "Category")]
+
+    creator = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.UUIDField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["creator", "created_at"], name="tombstone_creator_created_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
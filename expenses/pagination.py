@@ -0,0 +1,206 @@
+""" All paginators are defined here """
+
+import base64
+import binascii
+import json
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from expenses.models import Expense
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over expenses ordered by (spent_at, id)
+
+    Every page is fetched with a `WHERE (spent_at, id) < (last_spent_at, last_id)`
+    predicate instead of OFFSET, so the cost of a page does not depend on how
+    deep the client has scrolled. Cursors are opaque urlsafe base64 tokens.
+    Search results, annotated with a `rank`, are ordered by
+    (rank, spent_at, id) and their cursors carry the rank too.
+
+    Query Parameters:
+        - cursor: token taken from the `next` / `previous` links
+        - page_size: number of items per page (capped by `max_page_size`)
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def __init__(self):
+        self.page_size = settings.EXPENSES_PAGE_SIZE
+        self.base_url = None
+        self.ranked = False
+        self.cursor = None
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def paginate_queryset(
+        self, queryset: QuerySet, request: Request, view=None
+    ) -> list:
+        """
+        Fetch one page of the queryset after (or before) the requested cursor
+
+        Args:
+            queryset: QuerySet - filtered expenses or values() rows of
+                expenses, unordered, optionally annotated with a `rank`
+            request: Request - the HTTP request object
+
+        Returns:
+            list: Expenses or rows of the requested page
+
+        Raises:
+            ValidationError: If cursor or page_size is malformed
+        """
+        return self.build_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(
+        self, queryset: QuerySet, request: Request, view=None
+    ) -> list:
+        """
+        Async version of paginate_queryset, the page is fetched with async
+        iteration
+        """
+        page_queryset = self.get_page_queryset(queryset, request)
+        return self.build_page([item async for item in page_queryset])
+
+    def get_page_queryset(self, queryset: QuerySet, request: Request) -> QuerySet:
+        """
+        Restrict and order the queryset to the requested page plus one row,
+        which tells whether there is a page after this one
+
+        Raises:
+            ValidationError: If cursor or page_size is malformed
+        """
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ranked = "rank" in queryset.query.annotations
+        self.cursor = self.decode_cursor(request)
+
+        reverse = bool(self.cursor and self.cursor["reverse"])
+        if self.cursor:
+            spent_at, pk = self.cursor["spent_at"], self.cursor["id"]
+            if reverse:
+                after = Q(spent_at__gt=spent_at) | Q(spent_at=spent_at, id__gt=pk)
+            else:
+                after = Q(spent_at__lt=spent_at) | Q(spent_at=spent_at, id__lt=pk)
+            if self.ranked:
+                rank = self.cursor["rank"]
+                lookup = "rank__gt" if reverse else "rank__lt"
+                after = Q(**{lookup: rank}) | Q(rank=rank) & after
+            queryset = queryset.filter(after)
+
+        ordering = ("spent_at", "id") if reverse else ("-spent_at", "-id")
+        if self.ranked:
+            ordering = ("rank" if reverse else "-rank", *ordering)
+        return queryset.order_by(*ordering)[: self.page_size + 1]
+
+    def build_page(self, results: list) -> list:
+        """
+        Trim rows fetched from get_page_queryset to the page and set cursors
+        of the adjacent pages
+        """
+        cursor = self.cursor
+        reverse = bool(cursor and cursor["reverse"])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if results:
+            first, last = results[0], results[-1]
+            if has_more or reverse:
+                self.next_cursor = self.encode_cursor(last, reverse=False)
+            if (has_more and reverse) or (cursor and not reverse):
+                self.previous_cursor = self.encode_cursor(first, reverse=True)
+
+        return results
+
+    def get_paginated_response(self, data: list) -> Response:
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_link(self.next_cursor)),
+                    ("previous", self.get_link(self.previous_cursor)),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_page_size(self, request: Request) -> int:
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw is None:
+            return self.page_size
+
+        try:
+            page_size = int(raw)
+        except ValueError:
+            raise ValidationError(f"Invalid page_size: {raw}")
+        if page_size <= 0:
+            raise ValidationError(f"Invalid page_size: {raw}")
+
+        return min(page_size, self.max_page_size)
+
+    def get_link(self, cursor: str | None) -> str | None:
+        if cursor is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request: Request) -> dict | None:
+        """
+        Decode the cursor token from the query string
+
+        Returns:
+            dict | None: {"spent_at", "id", "reverse"} and "rank" of ranked
+                lists, or None for the first page
+
+        Raises:
+            ValidationError: If the token cannot be decoded
+        """
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+            spent_at = parse_datetime(payload["s"])
+            pk = uuid.UUID(payload["i"])
+            reverse = bool(payload.get("r", False))
+            rank = float(payload["k"]) if self.ranked else None
+        except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+            raise ValidationError("Invalid cursor")
+        if spent_at is None:
+            raise ValidationError("Invalid cursor")
+
+        cursor = {"spent_at": spent_at, "id": pk, "reverse": reverse}
+        if self.ranked:
+            cursor["rank"] = rank
+        return cursor
+
+    def encode_cursor(self, expense: Expense | dict, reverse: bool) -> str:
+        if isinstance(expense, dict):
+            # values() rows
+            spent_at, pk = expense["spent_at"], expense["id"]
+            rank = expense.get("rank")
+        else:
+            spent_at, pk = expense.spent_at, expense.id
+            rank = getattr(expense, "rank", None)
+        payload = {"s": spent_at.isoformat(), "i": str(pk)}
+        if self.ranked:
+            payload["k"] = rank
+        if reverse:
+            payload["r"] = 1
+        raw = json.dumps(payload, separators=(",", ":")).encode("ascii")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
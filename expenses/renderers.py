@@ -0,0 +1,67 @@
+""" All renderers are defined here """
+
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer which encodes with orjson, the output is the same bytes
+
+    Types orjson does not encode the way DRF's JSONEncoder does (dates,
+    times, decimals, querysets, ...) are converted by the JSONEncoder.
+    Indented, ASCII-only or non-compact output and data orjson rejects,
+    e.g. non-string keys, are rendered by JSONRenderer.
+    """
+
+    encoder = encoders.JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            content = orjson.dumps(
+                data,
+                default=self.encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # like JSONRenderer, escape the two characters which are valid in
+        # JSON but not in javascript strings
+        if b"\xe2\x80\xa8" in content or b"\xe2\x80\xa9" in content:
+            content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return content
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders the same data as the JSON renderers as MessagePack
+
+    Values are the ones of the JSON responses: decimals, dates and UUIDs
+    are strings converted by DRF's JSONEncoder, so clients can switch
+    formats without changing how they read fields.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    encoder = encoders.JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=self.encoder.default)
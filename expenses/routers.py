@@ -0,0 +1,169 @@
+""" All database routers are defined here """
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@dataclass
+class RoutingState:
+    """
+    Routing decisions of the current request
+
+    Attributes:
+        user_id: authenticated user, set by the authentication backend
+        primary: send every query of the request to the primary
+        wrote: the request has written to the primary
+        pinned: the user wrote within DB_REPLICA_STICKY_SECONDS, looked up
+            in the cache on the first read of the request
+        replica: replica alias used by all reads of the request
+    """
+
+    user_id: any = None
+    primary: bool = False
+    wrote: bool = False
+    pinned: bool | None = None
+    replica: str | None = None
+
+
+_state: ContextVar[RoutingState | None] = ContextVar("db_routing", default=None)
+_snapshot: ContextVar[str | None] = ContextVar("db_snapshot", default=None)
+
+
+def _pin_key(user_id) -> str:
+    return f"db:pinned:{user_id}"
+
+
+def start_request(primary: bool = False) -> any:
+    """
+    Start tracking routing decisions of a request
+
+    Args:
+        primary: bool - send every query of the request to the primary
+
+    Returns:
+        Token to pass to end_request
+    """
+    return _state.set(RoutingState(primary=primary))
+
+
+def end_request(token) -> RoutingState:
+    """
+    Stop tracking the request started with start_request
+
+    Returns:
+        RoutingState: Final state of the request
+    """
+    state = _state.get()
+    _state.reset(token)
+    return state
+
+
+def set_request_user(user_id) -> None:
+    """
+    Remember the authenticated user, so their reads stay on the primary
+    for a while after they write
+    """
+    state = _state.get()
+    if state is not None and state.user_id != user_id:
+        state.user_id = user_id
+        state.pinned = None
+
+
+def pin_user(user_id) -> None:
+    """
+    Keep user's reads on the primary for DB_REPLICA_STICKY_SECONDS
+    """
+    cache.set(_pin_key(user_id), True, timeout=settings.DB_REPLICA_STICKY_SECONDS)
+
+
+async def apin_user(user_id) -> None:
+    """
+    Async version of pin_user
+    """
+    await cache.aset(
+        _pin_key(user_id), True, timeout=settings.DB_REPLICA_STICKY_SECONDS
+    )
+
+
+@contextmanager
+def reading_from(alias: str) -> Iterator[None]:
+    """
+    Route all reads inside the block to the database alias, used by
+    transactions opened on a replica
+    """
+    token = _snapshot.set(alias)
+    try:
+        yield
+    finally:
+        _snapshot.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send writes to the primary and reads to the replicas in
+    REPLICA_DATABASES
+
+    Reads stay on the primary
+    - inside a transaction on the primary, so services read their own
+      uncommitted writes and locked rows,
+    - for the rest of a request after it has written,
+    - for DB_REPLICA_STICKY_SECONDS after a user's write, so users never
+      see their own data older than what they have just written,
+    - for requests with a session cookie, i.e. the admin.
+
+    Without replicas the router has no opinion and everything goes to
+    the default database.
+    """
+
+    def db_for_read(self, model, **hints) -> str | None:
+        replicas = settings.REPLICA_DATABASES
+        if not replicas:
+            return None
+        if _snapshot.get() is not None:
+            return _snapshot.get()
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        state = _state.get()
+        if state is None:
+            return random.choice(replicas)
+        if self._use_primary(state):
+            return DEFAULT_DB_ALIAS
+
+        if state.replica is None:
+            state.replica = random.choice(replicas)
+        return state.replica
+
+    def db_for_write(self, model, **hints) -> str | None:
+        if not settings.REPLICA_DATABASES:
+            return None
+
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool | None:
+        # replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    @staticmethod
+    def _use_primary(state: RoutingState) -> bool:
+        if state.primary or state.wrote:
+            return True
+        if state.user_id is None:
+            return False
+
+        if state.pinned is None:
+            state.pinned = cache.get(_pin_key(state.user_id)) is not None
+        return state.pinned
@@ -1,5 +1,8 @@
 """ All serializers are defined here """
 
+from decimal import Decimal
+
+from django.utils import timezone
 from rest_framework import serializers
 
 from .models import Expense, Category
@@ -39,6 +42,33 @@ class ExpensesWriteSerializer(serializers.ModelSerializer):
         exclude = ["id", "creator"]
 
 
+class ExpensesBatchItemSerializer(serializers.ModelSerializer):
+    categories = serializers.ListField(
+        child=serializers.UUIDField(), required=False, default=list
+    )
+
+    class Meta:
+        model = Expense
+        exclude = ["id", "created_at", "updated_at", "creator"]
+
+
+class ExpensesBulkUpdateSerializer(serializers.Serializer):
+    description = serializers.CharField(
+        required=False, allow_null=True, allow_blank=True
+    )
+    add_categories = serializers.ListField(
+        child=serializers.UUIDField(), required=False
+    )
+    remove_categories = serializers.ListField(
+        child=serializers.UUIDField(), required=False
+    )
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Nothing to update")
+        return attrs
+
+
 class ExpensesReadSerializer(serializers.ModelSerializer):
     categories = CategoriesReadSerializer(many=True, read_only=True)
 
@@ -47,6 +77,55 @@ class ExpensesReadSerializer(serializers.ModelSerializer):
         exclude = ["creator"]
 
 
+def expenses_list_data(rows: list[dict], categories: dict) -> list[dict]:
+    """
+    Fast path of ExpensesReadSerializer(expenses, many=True).data for
+    values() rows, which skips the per-field serializer machinery
+
+    Produces the same keys in the same order and the same value formats as
+    the serializer with the default DATETIME_FORMAT and
+    COERCE_DECIMAL_TO_STRING settings.
+
+    Args:
+        rows: list - rows of get_expense_rows_with_filters
+        categories: dict - expense id -> [(category id, name)], see
+            get_categories_by_expense
+
+    Returns:
+        list: Serialized expenses
+    """
+    tz = timezone.get_current_timezone()
+    cents = Decimal("0.01")
+
+    def datetime_data(value):
+        # DateTimeField.to_representation with the ISO 8601 format
+        value = value.astimezone(tz).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    category_data = {}
+    for expense_categories in categories.values():
+        for pk, name in expense_categories:
+            if pk not in category_data:
+                category_data[pk] = {"id": str(pk), "name": name}
+
+    return [
+        {
+            "id": str(row["id"]),
+            "categories": [
+                category_data[pk] for pk, _ in categories.get(row["id"], ())
+            ],
+            "created_at": datetime_data(row["created_at"]),
+            "updated_at": datetime_data(row["updated_at"]),
+            "value": format(row["value"].quantize(cents), "f"),
+            "spent_at": datetime_data(row["spent_at"]),
+            "description": row["description"],
+        }
+        for row in rows
+    ]
+
+
 class ExpensesUpdateSerializer(serializers.ModelSerializer):
     categories = serializers.PrimaryKeyRelatedField(
         many=True, queryset=Category.objects.all(), required=False
@@ -55,3 +134,13 @@ class ExpensesUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Expense
         exclude = ["id", "created_at", "updated_at", "creator"]
+
+
+class ExpensesSummarySerializer(serializers.Serializer):
+    category_id = serializers.UUIDField()
+    category_name = serializers.CharField()
+    total = serializers.DecimalField(max_digits=20, decimal_places=2)
+    count = serializers.IntegerField()
+    min = serializers.DecimalField(max_digits=10, decimal_places=2)
+    max = serializers.DecimalField(max_digits=10, decimal_places=2)
+    average = serializers.DecimalField(max_digits=10, decimal_places=2)
@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, TypeVar
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+T = TypeVar("T")
+
+_stats_lock = threading.Lock()
+_stats: dict[str, dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def _version_key(namespace: str, user_id: int) -> str:
+    return f"{namespace}:version:{user_id}"
+
+
+def get_user_version(namespace: str, user_id: int) -> int:
+    """
+    Get the cache version of user's data in the namespace
+
+    Missing versions start from the current time in nanoseconds, so entries
+    written before the version itself was evicted are never read again.
+
+    Args:
+        namespace: str - cached data kind, e.g. "categories"
+        user_id: int - owner of the cached data
+
+    Returns:
+        int: Current version
+    """
+    key = _version_key(namespace, user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key, time.time_ns())
+    return version
+
+
+async def aget_user_version(namespace: str, user_id: int) -> int:
+    """
+    Async version of get_user_version
+    """
+    key = _version_key(namespace, user_id)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key, time.time_ns())
+    return version
+
+
+def _bump(namespace: str, user_id: int) -> None:
+    key = _version_key(namespace, user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_user_version(namespace: str, user_id: int) -> None:
+    """
+    Invalidate all cached user's data in the namespace
+
+    The version is bumped right away and once more after the current
+    transaction commits, so a concurrent reader can't cache data read
+    before the commit under the new version.
+
+    Args:
+        namespace: str - cached data kind, e.g. "categories"
+        user_id: int - owner of the cached data
+    """
+    _bump(namespace, user_id)
+    transaction.on_commit(lambda: _bump(namespace, user_id))
+
+
+async def abump_user_version(namespace: str, user_id: int) -> None:
+    """
+    Invalidate all cached user's data in the namespace after a write which
+    is already committed, e.g. a single statement run in autocommit mode
+    from async code, where transaction hooks are not available
+
+    Args:
+        namespace: str - cached data kind, e.g. "categories"
+        user_id: int - owner of the cached data
+    """
+    key = _version_key(namespace, user_id)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, time.time_ns(), timeout=None)
+
+
+def _count(namespace: str, hit: bool) -> None:
+    with _stats_lock:
+        _stats[namespace]["hits" if hit else "misses"] += 1
+
+
+def get_or_load(namespace: str, user_id: int, key: str, load: Callable[[], T]) -> T:
+    """
+    Get user's data from the cache or load and cache it
+
+    Args:
+        namespace: str - cached data kind, e.g. "categories"
+        user_id: int - owner of the cached data
+        key: str - entry key inside the namespace
+        load: callable - loads the data on cache miss, must not return None
+
+    Returns:
+        Cached or loaded data
+    """
+    version = get_user_version(namespace, user_id)
+    cache_key = f"{namespace}:{user_id}:{version}:{key}"
+
+    value = cache.get(cache_key)
+    _count(namespace, value is not None)
+    if value is not None:
+        return value
+
+    value = load()
+    cache.set(cache_key, value)
+    return value
+
+
+async def aget_or_load(
+    namespace: str, user_id: int, key: str, load: Callable[[], Awaitable[T]]
+) -> T:
+    """
+    Async version of get_or_load, load is awaited on cache miss
+    """
+    version = await aget_user_version(namespace, user_id)
+    cache_key = f"{namespace}:{user_id}:{version}:{key}"
+
+    value = await cache.aget(cache_key)
+    _count(namespace, value is not None)
+    if value is not None:
+        return value
+
+    value = await load()
+    await cache.aset(cache_key, value)
+    return value
+
+
+def get_cache_stats() -> dict[str, dict[str, int]]:
+    """
+    Get hit and miss counters of this process per namespace
+
+    Returns:
+        dict: {"<namespace>": {"hits": int, "misses": int}}
+    """
+    with _stats_lock:
+        return {namespace: dict(counters) for namespace, counters in _stats.items()}
@@ -1,29 +1,48 @@
+import datetime
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import AbstractUser
 from django.db import transaction
-from django.db.models import QuerySet
+from django.db.models import Count, Exists, Max, OuterRef, Sum
+from django.db.models.functions import TruncDate
 from rest_framework.exceptions import NotFound
 
-from expenses.models import Category
+from expenses.models import Category, Expense, Tombstone
+from .CacheService import (
+    abump_user_version,
+    aget_or_load,
+    bump_user_version,
+    get_or_load,
+)
+from .RollupService import apply_rollup_deltas
+from .SyncService import record_tombstones
 
 
-@transaction.atomic
-def get_categories(user: AbstractUser) -> QuerySet[Category]:
+CACHE_NAMESPACE = "categories"
+
+
+def get_categories(user: AbstractUser) -> list[Category]:
     """
-    Get all categories for the user
+    Get all categories for the user, cached until user's categories change
 
     Args:
         user: User object - the authenticated user
 
     Returns:
-        QuerySet: All categories belonging to the user
+        list: All categories belonging to the user
     """
-    return Category.objects.filter(creator=user).distinct()
+    return get_or_load(
+        CACHE_NAMESPACE,
+        user.pk,
+        "list",
+        lambda: list(Category.objects.filter(creator_id=user.pk).distinct()),
+    )
 
 
-@transaction.atomic
 def get_category_by_id(user: AbstractUser, category_id: str) -> Category:
     """
-    Get specific category by ID for the given user
+    Get specific category by ID for the given user, cached until user's
+    categories change
 
     Args:
         user: User object - the authenticated user
@@ -32,11 +51,68 @@ def get_category_by_id(user: AbstractUser, category_id: str) -> Category:
     Returns:
         Category: The requested category object
 
+    Raises:
+        NotFound: If category doesn't exist or doesn't belong to user
+    """
+    return get_or_load(
+        CACHE_NAMESPACE,
+        user.pk,
+        f"detail:{category_id}",
+        lambda: _get_category(user, category_id),
+    )
+
+
+def get_categories_validator(
+    user: AbstractUser,
+) -> tuple[datetime.datetime | None, str]:
+    """
+    Get a cheap validator of user's categories list for conditional GET
+
+    Args:
+        user: User object - the authenticated user
+
+    Returns:
+        tuple: Last modification time and a fingerprint of the list
+    """
+    row = Category.objects.filter(creator_id=user.pk).aggregate(
+        last=Max("updated_at"), count=Count("id")
+    )
+    return row["last"], f"{row['last']}:{row['count']}"
+
+
+def get_category_validator(
+    user: AbstractUser, category_id: str
+) -> tuple[datetime.datetime, str] | None:
+    """
+    Get a cheap validator of a single category for conditional GET
+
+    Args:
+        user: User object - the authenticated user
+        category_id: UUID - ID of the category
+
+    Returns:
+        tuple | None: Last modification time and a fingerprint of the
+            category, None if category doesn't exist
+    """
+    updated_at = (
+        Category.objects.filter(id=category_id, creator_id=user.pk)
+        .values_list("updated_at", flat=True)
+        .first()
+    )
+    if updated_at is None:
+        return None
+    return updated_at, str(updated_at)
+
+
+def _get_category(user: AbstractUser, category_id: str) -> Category:
+    """
+    Get category from the database, bypassing the cache
+
     Raises:
         NotFound: If category doesn't exist or doesn't belong to user
     """
     try:
-        return Category.objects.get(id=category_id, creator=user)
+        return Category.objects.get(id=category_id, creator_id=user.pk)
     except Category.DoesNotExist:
         raise NotFound(f"Category with id {category_id} not found")
 
@@ -54,7 +130,8 @@ def create_category(user: AbstractUser, validated_data: dict) -> Category:
         Category: The created category object
     """
 
-    category = Category.objects.create(creator=user, **validated_data)
+    category = Category.objects.create(creator_id=user.pk, **validated_data)
+    bump_user_version(CACHE_NAMESPACE, user.pk)
     return category
 
 
@@ -76,11 +153,12 @@ def update_category(
     Raises:
         NotFound: If category doesn't exist or doesn't belong to user
     """
-    category = get_category_by_id(user, category_id)
+    category = _get_category(user, category_id)
     for attr, value in validated_data.items():
         setattr(category, attr, value)
 
     category.save()
+    bump_user_version(CACHE_NAMESPACE, user.pk)
     return category
 
 
@@ -99,6 +177,121 @@ def delete_category(user: AbstractUser, category_id: str) -> bool:
     Raises:
         NotFound: If category doesn't exist or doesn't belong to user
     """
-    category = get_category_by_id(user, category_id)
+    category = _get_category(user, category_id)
+
+    # expenses left without categories move to the uncategorized rollup,
+    # the rollup rows of the category itself are removed by cascade
+    through = Expense.categories.through
+    other_categories = through.objects.filter(expense_id=OuterRef("pk")).exclude(
+        category_id=category.pk
+    )
+    orphaned = (
+        Expense.objects.filter(categories=category)
+        .filter(~Exists(other_categories))
+        .annotate(day=TruncDate("spent_at"))
+        .values_list("creator_id", "day")
+        .annotate(total=Sum("value"), count=Count("id"))
+        .order_by()
+    )
+    deltas = {
+        (creator_id, None, day): [total, count]
+        for creator_id, day, total, count in orphaned
+    }
+
     category.delete()
+    apply_rollup_deltas(deltas)
+    record_tombstones(user.pk, Tombstone.CATEGORY, [category_id])
+    bump_user_version(CACHE_NAMESPACE, user.pk)
     return True
+
+
+async def aget_categories(user: AbstractUser) -> list[Category]:
+    """
+    Async version of get_categories
+    """
+
+    async def load() -> list[Category]:
+        queryset = Category.objects.filter(creator_id=user.pk).distinct()
+        return [category async for category in queryset]
+
+    return await aget_or_load(CACHE_NAMESPACE, user.pk, "list", load)
+
+
+async def aget_category_by_id(user: AbstractUser, category_id: str) -> Category:
+    """
+    Async version of get_category_by_id
+
+    Raises:
+        NotFound: If category doesn't exist or doesn't belong to user
+    """
+    return await aget_or_load(
+        CACHE_NAMESPACE,
+        user.pk,
+        f"detail:{category_id}",
+        lambda: _aget_category(user, category_id),
+    )
+
+
+async def aget_categories_validator(
+    user: AbstractUser,
+) -> tuple[datetime.datetime | None, str]:
+    """
+    Async version of get_categories_validator
+    """
+    row = await Category.objects.filter(creator_id=user.pk).aaggregate(
+        last=Max("updated_at"), count=Count("id")
+    )
+    return row["last"], f"{row['last']}:{row['count']}"
+
+
+async def aget_category_validator(
+    user: AbstractUser, category_id: str
+) -> tuple[datetime.datetime, str] | None:
+    """
+    Async version of get_category_validator
+    """
+    updated_at = await (
+        Category.objects.filter(id=category_id, creator_id=user.pk)
+        .values_list("updated_at", flat=True)
+        .afirst()
+    )
+    if updated_at is None:
+        return None
+    return updated_at, str(updated_at)
+
+
+async def _aget_category(user: AbstractUser, category_id: str) -> Category:
+    try:
+        return await Category.objects.aget(id=category_id, creator_id=user.pk)
+    except Category.DoesNotExist:
+        raise NotFound(f"Category with id {category_id} not found")
+
+
+async def acreate_category(user: AbstractUser, validated_data: dict) -> Category:
+    """
+    Async version of create_category
+
+    The category is inserted with a single statement in autocommit mode,
+    so the cache is invalidated once the insert is committed.
+    """
+    category = await Category.objects.acreate(creator_id=user.pk, **validated_data)
+    await abump_user_version(CACHE_NAMESPACE, user.pk)
+    return category
+
+
+async def aupdate_category(
+    user: AbstractUser, category_id: str, validated_data: dict
+) -> Category:
+    """
+    Async version of update_category, run in a worker thread since
+    transactions are not available in async code
+    """
+    return await sync_to_async(update_category)(user, category_id, validated_data)
+
+
+async def adelete_category(user: AbstractUser, category_id: str) -> bool:
+    """
+    Async version of delete_category, run in a worker thread since
+    transactions are not available in async code
+    """
+    return await sync_to_async(delete_category)(user, category_id)
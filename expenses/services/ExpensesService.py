@@ -1,38 +1,97 @@
+import datetime
+from typing import Iterator
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import AbstractUser
 from django.db import transaction
-from django.db.models import QuerySet
-from rest_framework.exceptions import NotFound
+from django.db.models import (
+    Avg,
+    Count,
+    Exists,
+    F,
+    Max,
+    Min,
+    OuterRef,
+    Prefetch,
+    QuerySet,
+    Sum,
+    prefetch_related_objects,
+)
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+
+from expenses.models import Category, Expense, Tombstone
+from .RollupService import (
+    add_expense_deltas,
+    apply_rollup_deltas,
+    merge_rollup_deltas,
+    rollup_from_expenses,
+)
+from .SearchService import annotate_search_rank, search_descriptions
+from .SyncService import record_tombstones
+
+
+# values() of list responses, see expenses_list_data
+EXPENSE_LIST_FIELDS = (
+    "id",
+    "created_at",
+    "updated_at",
+    "value",
+    "spent_at",
+    "description",
+)
+
+
+def _categories_prefetch() -> Prefetch:
+    # only the columns used by CategoriesReadSerializer are loaded, in the
+    # order the categories were added, like _expense_categories_rows()
+    categories = Category.objects.only("id", "name").order_by("expensecategory__id")
+    return Prefetch("categories", queryset=categories)
+
+
+def _with_categories(queryset: QuerySet[Expense]) -> QuerySet[Expense]:
+    """
+    Prefetch expense categories in one extra query instead of one per expense
+    """
+    return queryset.prefetch_related(_categories_prefetch())
 
-from expenses.models import Expense
 
+def _prefetch_categories(expense: Expense) -> Expense:
+    """
+    Prefetch categories of a written expense, so it can be serialized from
+    async code
+    """
+    prefetch_related_objects([expense], _categories_prefetch())
+    return expense
 
-@transaction.atomic
-def get_expenses_with_filters(
+
+def _spent_range(filters: dict[str, any] | None) -> list | None:
+    # start_date and end_date only filter when both are given
+    if filters and filters.get("start_date") and filters.get("end_date"):
+        return [filters["start_date"], filters["end_date"]]
+    return None
+
+
+def _filter_expenses(
     user: AbstractUser, filters: dict[str, any] | None = None
 ) -> QuerySet[Expense]:
     """
-    Get user's expenses with optional filtering
+    Build the filtered expenses queryset shared by list and aggregate paths
 
     Args:
         user: User object - the authenticated user
-        filters: dict - optional filters including:
-            - start_date: filter expenses from this date
-            - end_date: filter expenses until this date
-            - min_value: filter expenses with value >= this
-            - max_value: filter expenses with value <= this
-            - categories: list of category IDs to filter by
+        filters: dict - optional filters, see get_expenses_with_filters
 
     Returns:
-        QuerySet: Filtered expenses for the user
+        QuerySet: Filtered expenses for the user, without prefetches
     """
-    queryset = Expense.objects.filter(creator=user)
+    queryset = Expense.objects.filter(creator_id=user.pk)
     if not filters:
         return queryset
 
-    start_date = filters.get("start_date")
-    end_date = filters.get("end_date")
-    if start_date and end_date:
-        queryset = queryset.filter(spent_at__range=[start_date, end_date])
+    spent_range = _spent_range(filters)
+    if spent_range:
+        queryset = queryset.filter(spent_at__range=spent_range)
 
     min_value = filters.get("min_value")
     max_value = filters.get("max_value")
@@ -45,12 +104,284 @@ def get_expenses_with_filters(
     if category_ids:
         if isinstance(category_ids, str):
             category_ids = category_ids.split(",")
-        queryset = queryset.filter(categories__id__in=category_ids)
+        queryset = _filter_categories(
+            queryset,
+            category_ids,
+            filters.get("categories_match") or "any",
+            spent_range,
+        )
+
+    search = filters.get("q")
+    if search:
+        queryset = search_descriptions(queryset, search)
+
+    # no filter joins a to-many relation, so rows are never duplicated
+    return queryset
+
+
+def _filter_categories(
+    queryset: QuerySet[Expense],
+    category_ids: list,
+    match: str,
+    spent_range: list | None = None,
+) -> QuerySet[Expense]:
+    """
+    Keep expenses linked to any or to all of the categories
 
-    return queryset.distinct()
+    Each condition is an EXISTS semi-join on the categories through table,
+    which stops at the first matching link and, unlike a join, needs no
+    DISTINCT over the whole result. Links are restricted to the spent_at
+    range of the expenses too, so only its partitions are scanned when the
+    tables are partitioned.
+
+    Raises:
+        ValidationError: If match is neither "any" nor "all"
+    """
+    links = Expense.categories.through.objects.filter(expense_id=OuterRef("pk"))
+    if spent_range:
+        links = links.filter(spent_at__range=spent_range)
+    if match == "any":
+        return queryset.filter(Exists(links.filter(category_id__in=category_ids)))
+    if match == "all":
+        for category_id in dict.fromkeys(category_ids):
+            queryset = queryset.filter(Exists(links.filter(category_id=category_id)))
+        return queryset
+    raise ValidationError(f"Invalid categories_match: {match}, expected any or all")
+
+
+def _ranked(queryset: QuerySet, filters: dict[str, any] | None) -> QuerySet:
+    # search results are listed by relevance, see KeysetPagination
+    if filters and filters.get("q"):
+        return annotate_search_rank(queryset, filters["q"])
+    return queryset
+
+
+def get_expenses_with_filters(
+    user: AbstractUser, filters: dict[str, any] | None = None
+) -> QuerySet[Expense]:
+    """
+    Get user's expenses with optional filtering
+
+    Args:
+        user: User object - the authenticated user
+        filters: dict - optional filters including:
+            - start_date: filter expenses from this date
+            - end_date: filter expenses until this date
+            - min_value: filter expenses with value >= this
+            - max_value: filter expenses with value <= this
+            - categories: list of category IDs to filter by
+            - categories_match: "any" (default) to keep expenses with at
+              least one of the categories, "all" for expenses with every one
+            - q: words the description must contain, the last one as a
+              prefix, adds a relevance `rank` annotation
+
+    Returns:
+        QuerySet: Filtered expenses for the user
+    """
+    return _with_categories(_ranked(_filter_expenses(user, filters), filters))
+
+
+def iterate_expenses_with_filters(
+    user: AbstractUser, filters: dict[str, any] | None = None, chunk_size: int = 2000
+) -> Iterator[Expense]:
+    """
+    Stream user's filtered expenses ordered by spent_at without caching them
+
+    Rows are fetched chunk_size at a time through a server-side cursor on
+    PostgreSQL, categories are prefetched per chunk.
+
+    Args:
+        user: User object - the authenticated user
+        filters: dict - optional filters, see get_expenses_with_filters
+        chunk_size: int - rows fetched from the database at a time
+
+    Returns:
+        Iterator: Expenses with prefetched categories
+    """
+    queryset = _with_categories(_filter_expenses(user, filters))
+    return queryset.order_by("spent_at", "id").iterator(chunk_size=chunk_size)
+
+
+def get_expense_rows_with_filters(
+    user: AbstractUser, filters: dict[str, any] | None = None
+) -> QuerySet:
+    """
+    Get user's filtered expenses as values() rows without categories, for
+    list responses which are built without model instances
+
+    Args:
+        user: User object - the authenticated user
+        filters: dict - optional filters, see get_expenses_with_filters
+
+    Returns:
+        QuerySet: Rows with the EXPENSE_LIST_FIELDS keys, and `rank` when
+            searching
+    """
+    queryset = _ranked(_filter_expenses(user, filters), filters)
+    if "rank" in queryset.query.annotations:
+        return queryset.values(*EXPENSE_LIST_FIELDS, "rank")
+    return queryset.values(*EXPENSE_LIST_FIELDS)
+
+
+def _expense_categories_rows(expense_ids: list, spent_at: list | None) -> QuerySet:
+    # categories of an expense come in the order they were added, like from
+    # _categories_prefetch(), whatever plan either query gets
+    links = {"expense__in": expense_ids}
+    if spent_at:
+        # the links carry spent_at, the same join is filtered
+        links["expensecategory__spent_at__range"] = [min(spent_at), max(spent_at)]
+    return (
+        Category.objects.filter(**links)
+        .order_by("expensecategory__id")
+        .values_list("expense", "id", "name")
+    )
+
+
+def get_categories_by_expense(
+    expense_ids: list, spent_at: list | None = None
+) -> dict[any, list[tuple]]:
+    """
+    Get (id, name) of the categories of every expense with one query
+
+    Args:
+        expense_ids: list - ids of the expenses
+        spent_at: list - optional spent_at of the expenses, only links in
+            their range are read, which skips the other partitions when the
+            tables are partitioned
+
+    Returns:
+        dict: Expense id -> list of (category id, name), expenses without
+            categories are left out
+    """
+    categories = {}
+    if expense_ids:
+        for expense_id, pk, name in _expense_categories_rows(expense_ids, spent_at):
+            categories.setdefault(expense_id, []).append((pk, name))
+    return categories
+
+
+def get_expenses_validator(
+    user: AbstractUser, filters: dict[str, any] | None = None
+) -> tuple[datetime.datetime | None, str]:
+    """
+    Get a cheap validator of the filtered expenses list for conditional GET
+
+    The validator changes whenever an expense of the list or any user's
+    category is created, updated or deleted.
+
+    Args:
+        user: User object - the authenticated user
+        filters: dict - optional filters, see get_expenses_with_filters
+
+    Returns:
+        tuple: Last modification time and a fingerprint of the list
+    """
+    expenses = _filter_expenses(user, filters).aggregate(
+        last=Max("updated_at"), count=Count("id")
+    )
+    categories = Category.objects.filter(creator_id=user.pk).aggregate(
+        last=Max("updated_at"), count=Count("id")
+    )
+    return _list_validator(expenses, categories)
+
+
+def _list_validator(
+    expenses: dict, categories: dict
+) -> tuple[datetime.datetime | None, str]:
+    last_modified = max(
+        (last for last in (expenses["last"], categories["last"]) if last),
+        default=None,
+    )
+    fingerprint = (
+        f"{expenses['last']}:{expenses['count']}:"
+        f"{categories['last']}:{categories['count']}"
+    )
+    return last_modified, fingerprint
+
+
+def get_expense_validator(
+    user: AbstractUser, expense_id: str
+) -> tuple[datetime.datetime, str] | None:
+    """
+    Get a cheap validator of a single expense for conditional GET
+
+    Args:
+        user: User object - the authenticated user
+        expense_id: UUID - ID of the expense
+
+    Returns:
+        tuple | None: Last modification time and a fingerprint of the
+            expense with its categories, None if expense doesn't exist
+    """
+    return _detail_validator(list(_expense_validator_row(user, expense_id)))
+
+
+def _expense_validator_row(user: AbstractUser, expense_id: str) -> QuerySet:
+    # at most one row, read without first(): its ordering by pk would group
+    # by id alone, which PostgreSQL rejects once id is not the whole primary
+    # key, see partition_expenses
+    return (
+        Expense.objects.filter(id=expense_id, creator_id=user.pk)
+        .values("updated_at")
+        .annotate(
+            categories_last=Max("categories__updated_at"),
+            categories_count=Count("categories"),
+        )
+    )
+
+
+def _detail_validator(rows: list[dict]) -> tuple[datetime.datetime, str] | None:
+    if not rows:
+        return None
+
+    row = rows[0]
+
+    last_modified = max(
+        last for last in (row["updated_at"], row["categories_last"]) if last
+    )
+    fingerprint = (
+        f"{row['updated_at']}:{row['categories_last']}:{row['categories_count']}"
+    )
+    return last_modified, fingerprint
+
+
+def get_expenses_summary(
+    user: AbstractUser, filters: dict[str, any] | None = None
+) -> QuerySet:
+    """
+    Get per-category totals of user's expenses in a single aggregate query
+
+    Args:
+        user: User object - the authenticated user
+        filters: dict - optional filters, see get_expenses_with_filters
+
+    Returns:
+        QuerySet: Rows of category_id, category_name, total, count,
+            min, max and average ordered by total descending.
+            Expenses without categories are not included.
+    """
+    expense_ids = _filter_expenses(user, filters).values("id")
+    links = Expense.categories.through.objects.filter(expense_id__in=expense_ids)
+    spent_range = _spent_range(filters)
+    if spent_range:
+        # both sides of the join, so each only scans the partitions of the
+        # range when the tables are partitioned
+        links = links.filter(
+            spent_at__range=spent_range, expense__spent_at__range=spent_range
+        )
+    return (
+        links.values("category_id", category_name=F("category__name"))
+        .annotate(
+            total=Sum("expense__value"),
+            count=Count("expense_id"),
+            min=Min("expense__value"),
+            max=Max("expense__value"),
+            average=Avg("expense__value"),
+        )
+        .order_by("-total", "category_id")
+    )
 
 
-@transaction.atomic
 def get_expense_by_id(user: AbstractUser, expense_id: str) -> Expense:
     """
     Get specific expense by ID for the given user
@@ -66,7 +397,24 @@ def get_expense_by_id(user: AbstractUser, expense_id: str) -> Expense:
         NotFound: If expense doesn't exist or doesn't belong to user
     """
     try:
-        return Expense.objects.get(id=expense_id, creator=user)
+        return _with_categories(Expense.objects.all()).get(
+            id=expense_id, creator_id=user.pk
+        )
+    except Expense.DoesNotExist:
+        raise NotFound(f"Expense with id {expense_id} not found")
+
+
+def _get_expense_for_update(user: AbstractUser, expense_id: str) -> Expense:
+    """
+    Get and lock an expense so concurrent writers see consistent old values
+
+    Raises:
+        NotFound: If expense doesn't exist or doesn't belong to user
+    """
+    try:
+        return _with_categories(Expense.objects.select_for_update()).get(
+            id=expense_id, creator_id=user.pk
+        )
     except Expense.DoesNotExist:
         raise NotFound(f"Expense with id {expense_id} not found")
 
@@ -85,13 +433,86 @@ def create_expense(user: AbstractUser, validated_data: dict[str, any]) -> Expens
     """
     categories = validated_data.pop("categories", [])
 
-    expense = Expense.objects.create(creator=user, **validated_data)
+    expense = Expense.objects.create(creator_id=user.pk, **validated_data)
     if categories:
-        expense.categories.set(categories)
-
+        expense.categories.set(
+            categories, through_defaults={"spent_at": expense.spent_at}
+        )
+
+    apply_rollup_deltas(
+        add_expense_deltas(
+            {},
+            expense.creator_id,
+            {category.pk for category in categories},
+            expense.spent_at,
+            expense.value,
+        )
+    )
     return expense
 
 
+@transaction.atomic
+def create_expenses_batch(
+    user: AbstractUser, items: list[dict[str, any]], batch_size: int = 1000
+) -> list[Expense | None]:
+    """
+    Create many expenses for the user with bulk inserts
+
+    Category ids of all items are resolved with one query, expenses and
+    their category links are then inserted with bulk_create.
+
+    Args:
+        user: User object - the authenticated user
+        items: list - expense data, categories given as lists of category IDs
+        batch_size: int - max rows per INSERT statement
+
+    Returns:
+        list: Created expense for every item, or None for items referencing
+            categories which don't exist or don't belong to user
+    """
+    requested_ids = {
+        str(category_id) for item in items for category_id in item.get("categories", [])
+    }
+    known_ids = {
+        str(category_id)
+        for category_id in Category.objects.filter(
+            creator_id=user.pk, id__in=requested_ids
+        ).values_list("id", flat=True)
+    }
+
+    results = []
+    expenses = []
+    links = []
+    deltas = {}
+    through = Expense.categories.through
+    for item in items:
+        item = dict(item)
+        category_ids = {str(category_id) for category_id in item.pop("categories", [])}
+        if not category_ids <= known_ids:
+            results.append(None)
+            continue
+
+        expense = Expense(creator_id=user.pk, **item)
+        expenses.append(expense)
+        results.append(expense)
+        links.extend(
+            through(
+                expense_id=expense.id,
+                category_id=category_id,
+                spent_at=expense.spent_at,
+            )
+            for category_id in category_ids
+        )
+        add_expense_deltas(
+            deltas, user.pk, category_ids, expense.spent_at, expense.value
+        )
+
+    Expense.objects.bulk_create(expenses, batch_size=batch_size)
+    through.objects.bulk_create(links, batch_size=batch_size)
+    apply_rollup_deltas(deltas)
+    return results
+
+
 @transaction.atomic
 def update_expense(
     user: AbstractUser, expense_id: str, validated_data: dict[str, any]
@@ -110,16 +531,40 @@ def update_expense(
     Raises:
         NotFound: If expense doesn't exist or doesn't belong to user
     """
-    expense = get_expense_by_id(user, expense_id)
+    expense = _get_expense_for_update(user, expense_id)
     categories = validated_data.pop("categories", None)
 
+    old_category_ids = {category.pk for category in expense.categories.all()}
+    deltas = add_expense_deltas(
+        {},
+        expense.creator_id,
+        old_category_ids,
+        expense.spent_at,
+        expense.value,
+        sign=-1,
+    )
+
+    old_spent_at = expense.spent_at
     for attr, value in validated_data.items():
         setattr(expense, attr, value)
     expense.save()
+    if expense.spent_at != old_spent_at:
+        # links carry a copy of spent_at, see ExpenseCategory
+        Expense.categories.through.objects.filter(expense_id=expense.id).update(
+            spent_at=expense.spent_at
+        )
 
+    new_category_ids = old_category_ids
     if categories is not None:
-        expense.categories.set(categories)
-
+        expense.categories.set(
+            categories, through_defaults={"spent_at": expense.spent_at}
+        )
+        new_category_ids = {category.pk for category in categories}
+
+    add_expense_deltas(
+        deltas, expense.creator_id, new_category_ids, expense.spent_at, expense.value
+    )
+    apply_rollup_deltas(deltas)
     return expense
 
 
@@ -138,6 +583,291 @@ def delete_expense(user: AbstractUser, expense_id: str) -> bool:
     Raises:
         NotFound: If expense doesn't exist or doesn't belong to user
     """
-    expense = get_expense_by_id(user, expense_id)
+    expense = _get_expense_for_update(user, expense_id)
+    deltas = add_expense_deltas(
+        {},
+        expense.creator_id,
+        {category.pk for category in expense.categories.all()},
+        expense.spent_at,
+        expense.value,
+        sign=-1,
+    )
+
     expense.delete()
+    apply_rollup_deltas(deltas)
+    record_tombstones(user.pk, Tombstone.EXPENSE, [expense_id])
     return True
+
+
+def _for_each_batch(
+    user: AbstractUser,
+    filters: dict[str, any],
+    batch_size: int,
+    handle_batch: callable,
+) -> int:
+    """
+    Run handle_batch on the filtered expenses, batch_size rows at a time
+
+    Batches are walked in id order and every batch runs in its own
+    transaction with its rows locked, so row locks are held only for the
+    duration of one batch.
+
+    Args:
+        user: User object - the authenticated user
+        filters: dict - filters, see get_expenses_with_filters
+        batch_size: int - max expenses per transaction
+        handle_batch: callable - receives a list of locked expense ids
+
+    Returns:
+        int: Number of processed expenses
+
+    Raises:
+        ValidationError: If no filter narrows the expenses, e.g. only empty
+            values or a start_date without end_date are given
+    """
+    # _filter_expenses ignores filters it can't apply, without this check
+    # they would change every expense of the user
+    if len(_filter_expenses(user, filters).query.where.children) < 2:
+        raise ValidationError("At least one filter must narrow the expenses")
+
+    processed = 0
+    last_id = None
+    while True:
+        queryset = _filter_expenses(user, filters)
+        if last_id is not None:
+            queryset = queryset.filter(id__gt=last_id)
+        ids = list(queryset.order_by("id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return processed
+
+        with transaction.atomic():
+            locked_ids = list(
+                Expense.objects.filter(id__in=ids, creator_id=user.pk)
+                .select_for_update()
+                .values_list("id", flat=True)
+            )
+            if locked_ids:
+                handle_batch(locked_ids)
+
+        processed += len(locked_ids)
+        last_id = ids[-1]
+
+
+def update_expenses_with_filters(
+    user: AbstractUser,
+    filters: dict[str, any],
+    validated_data: dict[str, any],
+    batch_size: int = 1000,
+) -> int:
+    """
+    Update all user's expenses matching the filters with set-based statements
+
+    Args:
+        user: User object - the authenticated user
+        filters: dict - filters, see get_expenses_with_filters
+        validated_data: dict - changes including:
+            - description: new description of every expense
+            - add_categories: list of category IDs to link
+            - remove_categories: list of category IDs to unlink
+        batch_size: int - max expenses updated per transaction
+
+    Returns:
+        int: Number of updated expenses
+
+    Raises:
+        ValidationError: If some categories don't exist or don't belong to
+            user, or no filter narrows the expenses
+    """
+    add_ids = {str(pk) for pk in validated_data.get("add_categories", [])}
+    remove_ids = {str(pk) for pk in validated_data.get("remove_categories", [])}
+    known_ids = {
+        str(pk)
+        for pk in Category.objects.filter(
+            creator_id=user.pk, id__in=add_ids | remove_ids
+        ).values_list("id", flat=True)
+    }
+    if add_ids - known_ids:
+        raise ValidationError(f"Unknown categories: {sorted(add_ids - known_ids)}")
+
+    changes = {}
+    if "description" in validated_data:
+        changes["description"] = validated_data["description"]
+
+    through = Expense.categories.through
+
+    def handle_batch(ids: list) -> None:
+        # stamped per batch, not when the update started, so sync tokens
+        # issued while earlier batches ran still see the later ones
+        Expense.objects.filter(id__in=ids).update(updated_at=timezone.now(), **changes)
+        if not add_ids and not remove_ids:
+            return
+
+        batch = Expense.objects.filter(id__in=ids)
+        deltas = merge_rollup_deltas({}, rollup_from_expenses(batch), sign=-1)
+        if remove_ids:
+            through.objects.filter(
+                expense_id__in=ids, category_id__in=remove_ids
+            ).delete()
+        if add_ids:
+            through.objects.bulk_create(
+                (
+                    through(expense_id=expense_id, category_id=category_id)
+                    for expense_id in ids
+                    for category_id in add_ids
+                ),
+                ignore_conflicts=True,
+            )
+        merge_rollup_deltas(deltas, rollup_from_expenses(batch))
+        apply_rollup_deltas(deltas)
+
+    return _for_each_batch(user, filters, batch_size, handle_batch)
+
+
+def delete_expenses_with_filters(
+    user: AbstractUser, filters: dict[str, any], batch_size: int = 1000
+) -> int:
+    """
+    Delete all user's expenses matching the filters with set-based statements
+
+    Args:
+        user: User object - the authenticated user
+        filters: dict - filters, see get_expenses_with_filters
+        batch_size: int - max expenses deleted per transaction
+
+    Returns:
+        int: Number of deleted expenses
+
+    Raises:
+        ValidationError: If no filter narrows the expenses
+    """
+    through = Expense.categories.through
+
+    def handle_batch(ids: list) -> None:
+        batch = Expense.objects.filter(id__in=ids)
+        deltas = merge_rollup_deltas({}, rollup_from_expenses(batch), sign=-1)
+        through.objects.filter(expense_id__in=ids).delete()
+        # category links are already gone, nothing else references expenses,
+        # so skip the collector and issue a single DELETE
+        batch._raw_delete(batch.db)
+        apply_rollup_deltas(deltas)
+        record_tombstones(user.pk, Tombstone.EXPENSE, ids)
+
+    return _for_each_batch(user, filters, batch_size, handle_batch)
+
+
+async def aget_expenses_with_filters(
+    user: AbstractUser, filters: dict[str, any] | None = None
+) -> QuerySet[Expense]:
+    """
+    Async version of get_expenses_with_filters
+
+    Returns:
+        QuerySet: Filtered expenses for the user, to be evaluated with async
+            iteration
+    """
+    return _with_categories(_ranked(_filter_expenses(user, filters), filters))
+
+
+async def aget_expense_rows_with_filters(
+    user: AbstractUser, filters: dict[str, any] | None = None
+) -> QuerySet:
+    """
+    Async version of get_expense_rows_with_filters
+
+    Returns:
+        QuerySet: Rows to be evaluated with async iteration
+    """
+    return get_expense_rows_with_filters(user, filters)
+
+
+async def aget_categories_by_expense(
+    expense_ids: list, spent_at: list | None = None
+) -> dict[any, list[tuple]]:
+    """
+    Async version of get_categories_by_expense
+    """
+    categories = {}
+    if expense_ids:
+        async for expense_id, pk, name in _expense_categories_rows(
+            expense_ids, spent_at
+        ):
+            categories.setdefault(expense_id, []).append((pk, name))
+    return categories
+
+
+async def aget_expenses_validator(
+    user: AbstractUser, filters: dict[str, any] | None = None
+) -> tuple[datetime.datetime | None, str]:
+    """
+    Async version of get_expenses_validator
+    """
+    expenses = await _filter_expenses(user, filters).aaggregate(
+        last=Max("updated_at"), count=Count("id")
+    )
+    categories = await Category.objects.filter(creator_id=user.pk).aaggregate(
+        last=Max("updated_at"), count=Count("id")
+    )
+    return _list_validator(expenses, categories)
+
+
+async def aget_expense_validator(
+    user: AbstractUser, expense_id: str
+) -> tuple[datetime.datetime, str] | None:
+    """
+    Async version of get_expense_validator
+    """
+    rows = _expense_validator_row(user, expense_id)
+    return _detail_validator([row async for row in rows])
+
+
+async def aget_expense_by_id(user: AbstractUser, expense_id: str) -> Expense:
+    """
+    Async version of get_expense_by_id
+
+    Raises:
+        NotFound: If expense doesn't exist or doesn't belong to user
+    """
+    try:
+        return await _with_categories(Expense.objects.all()).aget(
+            id=expense_id, creator_id=user.pk
+        )
+    except Expense.DoesNotExist:
+        raise NotFound(f"Expense with id {expense_id} not found")
+
+
+async def acreate_expense(
+    user: AbstractUser, validated_data: dict[str, any]
+) -> Expense:
+    """
+    Async version of create_expense, run in a worker thread since the
+    expense, its categories and the rollup are written in one transaction
+
+    Returns:
+        Expense: The created expense object with prefetched categories
+    """
+    return await sync_to_async(
+        lambda: _prefetch_categories(create_expense(user, validated_data))
+    )()
+
+
+async def aupdate_expense(
+    user: AbstractUser, expense_id: str, validated_data: dict[str, any]
+) -> Expense:
+    """
+    Async version of update_expense, run in a worker thread since
+    transactions are not available in async code
+
+    Returns:
+        Expense: The updated expense object with prefetched categories
+    """
+    return await sync_to_async(
+        lambda: _prefetch_categories(update_expense(user, expense_id, validated_data))
+    )()
+
+
+async def adelete_expense(user: AbstractUser, expense_id: str) -> bool:
+    """
+    Async version of delete_expense, run in a worker thread since
+    transactions are not available in async code
+    """
+    return await sync_to_async(delete_expense)(user, expense_id)
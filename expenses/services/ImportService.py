@@ -0,0 +1,276 @@
+import csv
+import datetime
+import io
+import uuid
+from contextlib import nullcontext
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Iterable, Iterator
+
+from django.contrib.auth.models import AbstractUser
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from expenses.models import Category, Expense
+from .CacheService import bump_user_version
+from .CategoriesService import CACHE_NAMESPACE as CATEGORIES_CACHE_NAMESPACE
+from .RollupService import add_expense_deltas, apply_rollup_deltas
+
+
+MAX_VALUE = Decimal("99999999.99")
+MAX_CATEGORY_NAME_LENGTH = Category._meta.get_field("name").max_length
+MAX_REPORTED_ERRORS = 100
+
+
+def _parse_row(row: dict[str, str]) -> tuple[Decimal, datetime.datetime, str, list]:
+    """
+    Parse one CSV row, raises ValueError with a readable message on bad input
+    """
+    try:
+        value = Decimal(row.get("value") or "").quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError(f"invalid value {row.get('value')!r}")
+    if not value.is_finite() or abs(value) > MAX_VALUE:
+        raise ValueError(f"value {value} is out of range")
+
+    raw_spent_at = (row.get("spent_at") or "").strip()
+    spent_at = parse_datetime(raw_spent_at)
+    if spent_at is None:
+        day = parse_date(raw_spent_at)
+        if day is None:
+            raise ValueError(f"invalid spent_at {raw_spent_at!r}")
+        spent_at = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(spent_at):
+        spent_at = timezone.make_aware(spent_at)
+
+    description = row.get("description") or None
+    names = [
+        name.strip()
+        for name in (row.get("categories") or "").split(";")
+        if name.strip()
+    ]
+    if any(len(name) > MAX_CATEGORY_NAME_LENGTH for name in names):
+        raise ValueError("category name is too long")
+
+    return value, spent_at, description, list(dict.fromkeys(names))
+
+
+def _chunks(rows: Iterator, size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _resolve_categories(
+    user: AbstractUser, names: set[str], known: dict[str, str]
+) -> int:
+    """
+    Add ids of category names to known, creating missing categories
+
+    Returns:
+        int: Number of created categories
+    """
+    missing = names - known.keys()
+    if not missing:
+        return 0
+
+    for pk, name in (
+        Category.objects.filter(creator_id=user.pk, name__in=missing)
+        .order_by("created_at")
+        .values_list("id", "name")
+    ):
+        known.setdefault(name, str(pk))
+
+    created = [
+        Category(creator_id=user.pk, name=name) for name in sorted(missing - known.keys())
+    ]
+    Category.objects.bulk_create(created)
+    if created:
+        bump_user_version(CATEGORIES_CACHE_NAMESPACE, user.pk)
+    known.update((category.name, str(category.id)) for category in created)
+    return len(created)
+
+
+def _copy_rows(cursor, table: str, columns: list[str], rows: Iterable) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+    )
+
+
+def _load_with_copy(user: AbstractUser, expenses: list[tuple], links: list) -> None:
+    """
+    Load expenses and category links through temporary staging tables
+    """
+    expense_table = Expense._meta.db_table
+    through_table = Expense.categories.through._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE IF NOT EXISTS expense_import_staging "
+            "(id uuid, value numeric(10, 2), spent_at timestamptz, description text) "
+            "ON COMMIT DROP"
+        )
+        cursor.execute(
+            "CREATE TEMPORARY TABLE IF NOT EXISTS expense_import_links "
+            "(expense_id uuid, category_id uuid, spent_at timestamptz) ON COMMIT DROP"
+        )
+        cursor.execute("TRUNCATE expense_import_staging, expense_import_links")
+
+        _copy_rows(
+            cursor,
+            "expense_import_staging",
+            ["id", "value", "spent_at", "description"],
+            (
+                (pk, value, spent_at.isoformat(), description)
+                for pk, value, spent_at, description in expenses
+            ),
+        )
+        _copy_rows(
+            cursor,
+            "expense_import_links",
+            ["expense_id", "category_id", "spent_at"],
+            (
+                (expense_id, category_id, spent_at.isoformat())
+                for expense_id, category_id, spent_at in links
+            ),
+        )
+
+        # stamped per chunk like the ORM path, now() would be the start of
+        # an atomic import and older than sync tokens issued during it
+        now = timezone.now()
+        cursor.execute(
+            f"INSERT INTO {expense_table} "
+            "(id, created_at, updated_at, value, spent_at, description, creator_id) "
+            "SELECT id, %s, %s, value, spent_at, description, %s "
+            "FROM expense_import_staging",
+            [now, now, user.pk],
+        )
+        cursor.execute(
+            f"INSERT INTO {through_table} (expense_id, category_id, spent_at) "
+            "SELECT expense_id, category_id, spent_at FROM expense_import_links"
+        )
+
+
+def _load_with_orm(user: AbstractUser, expenses: list[tuple], links: list) -> None:
+    through = Expense.categories.through
+    Expense.objects.bulk_create(
+        Expense(
+            id=pk,
+            creator_id=user.pk,
+            value=value,
+            spent_at=spent_at,
+            description=description,
+        )
+        for pk, value, spent_at, description in expenses
+    )
+    through.objects.bulk_create(
+        through(expense_id=expense_id, category_id=category_id, spent_at=spent_at)
+        for expense_id, category_id, spent_at in links
+    )
+
+
+def _import_chunk(
+    user: AbstractUser,
+    chunk: list[tuple[int, dict]],
+    known_categories: dict[str, str],
+    result: dict,
+    atomic: bool,
+) -> None:
+    parsed = []
+    for line, row in chunk:
+        try:
+            parsed.append(_parse_row(row))
+        except ValueError as e:
+            if atomic:
+                raise ValidationError(f"Line {line}: {e}")
+            result["skipped"] += 1
+            if len(result["errors"]) < MAX_REPORTED_ERRORS:
+                result["errors"].append(f"Line {line}: {e}")
+
+    names = {name for *_, row_names in parsed for name in row_names}
+    result["created_categories"] += _resolve_categories(user, names, known_categories)
+
+    expenses = []
+    links = []
+    deltas = {}
+    for value, spent_at, description, row_names in parsed:
+        pk = uuid.uuid4()
+        category_ids = [known_categories[name] for name in row_names]
+        expenses.append((pk, value, spent_at, description))
+        links.extend((pk, category_id, spent_at) for category_id in category_ids)
+        add_expense_deltas(deltas, user.pk, category_ids, spent_at, value)
+
+    if connection.vendor == "postgresql":
+        _load_with_copy(user, expenses, links)
+    else:
+        _load_with_orm(user, expenses, links)
+
+    apply_rollup_deltas(deltas)
+    result["imported"] += len(expenses)
+
+
+def import_expenses_csv(
+    user: AbstractUser,
+    lines: Iterable[str],
+    atomic: bool = False,
+    chunk_size: int = 10000,
+    progress: Callable[[dict], None] | None = None,
+) -> dict[str, any]:
+    """
+    Import expenses from CSV with the columns value, spent_at and optionally
+    description and categories (category names separated by ";")
+
+    The file is parsed in a streaming fashion, chunk_size rows at a time.
+    Category names are resolved with one query per chunk and missing
+    categories are created. On PostgreSQL rows are loaded with COPY into
+    temporary staging tables and moved with INSERT ... SELECT.
+
+    Args:
+        user: User object - owner of imported expenses
+        lines: Iterable - lines of the CSV file including the header
+        atomic: bool - import everything in one transaction and stop at the
+            first invalid row, otherwise every chunk is committed separately
+            and invalid rows are skipped
+        chunk_size: int - rows loaded per COPY
+        progress: callable - called with the result so far after every chunk
+
+    Returns:
+        dict: imported, skipped and created_categories counts and errors
+
+    Raises:
+        ValidationError: If the header is invalid, the file can't be decoded
+            or parsed as CSV, or any row is invalid in atomic mode
+    """
+    reader = csv.DictReader(lines)
+    result = {"imported": 0, "skipped": 0, "created_categories": 0, "errors": []}
+    known_categories = {}
+    rows = ((reader.line_num, row) for row in reader)
+
+    try:
+        if not reader.fieldnames or not {"value", "spent_at"} <= set(reader.fieldnames):
+            raise ValidationError("CSV header must contain value and spent_at columns")
+
+        with transaction.atomic() if atomic else nullcontext():
+            for chunk in _chunks(rows, chunk_size):
+                with transaction.atomic():
+                    _import_chunk(user, chunk, known_categories, result, atomic)
+                if progress:
+                    progress(result)
+    except (UnicodeDecodeError, csv.Error) as e:
+        # lines are decoded and split while they are read, so a broken file
+        # fails in the middle of the import, chunks before it stay imported
+        # unless atomic
+        raise ValidationError(
+            f"Unreadable CSV after line {reader.line_num}: {e}, "
+            f"{0 if atomic else result['imported']} expenses imported"
+        )
+
+    return result
@@ -0,0 +1,268 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from expenses.backends.postgresql_pool.base import get_pool_stats
+from .CacheService import get_cache_stats
+
+# upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# ConnectionPool.stats() key -> (metric name, type, help)
+POOL_METRICS = {
+    "size": ("expenses_db_pool_connections", "gauge", "Open connections."),
+    "idle": ("expenses_db_pool_idle_connections", "gauge", "Idle connections."),
+    "max_size": ("expenses_db_pool_max_connections", "gauge", "Pool size limit."),
+    "waiting": (
+        "expenses_db_pool_waiting",
+        "gauge",
+        "Threads waiting for a connection.",
+    ),
+    "acquired": (
+        "expenses_db_pool_acquired_total",
+        "counter",
+        "Connections handed out.",
+    ),
+    "created": ("expenses_db_pool_created_total", "counter", "Connections opened."),
+    "closed": ("expenses_db_pool_closed_total", "counter", "Connections closed."),
+    "timeouts": (
+        "expenses_db_pool_timeouts_total",
+        "counter",
+        "Acquisitions that timed out.",
+    ),
+    "wait_seconds": (
+        "expenses_db_pool_wait_seconds_total",
+        "counter",
+        "Time spent waiting for a connection.",
+    ),
+}
+
+
+class _Series:
+    """Latency histogram, DB time and queries of one route and method"""
+
+    __slots__ = ("buckets", "seconds", "db_seconds", "queries")
+
+    def __init__(self):
+        # one more bucket for requests slower than the last bound
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.seconds = 0.0
+        self.db_seconds = 0.0
+        self.queries = 0
+
+
+# label values of known request methods, any other method is counted as
+# "other" so clients can't add series
+HTTP_METHODS = frozenset(
+    ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE", "CONNECT"]
+)
+
+
+class _Shard:
+    """Metrics recorded by one thread, only ever written by that thread"""
+
+    def __init__(self):
+        self.series: dict[tuple[str, str], _Series] = {}
+        self.responses: dict[tuple[str, str, int], int] = defaultdict(int)
+
+    def merge(self, other: "_Shard") -> None:
+        # copying a dict is atomic, iterating one that its thread is adding
+        # to is not
+        for key, own in other.series.copy().items():
+            total = self.series.get(key)
+            if total is None:
+                total = self.series[key] = _Series()
+            total.buckets = [a + b for a, b in zip(total.buckets, own.buckets)]
+            total.seconds += own.seconds
+            total.db_seconds += own.db_seconds
+            total.queries += own.queries
+        for key, count in other.responses.copy().items():
+            self.responses[key] += count
+
+
+_local = threading.local()
+_shards_lock = threading.Lock()
+_shards: dict[threading.Thread, _Shard] = {}
+# metrics of threads which have finished
+_retired = _Shard()
+
+
+def _retire_finished_shards() -> None:
+    # called with _shards_lock held, a finished thread never writes its
+    # shard again, so servers starting a thread per request keep one shard
+    # per live thread
+    for thread in [thread for thread in _shards if not thread.is_alive()]:
+        _retired.merge(_shards.pop(thread))
+
+
+def _shard() -> _Shard:
+    shard = getattr(_local, "shard", None)
+    if shard is None:
+        shard = _local.shard = _Shard()
+        with _shards_lock:
+            _retire_finished_shards()
+            _shards[threading.current_thread()] = shard
+    return shard
+
+
+def record_request(
+    route: str,
+    method: str,
+    status: int,
+    seconds: float,
+    db_seconds: float,
+    queries: int,
+) -> None:
+    """
+    Count a finished request in the metrics of this process
+
+    Every thread records into its own shard, so recording takes no lock.
+    Shards are summed up when the metrics are read, shards of finished
+    threads are merged into one. Under ASGI all requests are recorded by
+    the event loop thread.
+
+    Args:
+        route: str - URL pattern of the view, bounded set of label values
+        method: str - HTTP method, other than HTTP_METHODS counted as "other"
+        status: int - response status code
+        seconds: float - wall time of the request
+        db_seconds: float - time spent in database queries
+        queries: int - number of database queries
+    """
+    if method not in HTTP_METHODS:
+        method = "other"
+
+    shard = _shard()
+    series = shard.series.get((route, method))
+    if series is None:
+        series = shard.series[(route, method)] = _Series()
+
+    series.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    series.seconds += seconds
+    series.db_seconds += db_seconds
+    series.queries += queries
+    shard.responses[(route, method, status)] += 1
+
+
+def _collect() -> tuple[dict, dict]:
+    total = _Shard()
+    with _shards_lock:
+        _retire_finished_shards()
+        total.merge(_retired)
+        shards = list(_shards.values())
+
+    for shard in shards:
+        total.merge(shard)
+    return total.series, total.responses
+
+
+def _labels(**labels) -> str:
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for value in labels.values()
+    )
+    return ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped))
+
+
+def _metric(lines: list[str], name: str, kind: str, help: str) -> None:
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def render_metrics() -> str:
+    """
+    Render the request, cache and connection pool metrics of this process
+    in the Prometheus text exposition format
+
+    Returns:
+        str: Metrics, one sample per line
+    """
+    series, responses = _collect()
+    lines = []
+
+    _metric(
+        lines,
+        "http_request_duration_seconds",
+        "histogram",
+        "Wall time of requests by route and method.",
+    )
+    for (route, method), totals in sorted(series.items()):
+        cumulative = 0
+        for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), totals.buckets):
+            cumulative += count
+            labels = _labels(route=route, method=method, le=bound)
+            lines.append(
+                f"http_request_duration_seconds_bucket{{{labels}}} {cumulative}"
+            )
+        labels = _labels(route=route, method=method)
+        lines.append(f"http_request_duration_seconds_sum{{{labels}}} {totals.seconds}")
+        lines.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+    _metric(
+        lines,
+        "http_request_db_duration_seconds_total",
+        "counter",
+        "Time spent in database queries by route and method.",
+    )
+    for (route, method), totals in sorted(series.items()):
+        labels = _labels(route=route, method=method)
+        lines.append(
+            f"http_request_db_duration_seconds_total{{{labels}}} {totals.db_seconds}"
+        )
+
+    _metric(
+        lines,
+        "http_request_db_queries_total",
+        "counter",
+        "Database queries by route and method.",
+    )
+    for (route, method), totals in sorted(series.items()):
+        labels = _labels(route=route, method=method)
+        lines.append(f"http_request_db_queries_total{{{labels}}} {totals.queries}")
+
+    _metric(
+        lines,
+        "http_responses_total",
+        "counter",
+        "Responses by route, method and status code.",
+    )
+    for (route, method, status), count in sorted(responses.items()):
+        labels = _labels(route=route, method=method, status=status)
+        lines.append(f"http_responses_total{{{labels}}} {count}")
+
+    _metric(
+        lines,
+        "http_request_errors_total",
+        "counter",
+        "Responses with a 5xx status code by route and method.",
+    )
+    errors: dict[tuple[str, str], int] = defaultdict(int)
+    for (route, method, status), count in responses.items():
+        if status >= 500:
+            errors[(route, method)] += count
+    for (route, method), count in sorted(errors.items()):
+        lines.append(
+            f"http_request_errors_total{{{_labels(route=route, method=method)}}} {count}"
+        )
+
+    _metric(
+        lines,
+        "expenses_cache_requests_total",
+        "counter",
+        "Cache lookups by namespace and result.",
+    )
+    for namespace, counters in sorted(get_cache_stats().items()):
+        for result, key in (("hit", "hits"), ("miss", "misses")):
+            labels = _labels(namespace=namespace, result=result)
+            lines.append(f"expenses_cache_requests_total{{{labels}}} {counters[key]}")
+
+    # empty unless the pooled backend is used
+    pools = sorted(get_pool_stats().items())
+    for key, (name, kind, help) in POOL_METRICS.items():
+        if not pools:
+            break
+        _metric(lines, name, kind, help)
+        for alias, stats in pools:
+            lines.append(f"{name}{{{_labels(alias=alias)}}} {stats[key]}")
+
+    return "\n".join(lines) + "\n"
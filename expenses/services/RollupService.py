@@ -0,0 +1,265 @@
+import datetime
+import uuid
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable, Iterator
+
+from django.db import connections, router
+from django.db.models import Count, QuerySet, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from expenses.models import DailySpending, Expense
+
+
+RollupKey = tuple[int, str | None, datetime.date]
+RollupDeltas = dict[RollupKey, list]
+
+
+def expense_day(spent_at: datetime.datetime) -> datetime.date:
+    """
+    Get the rollup day of an expense, in the current time zone like TruncDate
+
+    Args:
+        spent_at: datetime - when the expense occurred
+
+    Returns:
+        date: Day the expense is counted in
+    """
+    if timezone.is_aware(spent_at):
+        spent_at = timezone.localtime(spent_at)
+    return spent_at.date()
+
+
+def add_expense_deltas(
+    deltas: RollupDeltas,
+    creator_id: int,
+    category_ids: Iterable,
+    spent_at: datetime.datetime,
+    value: Decimal,
+    sign: int = 1,
+) -> RollupDeltas:
+    """
+    Accumulate the rollup contribution of one expense
+
+    Args:
+        deltas: dict - accumulated deltas keyed by (creator_id, category_id, day)
+        creator_id: int - id of the expense creator
+        category_ids: Iterable - ids of the expense categories
+        spent_at: datetime - when the expense occurred
+        value: Decimal - expense amount
+        sign: int - 1 to add the expense, -1 to remove it
+
+    Returns:
+        dict: The same deltas dict, for chaining
+    """
+    day = expense_day(spent_at)
+    category_ids = list(category_ids) or [None]
+    for category_id in category_ids:
+        key = (creator_id, str(category_id) if category_id else None, day)
+        delta = deltas.setdefault(key, [Decimal(0), 0])
+        delta[0] += sign * Decimal(value)
+        delta[1] += sign
+
+    return deltas
+
+
+def merge_rollup_deltas(
+    deltas: RollupDeltas, rows: RollupDeltas, sign: int = 1
+) -> RollupDeltas:
+    """
+    Accumulate aggregated rollup rows, e.g. from rollup_from_expenses
+
+    Args:
+        deltas: dict - accumulated deltas keyed by (creator_id, category_id, day)
+        rows: dict - (total, count) keyed the same way
+        sign: int - 1 to add the rows, -1 to remove them
+
+    Returns:
+        dict: The same deltas dict, for chaining
+    """
+    for key, (total, count) in rows.items():
+        delta = deltas.setdefault(key, [Decimal(0), 0])
+        delta[0] += sign * total
+        delta[1] += sign * count
+
+    return deltas
+
+
+def _batches(rows: list, size: int) -> Iterator[list]:
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+def _values_list(connection, names: list[str], rows: Iterable[list]) -> tuple:
+    """
+    Render rows as a VALUES list, each value prepared for the database like
+    the DailySpending field of its position
+    """
+    fields = [DailySpending._meta.get_field(name) for name in names]
+    row_sql = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    rows_sql = []
+    params = []
+    for row in rows:
+        rows_sql.append(row_sql)
+        params.extend(
+            field.get_db_prep_value(value, connection)
+            for field, value in zip(fields, row)
+        )
+    return ", ".join(rows_sql), params
+
+
+def _upsert_rollup_rows(
+    cursor, connection, rows: list[tuple], categorized: bool
+) -> None:
+    """
+    Add (creator_id, category_id, day, total, count) rows to the rollup with
+    one INSERT ... ON CONFLICT, conflicting on daily_spending_unique or, for
+    the empty category, on daily_spending_uncategorized_unique
+    """
+    now = timezone.now()
+    names = ["id", "created_at", "updated_at", "creator", "day", "total", "count"]
+    if categorized:
+        names.append("category")
+        target = "(creator_id, category_id, day)"
+    else:
+        target = "(creator_id, day) WHERE category_id IS NULL"
+    values, params = _values_list(
+        connection,
+        names,
+        (
+            [uuid.uuid4(), now, now, creator_id, day, total, count, category_id]
+            for creator_id, category_id, day, total, count in rows
+        ),
+    )
+
+    table = DailySpending._meta.db_table
+    category = "column8" if categorized else "NULL"
+    # WHERE true keeps SQLite from reading ON CONFLICT as a join constraint
+    cursor.execute(
+        f"INSERT INTO {table} "
+        "(id, created_at, updated_at, creator_id, day, total, count, category_id) "
+        "SELECT column1, column2, column3, column4, column5, column6, column7, "
+        f"{category} FROM (VALUES {values}) AS deltas WHERE true "
+        f"ON CONFLICT {target} DO UPDATE SET "
+        f"total = {table}.total + EXCLUDED.total, "
+        f"count = {table}.count + EXCLUDED.count, "
+        "updated_at = EXCLUDED.updated_at",
+        params,
+    )
+
+
+def _subtract_rollup_rows(
+    cursor, connection, rows: list[tuple], categorized: bool
+) -> None:
+    """
+    Add (creator_id, category_id, day, total, count) rows with a negative
+    count to their existing rollup rows with one UPDATE ... FROM
+
+    Not an upsert: its proposed row would fail the count >= 0 check before
+    the conflict is found, and rows of removed expenses always exist.
+    """
+    names = ["creator", "day", "total", "count"]
+    if categorized:
+        names.append("category")
+        category = "category_id = deltas.column5"
+    else:
+        category = "category_id IS NULL"
+    values, params = _values_list(
+        connection,
+        names,
+        (
+            [creator_id, day, total, count, category_id]
+            for creator_id, category_id, day, total, count in rows
+        ),
+    )
+
+    table = DailySpending._meta.db_table
+    updated_at = DailySpending._meta.get_field("updated_at")
+    cursor.execute(
+        f"UPDATE {table} SET "
+        f"total = {table}.total + deltas.column3, "
+        f"count = {table}.count + deltas.column4, "
+        "updated_at = %s "
+        f"FROM (VALUES {values}) AS deltas "
+        f"WHERE {table}.creator_id = deltas.column1 "
+        f"AND {table}.day = deltas.column2 AND {table}.{category}",
+        [updated_at.get_db_prep_value(timezone.now(), connection), *params],
+    )
+
+
+def apply_rollup_deltas(deltas: RollupDeltas, batch_size: int = 1000) -> None:
+    """
+    Apply accumulated deltas to DailySpending rows with set-based statements
+
+    Must be called inside the transaction that changes the expenses.
+    Rows are updated with `total = total + delta`, so concurrent writers
+    never lose each other's changes. Deltas which add expenses are
+    upserted with INSERT ... ON CONFLICT, deltas which remove expenses
+    update the existing rows, one statement per batch_size keys of each
+    kind. Rows which drop to zero expenses are removed with one DELETE.
+
+    Args:
+        deltas: dict - deltas keyed by (creator_id, category_id, day)
+        batch_size: int - max keys per statement
+    """
+    groups = defaultdict(list)
+    for (creator_id, category_id, day), (total, count) in deltas.items():
+        if total or count:
+            groups[(category_id is not None, count < 0)].append(
+                (creator_id, category_id, day, total, count)
+            )
+    if not groups:
+        return
+
+    connection = connections[router.db_for_write(DailySpending)]
+    with connection.cursor() as cursor:
+        for (categorized, removed), rows in groups.items():
+            apply = _subtract_rollup_rows if removed else _upsert_rollup_rows
+            for batch in _batches(rows, batch_size):
+                apply(cursor, connection, batch, categorized)
+
+    emptied = groups[(True, True)] + groups[(False, True)]
+    if emptied:
+        # other keys of these creators and days never have zero expenses
+        DailySpending.objects.filter(
+            creator_id__in={row[0] for row in emptied},
+            day__in={row[2] for row in emptied},
+            count=0,
+        ).delete()
+
+
+def rollup_from_expenses(expenses: QuerySet[Expense]) -> RollupDeltas:
+    """
+    Compute rollup rows of the given expenses with two aggregate queries
+
+    Args:
+        expenses: QuerySet - expenses to aggregate
+
+    Returns:
+        dict: (total, count) keyed by (creator_id, category_id, day)
+    """
+    rows: RollupDeltas = defaultdict(lambda: [Decimal(0), 0])
+    expense_ids = expenses.values("id")
+
+    categorized = (
+        Expense.categories.through.objects.filter(expense_id__in=expense_ids)
+        .annotate(day=TruncDate("expense__spent_at"))
+        .values_list("expense__creator_id", "category_id", "day")
+        .annotate(total=Sum("expense__value"), count=Count("expense_id"))
+        .order_by()
+    )
+    for creator_id, category_id, day, total, count in categorized:
+        rows[(creator_id, str(category_id), day)] = [total, count]
+
+    uncategorized = (
+        Expense.objects.filter(id__in=expense_ids, categories__isnull=True)
+        .annotate(day=TruncDate("spent_at"))
+        .values_list("creator_id", "day")
+        .annotate(total=Sum("value"), count=Count("id"))
+        .order_by()
+    )
+    for creator_id, day, total, count in uncategorized:
+        rows[(creator_id, None, day)] = [total, count]
+
+    return rows
@@ -0,0 +1,113 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connections
+from django.db.models import Expression, FloatField, Q, QuerySet, Value
+from django.db.models.expressions import Col
+from django.db.models.functions import Cast
+
+
+# text search configuration of the description_search column, see migration
+# 0005_expense_description_search: no stemming or stop words, descriptions
+# are in any language
+SEARCH_CONFIG = "simple"
+
+# letters and digits, other characters separate words like in to_tsvector
+_WORD = re.compile(r"[^\W_]+")
+
+
+def search_words(text: str) -> list[str]:
+    """
+    Split a search text into lowercase words
+
+    Args:
+        text: str - text typed by the user
+
+    Returns:
+        list: Words, empty if the text has no letters or digits
+    """
+    return _WORD.findall(text.lower())
+
+
+# generated column created by migration 0005, not a model field, so the
+# ORM never writes to it
+_description_search = SearchVectorField()
+_description_search.set_attributes_from_name("description_search")
+
+
+class _DescriptionVector(Expression):
+    """
+    The description_search column of the expenses of a query, resolved
+    like a field reference so it is relabeled when the query becomes a
+    subquery
+    """
+
+    output_field = _description_search
+
+    def resolve_expression(self, query=None, *args, **kwargs):
+        return Col(query.get_initial_alias(), _description_search)
+
+
+def _search_query(words: list[str]) -> SearchQuery:
+    # every word must match, the last one as a prefix for type-ahead
+    terms = [*words[:-1], f"{words[-1]}:*"]
+    return SearchQuery(" & ".join(terms), search_type="raw", config=SEARCH_CONFIG)
+
+
+def _is_postgresql(queryset: QuerySet) -> bool:
+    return connections[queryset.db].vendor == "postgresql"
+
+
+def search_descriptions(queryset: QuerySet, text: str) -> QuerySet:
+    """
+    Filter expenses to those whose description contains all words of the
+    text, the last word as a prefix
+
+    On PostgreSQL the match uses the GIN-indexed description_search
+    column, other databases fall back to a case-insensitive substring
+    match of every word.
+
+    Args:
+        queryset: QuerySet - expenses
+        text: str - search text, ignored if it has no words
+
+    Returns:
+        QuerySet: Matching expenses
+    """
+    words = search_words(text)
+    if not words:
+        return queryset
+
+    if _is_postgresql(queryset):
+        return queryset.alias(description_search=_DescriptionVector()).filter(
+            description_search=_search_query(words)
+        )
+
+    match = Q()
+    for word in words:
+        match &= Q(description__icontains=word)
+    return queryset.filter(match)
+
+
+def annotate_search_rank(queryset: QuerySet, text: str) -> QuerySet:
+    """
+    Annotate expenses filtered with search_descriptions with the `rank` of
+    their description for the same text, higher is more relevant
+
+    Args:
+        queryset: QuerySet - expenses
+        text: str - search text
+
+    Returns:
+        QuerySet: Expenses with a float `rank`, 0 without PostgreSQL
+    """
+    words = search_words(text)
+    if words and _is_postgresql(queryset):
+        # ts_rank is a real, as double precision it survives the round trip
+        # through pagination cursors exactly
+        rank = Cast(
+            SearchRank(_DescriptionVector(), _search_query(words)), FloatField()
+        )
+    else:
+        rank = Value(0.0, output_field=FloatField())
+    return queryset.annotate(rank=rank)
@@ -0,0 +1,122 @@
+import datetime
+from typing import Iterable
+
+from django.conf import settings
+from django.contrib.auth.models import AbstractUser
+from django.core import signing
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from expenses.models import Category, Expense, Tombstone
+from .TransactionService import read_only_snapshot
+
+
+TOKEN_SALT = "expenses.sync"
+
+
+class SyncTokenExpired(Exception):
+    """Token is older than the kept tombstones, client has to resync fully"""
+
+
+def record_tombstones(user_id: int, kind: str, object_ids: Iterable) -> None:
+    """
+    Remember deleted objects for delta sync
+
+    Args:
+        user_id: int - owner of deleted objects
+        kind: str - Tombstone.EXPENSE or Tombstone.CATEGORY
+        object_ids: Iterable - IDs of deleted objects
+    """
+    Tombstone.objects.bulk_create(
+        Tombstone(creator_id=user_id, kind=kind, object_id=object_id)
+        for object_id in object_ids
+    )
+
+
+def _issue_token(user: AbstractUser, since: datetime.datetime) -> str:
+    return signing.dumps({"u": user.pk, "t": since.isoformat()}, salt=TOKEN_SALT)
+
+
+def _read_token(user: AbstractUser, token: str) -> datetime.datetime:
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        raise ValidationError("Invalid sync token")
+
+    since = parse_datetime(payload.get("t") or "")
+    if payload.get("u") != user.pk or since is None:
+        raise ValidationError("Invalid sync token")
+    return since
+
+
+def get_changes_since(user: AbstractUser, token: str | None = None) -> dict[str, any]:
+    """
+    Get expenses and categories changed since the sync token was issued
+
+    Every row is matched by its updated_at, tombstones by their deletion
+    time. All of them are read from one read-only snapshot. The new token
+    points SYNC_OVERLAP_SECONDS before the current time, so rows written
+    by transactions which commit after this call are sent again by the
+    next one. Clients must treat changes as upserts.
+
+    Args:
+        user: User object - the authenticated user
+        token: str | None - token from the previous sync, None for a full sync
+
+    Returns:
+        dict: token, changed expenses (with prefetched categories),
+            changed categories and IDs of deleted expenses and categories
+
+    Raises:
+        ValidationError: If the token is malformed or issued for another user
+        SyncTokenExpired: If tombstones since the token were already pruned
+    """
+    now = timezone.now()
+    since = _read_token(user, token) if token else None
+    retention = datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    if since is not None and since < now - retention:
+        raise SyncTokenExpired()
+
+    expenses = Expense.objects.filter(creator_id=user.pk).prefetch_related(
+        Prefetch("categories", queryset=Category.objects.only("id", "name"))
+    )
+    categories = Category.objects.filter(creator_id=user.pk)
+    tombstones = Tombstone.objects.filter(creator_id=user.pk)
+    if since is not None:
+        expenses = expenses.filter(updated_at__gte=since)
+        categories = categories.filter(updated_at__gte=since)
+        tombstones = tombstones.filter(created_at__gte=since)
+    else:
+        tombstones = tombstones.none()
+
+    deleted = {Tombstone.EXPENSE: [], Tombstone.CATEGORY: []}
+    with read_only_snapshot():
+        for kind, object_id in tombstones.values_list("kind", "object_id"):
+            deleted[kind].append(object_id)
+        expenses = list(expenses.order_by("updated_at", "id"))
+        categories = list(categories.order_by("updated_at", "id"))
+
+    overlap = datetime.timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+    return {
+        "token": _issue_token(user, now - overlap),
+        "expenses": expenses,
+        "categories": categories,
+        "deleted_expenses": deleted[Tombstone.EXPENSE],
+        "deleted_categories": deleted[Tombstone.CATEGORY],
+    }
+
+
+def prune_tombstones() -> int:
+    """
+    Delete tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS
+
+    Returns:
+        int: Number of deleted tombstones
+    """
+    retention = datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = Tombstone.objects.filter(
+        created_at__lt=timezone.now() - retention
+    ).delete()
+    return deleted
@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+from django.db import connections, router, transaction
+from django.db.models import Model
+
+from expenses.models import Expense
+from expenses.routers import reading_from
+
+
+@contextmanager
+def read_only_snapshot(model: type[Model] = Expense) -> Iterator[str]:
+    """
+    Run several reads against one consistent snapshot of the database
+
+    Single reads don't need this, they run in autocommit mode. On
+    PostgreSQL the transaction is REPEATABLE READ READ ONLY, so every
+    query inside sees the data committed before the first one. The
+    transaction is opened on the database reads of the model are routed
+    to, which may be a replica.
+
+    Args:
+        model: Model - model whose read database is used
+
+    Yields:
+        str: Alias of the database the transaction runs on
+    """
+    using = router.db_for_read(model)
+    connection = connections[using]
+    # the isolation level can only be set by the outermost transaction
+    outermost = not connection.in_atomic_block
+    with reading_from(using), transaction.atomic(using=using):
+        if outermost and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY"
+                )
+        yield using
@@ -3,28 +3,88 @@
 from .CategoriesService import (
     get_categories,
     get_category_by_id,
+    get_categories_validator,
+    get_category_validator,
     create_category,
     update_category,
     delete_category,
+    aget_categories,
+    aget_category_by_id,
+    aget_categories_validator,
+    aget_category_validator,
+    acreate_category,
+    aupdate_category,
+    adelete_category,
 )
 from .ExpensesService import (
     get_expenses_with_filters,
+    get_expense_rows_with_filters,
+    get_categories_by_expense,
+    iterate_expenses_with_filters,
+    get_expenses_summary,
     get_expense_by_id,
+    get_expenses_validator,
+    get_expense_validator,
     create_expense,
+    create_expenses_batch,
     update_expense,
+    update_expenses_with_filters,
     delete_expense,
+    delete_expenses_with_filters,
+    aget_expenses_with_filters,
+    aget_expense_rows_with_filters,
+    aget_categories_by_expense,
+    aget_expense_by_id,
+    aget_expenses_validator,
+    aget_expense_validator,
+    acreate_expense,
+    aupdate_expense,
+    adelete_expense,
 )
+from .ImportService import import_expenses_csv
+from .SyncService import SyncTokenExpired, get_changes_since, prune_tombstones
 
 
 __all__ = [
     "get_expenses_with_filters",
+    "get_expense_rows_with_filters",
+    "get_categories_by_expense",
+    "iterate_expenses_with_filters",
+    "get_expenses_summary",
     "get_expense_by_id",
+    "get_expenses_validator",
+    "get_expense_validator",
     "create_expense",
+    "create_expenses_batch",
     "update_expense",
+    "update_expenses_with_filters",
     "delete_expense",
+    "delete_expenses_with_filters",
+    "aget_expenses_with_filters",
+    "aget_expense_rows_with_filters",
+    "aget_categories_by_expense",
+    "aget_expense_by_id",
+    "aget_expenses_validator",
+    "aget_expense_validator",
+    "acreate_expense",
+    "aupdate_expense",
+    "adelete_expense",
+    "import_expenses_csv",
+    "SyncTokenExpired",
+    "get_changes_since",
+    "prune_tombstones",
     "get_categories",
     "get_category_by_id",
+    "get_categories_validator",
+    "get_category_validator",
     "create_category",
     "update_category",
     "delete_category",
+    "aget_categories",
+    "aget_category_by_id",
+    "aget_categories_validator",
+    "aget_category_validator",
+    "acreate_category",
+    "aupdate_category",
+    "adelete_category",
 ]
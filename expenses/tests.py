@@ -1,3 +1,1196 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from io import StringIO
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import msgpack
+import psycopg2
+from asgiref.sync import sync_to_async
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Prefetch
+from django.db.utils import load_backend
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from expenses import routers
+from expenses.backends.postgresql_pool.pool import ConnectionPool, PoolTimeout
+from expenses.models import (
+    Category,
+    DailySpending,
+    Expense,
+    ExpenseCategory,
+    Tombstone,
+)
+from expenses.pagination import KeysetPagination
+from expenses.serializers import ExpensesReadSerializer
+from expenses.services import (
+    get_categories,
+    get_category_by_id,
+    get_expense_rows_with_filters,
+)
+from expenses.services import MetricsService
+from expenses.services.CacheService import get_user_version
+from expenses.services.CategoriesService import (
+    CACHE_NAMESPACE as CATEGORIES_CACHE_NAMESPACE,
+)
+from expenses.services.RollupService import (
+    add_expense_deltas,
+    apply_rollup_deltas,
+    merge_rollup_deltas,
+)
+from expenses.views import (
+    AsyncCategoriesApiView,
+    AsyncExpensesApiView,
+    ExpensesExportApiView,
+)
+
+
+User = get_user_model()
+
+
+class ExpensesQueryCountTests(TestCase):
+    """Listing expenses must not issue one categories query per expense"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.categories = [
+            Category.objects.create(name=f"category {i}", creator=self.user)
+            for i in range(3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_expenses(self, count: int) -> list[Expense]:
+        now = timezone.now()
+        expenses = []
+        for i in range(count):
+            expense = Expense.objects.create(
+                value=Decimal(i + 1),
+                spent_at=now - datetime.timedelta(hours=i),
+                creator=self.user,
+            )
+            expense.categories.set(self.categories)
+            expenses.append(expense)
+        return expenses
+
+    def count_queries(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_does_not_grow_with_expenses(self):
+        self.create_expenses(2)
+        few = self.count_queries("/api/expenses/")
+
+        self.create_expenses(40)
+        many = self.count_queries("/api/expenses/")
+
+        self.assertEqual(few, many)
+
+    def test_filtered_list_query_count_does_not_grow_with_expenses(self):
+        url = f"/api/expenses/?categories={self.categories[0].id}"
+        self.create_expenses(2)
+        few = self.count_queries(url)
+
+        self.create_expenses(40)
+        many = self.count_queries(url)
+
+        self.assertEqual(few, many)
+
+    def test_detail_loads_categories_with_prefetch(self):
+        expense = self.create_expenses(1)[0]
+        response = self.client.get(f"/api/expenses/{expense.id}/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(c["id"] for c in response.json()["categories"]),
+            sorted(str(c.id) for c in self.categories),
+        )
+
+
+class ExpensesPaginationTests(TestCase):
+    """Cursors page through expenses by (spent_at, id) in both directions"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        # three expenses share spent_at, their order comes from id
+        for hours in [0, 1, 1, 1, 2, 3, 4]:
+            Expense.objects.create(
+                value=Decimal(1),
+                spent_at=now - datetime.timedelta(hours=hours),
+                description="coffee and coffee" if hours % 2 else "coffee",
+                creator=self.user,
+            )
+
+    def get_pages(self, url: str, link: str = "next") -> list[list[str]]:
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([expense["id"] for expense in response.json()["results"]])
+            url = response.json()[link]
+        return pages
+
+    def test_pages_forward_and_back(self):
+        expected = [
+            str(pk)
+            for pk in Expense.objects.order_by("-spent_at", "-id").values_list(
+                "id", flat=True
+            )
+        ]
+
+        pages = self.get_pages("/api/expenses/?page_size=2")
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+        last = self.client.get("/api/expenses/?page_size=2")
+        for _ in range(3):
+            last = self.client.get(last.json()["next"])
+        back = self.get_pages(last.json()["previous"], link="previous")
+        self.assertEqual(back, pages[-2::-1])
+
+    def test_search_cursors_carry_the_rank(self):
+        pages = self.get_pages("/api/expenses/?q=coffee&page_size=3")
+        self.assertEqual(len(set(sum(pages, []))), 7)
+
+        response = self.client.get("/api/expenses/?q=coffee&page_size=3")
+        response = self.client.get(response.json()["next"])
+        back = self.client.get(response.json()["previous"]).json()
+        self.assertEqual([expense["id"] for expense in back["results"]], pages[0])
+
+    def test_invalid_cursor_or_page_size_is_rejected(self):
+        tampered = base64.urlsafe_b64encode(b'{"s":"2024-01-01T00:00:00Z"}').decode()
+        for query in [
+            "cursor=not-a-cursor",
+            f"cursor={tampered}",
+            "page_size=0",
+            "page_size=ten",
+        ]:
+            with self.subTest(query=query):
+                response = self.client.get(f"/api/expenses/?{query}")
+                self.assertEqual(response.status_code, 400)
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(KeysetPagination, "max_page_size", 3):
+            response = self.client.get("/api/expenses/?page_size=1000")
+
+        self.assertEqual(len(response.json()["results"]), 3)
+        self.assertIsNotNone(response.json()["next"])
+
+
+class DailySpendingRollupTests(TestCase):
+    """Service writes must keep the rollup equal to a rebuild from raw rows"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.food = self.create_category("food")
+        self.rent = self.create_category("rent")
+
+    def create_category(self, name: str) -> str:
+        response = self.client.post("/api/categories/", {"name": name}, format="json")
+        return response.json()["id"]
+
+    def create_expense(self, value: str, spent_at: str, categories: list) -> str:
+        response = self.client.post(
+            "/api/expenses/",
+            {"value": value, "spent_at": spent_at, "categories": categories},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()["id"]
+
+    def assertRollupConsistent(self):
+        call_command("rebuild_spending_rollup", "--check", stdout=StringIO())
+
+    def test_rollup_follows_expense_and_category_writes(self):
+        first = self.create_expense("10.50", "2024-01-01T10:00:00Z", [self.food])
+        second = self.create_expense(
+            "4.00", "2024-01-01T12:00:00Z", [self.food, self.rent]
+        )
+        self.create_expense("1.25", "2024-01-02T12:00:00Z", [])
+        self.assertRollupConsistent()
+
+        food_day = DailySpending.objects.get(category_id=self.food)
+        self.assertEqual(food_day.total, Decimal("14.50"))
+        self.assertEqual(food_day.count, 2)
+
+        self.client.put(
+            f"/api/expenses/{first}/",
+            {"value": "3.00", "spent_at": "2024-02-01T10:00:00Z"},
+            format="json",
+        )
+        self.assertRollupConsistent()
+
+        self.client.delete(f"/api/expenses/{second}/")
+        self.assertRollupConsistent()
+
+        self.client.delete(f"/api/categories/{self.food}/")
+        self.assertRollupConsistent()
+        self.assertFalse(DailySpending.objects.filter(count=0).exists())
+
+    def test_deltas_are_applied_with_set_based_statements(self):
+        added = {}
+        for day in range(1, 29):
+            spent_at = datetime.datetime(2024, 2, day, tzinfo=datetime.timezone.utc)
+            add_expense_deltas(added, self.user.pk, [self.food], spent_at, 2)
+            add_expense_deltas(added, self.user.pk, [], spent_at, 3)
+        removed = merge_rollup_deltas({}, added, sign=-1)
+
+        # one upsert per kind of category, whether the rows exist or not,
+        # then one update per kind and a single delete of the emptied rows
+        for _ in range(2):
+            with self.assertNumQueries(2):
+                apply_rollup_deltas(added)
+        self.assertEqual(DailySpending.objects.filter(count=2).count(), 56)
+        with self.assertNumQueries(3):
+            apply_rollup_deltas(merge_rollup_deltas(removed, removed))
+        self.assertFalse(DailySpending.objects.exists())
+
+
+class ExpensesSummaryTests(TestCase):
+    """Summary rows aggregate the filtered expenses of every category"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.food = Category.objects.create(name="food", creator=self.user)
+        self.rent = Category.objects.create(name="rent", creator=self.user)
+        other = User.objects.create_user(username="other", password="other")
+        for creator, day, value, categories in [
+            (self.user, 1, "10.00", [self.food]),
+            (self.user, 2, "5.00", [self.food, self.rent]),
+            (self.user, 3, "100.00", [self.rent]),
+            (self.user, 4, "7.00", []),
+            (other, 1, "1000.00", []),
+        ]:
+            expense = Expense.objects.create(
+                value=Decimal(value),
+                spent_at=datetime.datetime(2024, 1, day, tzinfo=datetime.timezone.utc),
+                creator=creator,
+            )
+            expense.categories.set(categories)
+
+    def summary(self, query: str = "") -> list[tuple]:
+        response = self.client.get(f"/api/expenses/summary/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return [
+            (row["category_name"], row["total"], row["count"], row["average"])
+            for row in response.json()
+        ]
+
+    def test_totals_per_category(self):
+        self.assertEqual(
+            self.summary(),
+            [("rent", "105.00", 2, "52.50"), ("food", "15.00", 2, "7.50")],
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/expenses/summary/")
+        self.assertEqual(
+            (response.json()[0]["min"], response.json()[0]["max"]),
+            ("5.00", "100.00"),
+        )
+
+    def test_summary_of_filtered_expenses(self):
+        self.assertEqual(
+            self.summary(
+                "start_date=2024-01-02T00:00:00Z&end_date=2024-01-31T00:00:00Z"
+            ),
+            [("rent", "105.00", 2, "52.50"), ("food", "5.00", 1, "5.00")],
+        )
+        self.assertEqual(
+            self.summary("max_value=20"),
+            [("food", "15.00", 2, "7.50"), ("rent", "5.00", 1, "5.00")],
+        )
+
+
+class ExpensesExportTests(TestCase):
+    """Exports stream the filtered expenses ordered by spent_at"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        food = Category.objects.create(name="food", creator=self.user)
+        rent = Category.objects.create(name="rent", creator=self.user)
+        for day, description, categories in [
+            (3, "later", [food]),
+            (1, 'comma, "quote"', [food, rent]),
+            (2, None, []),
+        ]:
+            expense = Expense.objects.create(
+                value=Decimal(day),
+                spent_at=datetime.datetime(2024, 1, day, tzinfo=datetime.timezone.utc),
+                description=description,
+                creator=self.user,
+            )
+            # one by one, categories are exported in the order they were added
+            for category in categories:
+                expense.categories.add(category)
+
+    def export(self, query: str) -> str:
+        response = self.client.get(f"/api/expenses/export/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        rows = list(csv.DictReader(StringIO(self.export("file_format=csv"))))
+
+        self.assertEqual(
+            [(row["value"], row["description"], row["categories"]) for row in rows],
+            [
+                ("1.00", 'comma, "quote"', "food;rent"),
+                ("2.00", "", ""),
+                ("3.00", "later", "food"),
+            ],
+        )
+
+    def test_ndjson_export_matches_the_list(self):
+        # a small chunk size, so categories are prefetched per chunk
+        with mock.patch.object(ExpensesExportApiView, "chunk_size", 2):
+            lines = self.export("file_format=ndjson&max_value=2").splitlines()
+
+        listed = self.client.get("/api/expenses/?max_value=2").json()["results"]
+        self.assertEqual([json.loads(line) for line in lines], listed[::-1])
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get("/api/expenses/export/?file_format=xml")
+        self.assertEqual(response.status_code, 400)
+
+
+class ExpensesBatchTests(TestCase):
+    """Batches are created with a fixed number of queries, item by item results"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.categories = [
+            str(Category.objects.create(name=f"category {i}", creator=self.user).id)
+            for i in range(3)
+        ]
+
+    def items(self, count: int) -> list[dict]:
+        return [
+            {
+                "value": f"{i + 1}.25",
+                "spent_at": f"2024-01-{i % 28 + 1:02}T10:00:00Z",
+                "categories": self.categories[: i % 4],
+            }
+            for i in range(count)
+        ]
+
+    def post(self, items: list[dict]):
+        return self.client.post("/api/expenses/batch/", items, format="json")
+
+    def test_batch_query_count_does_not_grow_with_items(self):
+        with CaptureQueriesContext(connection) as few:
+            response = self.post(self.items(4))
+        self.assertEqual(response.status_code, 201)
+
+        with CaptureQueriesContext(connection) as many:
+            response = self.post(self.items(40))
+        self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+        self.assertEqual(
+            [result["index"] for result in response.json()], list(range(40))
+        )
+        self.assertEqual(Expense.objects.count(), 44)
+        call_command("rebuild_spending_rollup", "--check", stdout=StringIO())
+
+    def test_rejected_items_are_reported_by_index(self):
+        items = self.items(3)
+        items[1]["value"] = "not a number"
+        items[2]["categories"] = [str(uuid.uuid4())]
+
+        response = self.post(items)
+
+        self.assertEqual(response.status_code, 207)
+        created, invalid, unknown = response.json()
+        self.assertEqual(Expense.objects.get().id, uuid.UUID(created["id"]))
+        self.assertIn("value", invalid["errors"])
+        self.assertEqual(unknown["errors"], {"categories": ["Unknown category"]})
+
+    def test_batch_without_valid_items_is_rejected(self):
+        items = self.items(1)
+        items[0]["categories"] = [str(uuid.uuid4())]
+
+        response = self.post(items)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Expense.objects.exists())
+
+
+class ExpensesBulkTests(TestCase):
+    """Bulk changes apply only to expenses the filters actually narrow to"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.food = Category.objects.create(name="food", creator=self.user)
+        self.rent = Category.objects.create(name="rent", creator=self.user)
+        for day, value in [(1, 5), (2, 20), (3, 50)]:
+            expense = Expense.objects.create(
+                value=Decimal(value),
+                spent_at=datetime.datetime(2024, 1, day, tzinfo=datetime.timezone.utc),
+                creator=self.user,
+            )
+            expense.categories.set([self.food])
+        call_command("rebuild_spending_rollup", stdout=StringIO())
+
+    def test_update_matching_expenses(self):
+        response = self.client.patch(
+            "/api/expenses/bulk/?min_value=10",
+            {"description": "big", "add_categories": [str(self.rent.id)]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"updated": 2})
+        self.assertEqual(
+            Expense.objects.filter(description="big", categories=self.rent).count(), 2
+        )
+        call_command("rebuild_spending_rollup", "--check", stdout=StringIO())
+
+    def test_delete_matching_expenses(self):
+        response = self.client.delete(
+            "/api/expenses/bulk/?start_date=2024-01-02T00:00:00Z"
+            "&end_date=2024-01-31T00:00:00Z"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"deleted": 2})
+        self.assertEqual(Expense.objects.get().value, Decimal(5))
+        call_command("rebuild_spending_rollup", "--check", stdout=StringIO())
+
+    def test_filters_which_narrow_nothing_are_rejected(self):
+        for query in [
+            "",
+            "start_date=2099-01-01",
+            "end_date=2099-01-01",
+            "min_value=",
+            "max_value=&categories=",
+            "categories_match=all",
+            "q=%21%21",
+        ]:
+            with self.subTest(query=query):
+                patch = self.client.patch(
+                    f"/api/expenses/bulk/?{query}", {"description": "x"}, format="json"
+                )
+                delete = self.client.delete(f"/api/expenses/bulk/?{query}")
+                self.assertEqual(patch.status_code, 400)
+                self.assertEqual(delete.status_code, 400)
+
+        self.assertEqual(Expense.objects.filter(description=None).count(), 3)
+
+
+class ExpensesImportTests(TestCase):
+    """CSV imports load valid rows with their categories and rollup"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Category.objects.create(name="food", creator=self.user)
+
+    def upload(self, content: bytes, query: str = ""):
+        return self.client.post(
+            f"/api/expenses/import/{query}",
+            {"file": SimpleUploadedFile("expenses.csv", content)},
+            format="multipart",
+        )
+
+    def test_valid_rows_are_imported_and_invalid_ones_skipped(self):
+        response = self.upload(
+            b"value,spent_at,description,categories\n"
+            b"3.50,2024-03-02T10:00:00Z,coffee,food;drinks\n"
+            b"oops,2024-03-02,,food\n"
+            b"4.00,2024-03-02,,\n"
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            {key: response.json()[key] for key in ("imported", "skipped")},
+            {"imported": 2, "skipped": 1},
+        )
+        self.assertEqual(response.json()["errors"], ["Line 3: invalid value 'oops'"])
+        self.assertCountEqual(
+            Expense.objects.values_list("value", "categories__name"),
+            [(Decimal("3.50"), "food"), (Decimal("3.50"), "drinks"), (4, None)],
+        )
+        call_command("rebuild_spending_rollup", "--check", stdout=StringIO())
+
+    def test_atomic_import_rolls_back_on_invalid_row(self):
+        response = self.upload(
+            b"value,spent_at,categories\n3.50,2024-03-02,new\n1,never,\n",
+            "?atomic=true",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Expense.objects.exists())
+        self.assertFalse(DailySpending.objects.exists())
+        self.assertFalse(Category.objects.filter(name="new").exists())
+
+    def test_unreadable_file_is_rejected(self):
+        field = b"x" * (csv.field_size_limit() + 1)
+        for content in [
+            b"value,spent_at\n1,2024-03-02\n\xff\n",
+            b"value,spent_at,description\n1,2024-03-02," + field + b"\n",
+        ]:
+            with self.subTest(content=content[:40]):
+                response = self.upload(content, "?atomic=true")
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(Expense.objects.exists())
+
+
+class CategoriesCacheTests(TestCase):
+    """Cached categories are read again after any write bumps the version"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.food = self.create_category("food")
+
+    def create_category(self, name: str) -> str:
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/categories/", {"name": name})
+        return response.json()["id"]
+
+    def names(self) -> list[str]:
+        return sorted(category.name for category in get_categories(self.user))
+
+    def test_categories_are_cached_until_a_write(self):
+        self.assertEqual(self.names(), ["food"])
+        get_category_by_id(self.user, self.food)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(), ["food"])
+            get_category_by_id(self.user, self.food)
+
+        version = get_user_version(CATEGORIES_CACHE_NAMESPACE, self.user.pk)
+        self.create_category("rent")
+        self.assertGreater(
+            get_user_version(CATEGORIES_CACHE_NAMESPACE, self.user.pk), version
+        )
+        self.assertEqual(self.names(), ["food", "rent"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f"/api/categories/{self.food}/", {"name": "meals"})
+        self.assertEqual(get_category_by_id(self.user, self.food).name, "meals")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/categories/{self.food}/")
+        self.assertEqual(self.names(), ["rent"])
+
+
+class ConditionalGetTests(TestCase):
+    """Unchanged expenses and categories are answered with 304"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.food = self.client.post(
+            "/api/categories/", {"name": "food"}, format="json"
+        ).json()["id"]
+        self.expense = self.client.post(
+            "/api/expenses/",
+            {"value": "2.00", "spent_at": "2024-01-10T10:00:00Z"},
+            format="json",
+        ).json()["id"]
+
+    def test_matching_etag_is_not_modified(self):
+        for url in [
+            "/api/expenses/",
+            f"/api/expenses/{self.expense}/",
+            "/api/categories/",
+            f"/api/categories/{self.food}/",
+        ]:
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+
+        detail = self.client.get(f"/api/expenses/{self.expense}/")
+        response = self.client.get(
+            f"/api/expenses/{self.expense}/",
+            HTTP_IF_MODIFIED_SINCE=detail["Last-Modified"],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etags_change_after_writes(self):
+        detail_url = f"/api/expenses/{self.expense}/"
+        detail = self.client.get(detail_url)["ETag"]
+        expenses = self.client.get("/api/expenses/")["ETag"]
+        categories = self.client.get("/api/categories/")["ETag"]
+
+        self.client.put(
+            detail_url,
+            {"value": "3.00", "spent_at": "2024-01-10T10:00:00Z"},
+            format="json",
+        )
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["value"], "3.00")
+        self.assertNotEqual(self.client.get("/api/expenses/")["ETag"], expenses)
+
+        self.client.put(f"/api/categories/{self.food}/", {"name": "meals"})
+        response = self.client.get("/api/categories/", HTTP_IF_NONE_MATCH=categories)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["name"], "meals")
+
+
+@override_settings(SYNC_OVERLAP_SECONDS=0)
+class DeltaSyncTests(TestCase):
+    """Sync tokens return rows changed since the previous sync"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.food = self.client.post(
+            "/api/categories/", {"name": "food"}, format="json"
+        ).json()["id"]
+        self.expense = self.create_expense()
+
+    def create_expense(self) -> str:
+        response = self.client.post(
+            "/api/expenses/",
+            {"value": "2.00", "spent_at": "2024-01-10T10:00:00Z"},
+            format="json",
+        )
+        return response.json()["id"]
+
+    def sync(self, token: str | None = None) -> dict:
+        response = self.client.get("/api/sync/", {"token": token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_full_then_incremental_sync(self):
+        full = self.sync()
+        self.assertEqual([e["id"] for e in full["expenses"]], [self.expense])
+        self.assertEqual([c["id"] for c in full["categories"]], [self.food])
+
+        created = self.create_expense()
+        changes = self.sync(full["token"])
+
+        self.assertEqual([e["id"] for e in changes["expenses"]], [created])
+        self.assertEqual(changes["categories"], [])
+        self.assertEqual(self.sync(changes["token"])["expenses"], [])
+
+    def test_deletions_are_sent_as_tombstones(self):
+        token = self.sync()["token"]
+        self.client.delete(f"/api/expenses/{self.expense}/")
+        self.client.delete(f"/api/categories/{self.food}/")
+
+        changes = self.sync(token)
+
+        self.assertEqual(changes["deleted_expenses"], [self.expense])
+        self.assertEqual(changes["deleted_categories"], [self.food])
+        self.assertEqual(self.sync()["deleted_expenses"], [])
+
+    def test_token_older_than_kept_tombstones_expires(self):
+        token = self.sync()["token"]
+        self.client.delete(f"/api/expenses/{self.expense}/")
+
+        with override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=0):
+            call_command("prune_tombstones", stdout=StringIO())
+            response = self.client.get("/api/sync/", {"token": token})
+
+        self.assertEqual(response.status_code, 410)
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertEqual(
+            self.client.get("/api/sync/", {"token": "x" + token}).status_code, 400
+        )
+
+
+class AsyncViewsTests(TestCase):
+    """Async views must answer exactly like their sync counterparts"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.token = str(AccessToken.for_user(self.user))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        category = Category.objects.create(name="food", creator=self.user)
+        self.expense = Expense.objects.create(
+            value=Decimal("9.99"), spent_at=timezone.now(), creator=self.user
+        )
+        self.expense.categories.set([category])
+
+    async def get_async(self, view, url: str, **kwargs):
+        request = AsyncRequestFactory().get(url, authorization=f"Bearer {self.token}")
+        return await view.as_view()(request, **kwargs)
+
+    async def test_reads_match_sync_views(self):
+        cases = [
+            (AsyncExpensesApiView, "/api/expenses/", {}),
+            (
+                AsyncExpensesApiView,
+                f"/api/expenses/{self.expense.id}/",
+                {"pk": self.expense.id},
+            ),
+            (AsyncCategoriesApiView, "/api/categories/", {}),
+        ]
+        for view, url, kwargs in cases:
+            with self.subTest(url=url):
+                response = await self.get_async(view, url, **kwargs)
+                expected = await sync_to_async(self.client.get)(url)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.content, expected.content)
+                self.assertEqual(response["ETag"], expected["ETag"])
+
+    async def test_requires_token(self):
+        request = AsyncRequestFactory().get("/api/expenses/")
+        response = await AsyncExpensesApiView.as_view()(request)
+        self.assertEqual(response.status_code, 401)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """Tokens are checked against cached user flags instead of the User row"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+    def user_queries(self) -> int:
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/categories/")
+        self.assertEqual(response.status_code, 200)
+        table = User._meta.db_table
+        return sum(table in query["sql"] for query in ctx.captured_queries)
+
+    def test_user_row_is_read_once_per_ttl(self):
+        self.assertEqual(self.user_queries(), 1)
+        self.assertEqual(self.user_queries(), 0)
+
+    def test_deactivated_or_deleted_user_is_rejected(self):
+        self.assertEqual(self.user_queries(), 1)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/categories/").status_code, 401)
+
+        self.user.delete()
+        response = self.client.get("/api/categories/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "user_not_found")
+
+
+@override_settings(REPLICA_DATABASES=["replica_0"], DB_REPLICA_STICKY_SECONDS=60)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    """Reads go to replicas unless the user has written recently"""
+
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+
+    def request(self, user_id: int, write: bool = False) -> str:
+        token = routers.start_request()
+        try:
+            routers.set_request_user(user_id)
+            if write:
+                self.router.db_for_write(Expense)
+            return self.router.db_for_read(Expense)
+        finally:
+            state = routers.end_request(token)
+            if state.wrote:
+                routers.pin_user(state.user_id)
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.request(user_id=1), "replica_0")
+        self.assertEqual(self.router.db_for_write(Expense), "default")
+
+    def test_reads_stay_on_primary_after_write(self):
+        self.assertEqual(self.request(user_id=2, write=True), "default")
+        self.assertEqual(self.request(user_id=2), "default")
+        self.assertEqual(self.request(user_id=3), "replica_0")
+
+
+class FakeConnection:
+    """Stands in for a psycopg2 connection, pings fail once broken"""
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.autocommit = False
+        self.info = SimpleNamespace(transaction_status=TRANSACTION_STATUS_IDLE)
+
+    @contextmanager
+    def cursor(self):
+        if self.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+        yield SimpleNamespace(execute=lambda sql: None)
+
+    def rollback(self):
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Pooled connections are shared safely by the threads of a process"""
+
+    def pool(self, **options) -> ConnectionPool:
+        return ConnectionPool(FakeConnection, **options)
+
+    def test_connections_are_reused_last_in_first_out(self):
+        pool = self.pool(max_size=3)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+
+        self.assertIs(pool.acquire(), second)
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(pool.stats()["created"], 2)
+
+    def test_acquire_times_out_while_all_connections_are_in_use(self):
+        pool = self.pool(max_size=1, timeout=0.05)
+        connection = pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+        pool.release(connection)
+        self.assertIs(pool.acquire(), connection)
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+    def test_broken_connections_are_discarded(self):
+        pool = self.pool(max_size=2)
+        broken, failed = pool.acquire(), pool.acquire()
+        pool.release(broken)
+        broken.broken = True
+        pool.release(failed, discard=True)
+
+        connection = pool.acquire()
+
+        self.assertNotIn(connection, (broken, failed))
+        self.assertTrue(broken.closed and failed.closed)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_threads_never_share_or_exceed_connections(self):
+        pool = self.pool(max_size=3, timeout=5)
+        lock = threading.Lock()
+        in_use = set()
+        peak = 0
+        shared = 0
+
+        def work():
+            nonlocal peak, shared
+            for _ in range(50):
+                connection = pool.acquire()
+                with lock:
+                    shared += connection in in_use
+                    in_use.add(connection)
+                    peak = max(peak, len(in_use))
+                time.sleep(0.0005)
+                with lock:
+                    in_use.remove(connection)
+                pool.release(connection)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = pool.stats()
+        self.assertEqual(shared, 0)
+        self.assertLessEqual(peak, 3)
+        self.assertEqual((stats["in_use"], stats["acquired"]), (0, 400))
+
+    @skipUnless(connection.vendor == "postgresql", "pooling needs PostgreSQL")
+    def test_connection_returns_to_pool_at_request_end(self):
+        settings_dict = {
+            **connection.settings_dict,
+            "ENGINE": "expenses.backends.postgresql_pool",
+            "CONN_MAX_AGE": 0,
+            "POOL": {"MAX_SIZE": 2},
+        }
+        backend = load_backend(settings_dict["ENGINE"])
+        pooled = backend.DatabaseWrapper(settings_dict, alias="pool_tests")
+        self.addCleanup(backend.close_pools)
+
+        for _ in range(2):
+            pooled.ensure_connection()
+            self.assertEqual(pooled.connection_pool.stats()["in_use"], 1)
+            # what close_old_connections() does when a request finishes
+            pooled.close_if_unusable_or_obsolete()
+            self.assertEqual(pooled.connection_pool.stats()["idle"], 1)
+
+        self.assertEqual(pooled.connection_pool.stats()["created"], 1)
+
+
+class RequestMetricsTests(TestCase):
+    """Requests are timed and counted per route"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_metrics_count_requests_per_route(self):
+        response = self.client.get("/api/categories/")
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"',
+        )
+
+        metrics = self.client.get("/metrics").content.decode()
+        self.assertRegex(
+            metrics,
+            r'http_responses_total\{route="/api/categories/",method="GET",'
+            r'status="200"\} [1-9]',
+        )
+        self.assertIn(
+            'http_request_duration_seconds_bucket{route="/api/categories/",'
+            'method="GET",le="+Inf"}',
+            metrics,
+        )
+
+    def test_unknown_methods_are_counted_as_other(self):
+        self.client.generic("BREW", "/api/categories/")
+
+        metrics = self.client.get("/metrics").content.decode()
+        self.assertIn('route="/api/categories/",method="other",status="405"', metrics)
+        self.assertNotIn("BREW", metrics)
+
+    def test_shards_of_finished_threads_are_merged(self):
+        def record():
+            for _ in range(2):
+                MetricsService.record_request("/threads/", "GET", 200, 0.01, 0, 1)
+
+        threads = [threading.Thread(target=record) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        metrics = MetricsService.render_metrics()
+        self.assertIn(
+            'http_responses_total{route="/threads/",method="GET",status="200"} 10',
+            metrics,
+        )
+        self.assertTrue(all(t.is_alive() for t in MetricsService._shards))
+
+
+class ExpensesListFastPathTests(TestCase):
+    """List pages are built without ModelSerializer but render the same bytes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        categories = [
+            Category.objects.create(name="line\u2028separator", creator=self.user),
+            Category.objects.create(name="café \x01", creator=self.user),
+        ]
+        spent_at = datetime.datetime(2024, 1, 1, 7, 0, 0, 123456, datetime.timezone.utc)
+        for i, description in enumerate([None, "", 'quote " and \\ \U0001f600']):
+            expense = Expense.objects.create(
+                value=Decimal("1.5") * i,
+                spent_at=spent_at - datetime.timedelta(days=i),
+                description=description,
+                creator=self.user,
+            )
+            expense.categories.set(categories[:i])
+
+    def test_list_matches_model_serializer(self):
+        # categories of an expense are listed in the order they were added
+        categories = Category.objects.order_by("expensecategory__id")
+        expenses = (
+            Expense.objects.filter(creator=self.user)
+            .order_by("-spent_at", "-id")
+            .prefetch_related(Prefetch("categories", queryset=categories))
+        )
+        expected = JSONRenderer().render(
+            {
+                "next": None,
+                "previous": None,
+                "results": ExpensesReadSerializer(expenses, many=True).data,
+            }
+        )
+
+        response = self.client.get("/api/expenses/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected)
+
+
+class WireFormatTests(TestCase):
+    """Requests and responses are MessagePack or JSON by their headers"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_msgpack_round_trip(self):
+        response = self.client.post(
+            "/api/categories/",
+            msgpack.packb({"name": "food"}),
+            content_type="application/msgpack",
+            HTTP_ACCEPT="application/msgpack",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content)["name"], "food")
+
+        as_json = self.client.get("/api/categories/")
+        as_msgpack = self.client.get(
+            "/api/categories/", HTTP_ACCEPT="application/msgpack"
+        )
+        self.assertEqual(msgpack.unpackb(as_msgpack.content), as_json.json())
+        self.assertNotEqual(as_msgpack["ETag"], as_json["ETag"])
+
+
+class ExpensesSearchTests(TestCase):
+    """The q filter matches description words, the last one as a prefix"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        descriptions = ["Coffee beans", "coffee shop", "beans", None, "coffee beanbag"]
+        for i, description in enumerate(descriptions):
+            Expense.objects.create(
+                value=Decimal(1),
+                spent_at=now - datetime.timedelta(hours=i),
+                description=description,
+                creator=self.user,
+            )
+
+    def test_search_pages_through_matches(self):
+        url = "/api/expenses/?q=coffee%20bean&page_size=1"
+        found = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            found += [expense["description"] for expense in response.json()["results"]]
+            url = response.json()["next"]
+
+        self.assertCountEqual(found, ["Coffee beans", "coffee beanbag"])
+
+
+class ExpensesCategoryFilterTests(TestCase):
+    """Expenses with any or all of the categories are listed once"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.food = Category.objects.create(name="food", creator=self.user)
+        self.rent = Category.objects.create(name="rent", creator=self.user)
+        now = timezone.now()
+        for value, categories in [
+            (1, [self.food]),
+            (2, [self.food, self.rent]),
+            (3, []),
+        ]:
+            expense = Expense.objects.create(
+                value=Decimal(value), spent_at=now, creator=self.user
+            )
+            expense.categories.set(categories)
+
+    def list_values(self, query: str) -> list[str]:
+        response = self.client.get(f"/api/expenses/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return sorted(expense["value"] for expense in response.json()["results"])
+
+    def test_match_any_or_all(self):
+        categories = f"categories={self.food.id},{self.rent.id}"
+        self.assertEqual(self.list_values(categories), ["1.00", "2.00"])
+        self.assertEqual(
+            self.list_values(f"{categories}&categories_match=all"), ["2.00"]
+        )
+
+        response = self.client.get(f"/api/expenses/?{categories}&categories_match=x")
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(connection.vendor == "postgresql", "partitioning needs PostgreSQL")
+class ExpensePartitioningTests(TestCase):
+    """Partitioned tables keep the API working and prune by spent_at month"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="owner", password="owner")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.food = self.client.post(
+            "/api/categories/", {"name": "food"}, format="json"
+        ).json()["id"]
+        self.expense = self.create_expense("2024-01-10T10:00:00Z")
+        call_command("partition_expenses", "--convert", stdout=StringIO())
+
+    def create_expense(self, spent_at: str) -> str:
+        response = self.client.post(
+            "/api/expenses/",
+            {"value": "2.00", "spent_at": spent_at, "categories": [self.food]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()["id"]
+
+    def test_date_range_scans_the_partitions_of_its_months(self):
+        filters = {
+            "start_date": "2024-01-01T00:00:00Z",
+            "end_date": "2024-01-31T00:00:00Z",
+            "categories": [self.food],
+        }
+        plan = get_expense_rows_with_filters(self.user, filters).explain()
+
+        self.assertIn("expenses_expense_p2024_01", plan)
+        self.assertIn("expenses_expense_categories_p2024_01", plan)
+        self.assertNotIn("_default", plan)
+
+    def test_links_follow_their_expense_and_old_months_are_archived(self):
+        spent_at = timezone.now().replace(microsecond=0)
+        response = self.client.put(
+            f"/api/expenses/{self.expense}/",
+            {"value": "2.00", "spent_at": spent_at.isoformat()},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ExpenseCategory.objects.get().spent_at, spent_at)
+
+        old = self.create_expense("2024-01-20T10:00:00Z")
+        call_command("partition_expenses", "--retain", "1", stdout=StringIO())
+
+        self.assertFalse(Expense.objects.filter(id=old).exists())
+        self.assertEqual(ExpenseCategory.objects.count(), 1)
+        call_command("rebuild_spending_rollup", "--check", stdout=StringIO())
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
@@ -6,16 +7,36 @@ from expenses.views import (
     hello_world,
     CategoriesApiView,
     ExpensesApiView,
+    ExpensesBatchApiView,
+    ExpensesBulkApiView,
+    ExpensesExportApiView,
+    ExpensesImportApiView,
+    ExpensesSummaryApiView,
+    SyncApiView,
+    AsyncCategoriesApiView,
+    AsyncExpensesApiView,
 )
 
 
+if settings.EXPENSES_ASYNC_VIEWS:
+    ExpensesView, CategoriesView = AsyncExpensesApiView, AsyncCategoriesApiView
+else:
+    ExpensesView, CategoriesView = ExpensesApiView, CategoriesApiView
+
+
 urlpatterns = [
     path("hello_ping/", hello_ping),
     path("", hello_world),
-    path("expenses/", ExpensesApiView.as_view()),
-    path("expenses/<uuid:pk>/", ExpensesApiView.as_view()),
-    path("categories/", CategoriesApiView.as_view()),
-    path("categories/<uuid:pk>/", CategoriesApiView.as_view()),
+    path("expenses/", ExpensesView.as_view()),
+    path("expenses/batch/", ExpensesBatchApiView.as_view()),
+    path("expenses/bulk/", ExpensesBulkApiView.as_view()),
+    path("expenses/export/", ExpensesExportApiView.as_view()),
+    path("expenses/import/", ExpensesImportApiView.as_view()),
+    path("expenses/summary/", ExpensesSummaryApiView.as_view()),
+    path("expenses/<uuid:pk>/", ExpensesView.as_view()),
+    path("categories/", CategoriesView.as_view()),
+    path("categories/<uuid:pk>/", CategoriesView.as_view()),
+    path("sync/", SyncApiView.as_view()),
     # todo unite as token/
     path("token/", TokenObtainPairView.as_view()),
     path("token/refresh/", TokenRefreshView.as_view()),
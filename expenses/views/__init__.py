@@ -1,7 +1,30 @@
 """ All views are defined here """
 
+from .async_views import AsyncCategoriesApiView, AsyncExpensesApiView
 from .categories_views import CategoriesApiView
-from .expenses_views import ExpensesApiView
-from .system_views import hello_ping, hello_world
+from .expenses_views import (
+    ExpensesApiView,
+    ExpensesBatchApiView,
+    ExpensesBulkApiView,
+    ExpensesExportApiView,
+    ExpensesImportApiView,
+    ExpensesSummaryApiView,
+)
+from .sync_views import SyncApiView
+from .system_views import hello_ping, hello_world, metrics
 
-__all__ = ["CategoriesApiView", "ExpensesApiView", "hello_ping", "hello_world"]
+__all__ = [
+    "AsyncCategoriesApiView",
+    "AsyncExpensesApiView",
+    "CategoriesApiView",
+    "ExpensesApiView",
+    "ExpensesBatchApiView",
+    "ExpensesBulkApiView",
+    "ExpensesExportApiView",
+    "ExpensesImportApiView",
+    "ExpensesSummaryApiView",
+    "SyncApiView",
+    "metrics",
+    "hello_ping",
+    "hello_world",
+]
@@ -0,0 +1,308 @@
+""" Async API views for ASGI deployments """
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import classonlymethod
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    AuthenticationFailed,
+    NotAuthenticated,
+    NotFound,
+    ValidationError,
+)
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from expenses.authentication import CachedJWTAuthentication
+from expenses.pagination import KeysetPagination
+from expenses.serializers import (
+    CategoriesDetailReadSerializer,
+    CategoriesReadSerializer,
+    CategoriesUpdateSerializer,
+    CategoriesWriteSerializer,
+    ExpensesReadSerializer,
+    ExpensesUpdateSerializer,
+    ExpensesWriteSerializer,
+    expenses_list_data,
+)
+from expenses.services import (
+    aget_categories,
+    aget_category_by_id,
+    aget_categories_validator,
+    aget_category_validator,
+    acreate_category,
+    aupdate_category,
+    adelete_category,
+    aget_expense_rows_with_filters,
+    aget_categories_by_expense,
+    aget_expense_by_id,
+    aget_expenses_validator,
+    aget_expense_validator,
+    acreate_expense,
+    aupdate_expense,
+    adelete_expense,
+)
+from .conditional import Validator, async_conditional_get
+from .expenses_views import get_filters
+
+
+class AsyncApiView(View):
+    """
+    Base class of async API views
+
+    DRF 3.14 runs every APIView synchronously, so these views are plain
+    async django views which keep the APIView behaviour the clients rely
+    on: JWT authentication with CachedJWTAuthentication, the parsers and
+    renderers of the REST_FRAMEWORK settings picked by Content-Type and
+    Accept, and DRF error payloads. Handlers receive a DRF Request, so
+    query_params, data and pagination work as usual.
+
+    Requires authentication for all operations.
+    """
+
+    authentication_class = CachedJWTAuthentication
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
+    # the browsable API needs an APIView
+    renderer_classes = [
+        renderer
+        for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+        if not issubclass(renderer, BrowsableAPIRenderer)
+    ]
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # like APIView, authentication is by token only
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        request = Request(request, parsers=[parser() for parser in self.parser_classes])
+        try:
+            self.perform_content_negotiation(request)
+            authenticated = await self.authentication_class().aauthenticate(request)
+            if authenticated is None:
+                raise NotAuthenticated()
+            request.user, request.auth = authenticated
+
+            response = await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            response = self.handle_exception(request, exc)
+
+        if len(self.renderer_classes) > 1:
+            patch_vary_headers(response, ["Accept"])
+        return response
+
+    def perform_content_negotiation(self, request: Request) -> None:
+        """
+        Pick the renderer from the Accept header or the format query
+        parameter, like APIView
+
+        Raises:
+            NotAcceptable: If no renderer matches the Accept header
+            NotFound: If no renderer has the requested format
+        """
+        renderers = [renderer() for renderer in self.renderer_classes]
+        # the negotiation errors are rendered by the default renderer
+        self.renderer, self.accepted_media_type = renderers[0], None
+        try:
+            self.renderer, self.accepted_media_type = (
+                DefaultContentNegotiation().select_renderer(request, renderers)
+            )
+        except Http404:
+            raise NotFound()
+        request.accepted_renderer = self.renderer
+        request.accepted_media_type = self.accepted_media_type
+
+    def handle_exception(self, request: Request, exc: APIException) -> HttpResponse:
+        """
+        Render the exception the way DRF's default exception handler does
+        """
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+
+        response = self.render(data, status=exc.status_code)
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            response.headers["WWW-Authenticate"] = (
+                self.authentication_class().authenticate_header(request)
+            )
+        return response
+
+    def render(
+        self, data: any = None, status: int = status.HTTP_200_OK
+    ) -> HttpResponse:
+        content = (
+            self.renderer.render(data, self.accepted_media_type)
+            if data is not None
+            else b""
+        )
+        content_type = self.renderer.media_type
+        if self.renderer.charset:
+            content_type += f"; charset={self.renderer.charset}"
+        return HttpResponse(content, status=status, content_type=content_type)
+
+
+async def get_validator(request: Request, pk: str | None = None) -> Validator:
+    if pk:
+        return await aget_expense_validator(request.user, pk)
+    return await aget_expenses_validator(request.user, get_filters(request))
+
+
+async def get_category_validator(request: Request, pk: str | None = None) -> Validator:
+    if pk:
+        return await aget_category_validator(request.user, pk)
+    return await aget_categories_validator(request.user)
+
+
+class AsyncExpensesApiView(AsyncApiView):
+    """
+    Async version of ExpensesApiView with the same routes, parameters
+    and responses
+
+    Reads use the async ORM. Writes keep their transactions and run in a
+    worker thread, see the async expenses services.
+    """
+
+    @async_conditional_get(get_validator)
+    async def get(self, request: Request, pk: str | None = None) -> HttpResponse:
+        """
+        Retrieve expense/expenses, see ExpensesApiView.get
+
+        Status Codes:
+            200: Successfully retrieved data
+            304: Data not modified since the client's copy
+            400: Invalid cursor, page_size or categories_match
+            404: Expense not found (when pk provided)
+        """
+        if pk:
+            expense = await aget_expense_by_id(request.user, pk)
+            return self.render(ExpensesReadSerializer(expense).data)
+
+        rows = await aget_expense_rows_with_filters(request.user, get_filters(request))
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(rows, request, view=self)
+        categories = await aget_categories_by_expense(
+            [row["id"] for row in page], [row["spent_at"] for row in page]
+        )
+        data = expenses_list_data(page, categories)
+        return self.render(paginator.get_paginated_response(data).data)
+
+    async def post(self, request: Request) -> HttpResponse:
+        """
+        Create a new expense, see ExpensesApiView.post
+
+        Status Codes:
+            201: Expense successfully created
+            400: Invalid input data
+        """
+        serializer = ExpensesWriteSerializer(data=request.data)
+        # categories are looked up in the database while validating
+        if not await sync_to_async(serializer.is_valid)():
+            raise ValidationError(str(serializer.errors))
+
+        expense = await acreate_expense(request.user, serializer.validated_data)
+        serializer = ExpensesReadSerializer(expense)
+        return self.render(serializer.data, status=status.HTTP_201_CREATED)
+
+    async def put(self, request: Request, pk: str) -> HttpResponse:
+        """
+        Update an existing expense, see ExpensesApiView.put
+
+        Status Codes:
+            200: Expense successfully updated
+            400: Invalid input data
+            404: Expense not found
+        """
+        serializer = ExpensesUpdateSerializer(data=request.data)
+        if not await sync_to_async(serializer.is_valid)():
+            raise ValidationError(str(serializer.errors))
+
+        expense = await aupdate_expense(request.user, pk, serializer.validated_data)
+        serializer = ExpensesReadSerializer(expense)
+        return self.render(serializer.data)
+
+    async def delete(self, request: Request, pk: str) -> HttpResponse:
+        """
+        Delete an expense, see ExpensesApiView.delete
+
+        Status Codes:
+            204: Expense successfully deleted
+            404: Expense not found
+        """
+        await adelete_expense(request.user, pk)
+        return self.render(status=status.HTTP_204_NO_CONTENT)
+
+
+class AsyncCategoriesApiView(AsyncApiView):
+    """
+    Async version of CategoriesApiView with the same routes, parameters
+    and responses
+    """
+
+    @async_conditional_get(get_category_validator)
+    async def get(self, request: Request, pk: str | None = None) -> HttpResponse:
+        """
+        Retrieve category/categories, see CategoriesApiView.get
+
+        Status Codes:
+            200: Successfully retrieved data
+            304: Data not modified since the client's copy
+            404: Category not found (when pk provided)
+        """
+        if pk:
+            category = await aget_category_by_id(request.user, pk)
+            return self.render(CategoriesDetailReadSerializer(category).data)
+
+        categories = await aget_categories(request.user)
+        return self.render(CategoriesReadSerializer(categories, many=True).data)
+
+    async def post(self, request: Request) -> HttpResponse:
+        """
+        Create a new category, see CategoriesApiView.post
+
+        Status Codes:
+            201: Category successfully created
+            400: Invalid input data
+        """
+        serializer = CategoriesWriteSerializer(data=request.data)
+        if not serializer.is_valid():
+            raise ValidationError(str(serializer.errors))
+
+        category = await acreate_category(request.user, serializer.validated_data)
+        serializer = CategoriesReadSerializer(category)
+        return self.render(serializer.data, status=status.HTTP_201_CREATED)
+
+    async def put(self, request: Request, pk: str) -> HttpResponse:
+        """
+        Update an existing category, see CategoriesApiView.put
+
+        Status Codes:
+            200: Category successfully updated
+            400: Invalid input data
+            404: Category not found
+        """
+        serializer = CategoriesUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            raise ValidationError(str(serializer.errors))
+
+        category = await aupdate_category(request.user, pk, serializer.validated_data)
+        serializer = CategoriesDetailReadSerializer(category)
+        return self.render(serializer.data)
+
+    async def delete(self, request: Request, pk: str) -> HttpResponse:
+        """
+        Delete a category, see CategoriesApiView.delete
+
+        Status Codes:
+            204: Category successfully deleted
+            404: Category not found
+        """
+        await adelete_category(request.user, pk)
+        return self.render(status=status.HTTP_204_NO_CONTENT)
@@ -12,6 +12,8 @@ from expenses.serializers import (
 from expenses.services import (
     get_categories,
     get_category_by_id,
+    get_categories_validator,
+    get_category_validator,
     create_category,
     update_category,
     delete_category,
@@ -21,9 +23,16 @@ from expenses.serializers import (
     CategoriesUpdateSerializer,
     CategoriesWriteSerializer,
 )
+from .conditional import Validator, conditional_get
 from .permissions import IsOwnerOrAdmin
 
 
+def get_validator(request: Request, pk: str | None = None) -> Validator:
+    if pk:
+        return get_category_validator(request.user, pk)
+    return get_categories_validator(request.user)
+
+
 class CategoriesApiView(APIView):
     """
     API View for managing user categories
@@ -40,10 +49,16 @@ class CategoriesApiView(APIView):
 
     permission_classes: list = [IsAuthenticated]  # todo add IsOwnerOrAdmin
 
+    @conditional_get(get_validator)
     def get(self, request: Request, pk: str | None = None) -> Response:
         """
         Retrieve category/categories
 
+        Supports conditional requests: responses carry an ETag (and
+        Last-Modified for a single category) and matching If-None-Match /
+        If-Modified-Since headers are answered with 304 without running
+        the query.
+
         Args:
             request: Request - the HTTP request object
             pk: str | None - optional category ID for single category retrieval
@@ -55,6 +70,7 @@ class CategoriesApiView(APIView):
 
         Status Codes:
             200: Successfully retrieved data
+            304: Data not modified since the client's copy
             404: Category not found (when pk provided)
         """
         if pk:
@@ -0,0 +1,117 @@
+""" Conditional GET support for API views """
+
+import datetime
+import functools
+import hashlib
+from calendar import timegm
+from typing import Awaitable, Callable
+
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+from rest_framework.request import Request
+
+
+Validator = tuple[datetime.datetime | None, str] | None
+
+
+def _etag(request: Request, value: Validator) -> str | None:
+    if value is None:
+        return None
+
+    fingerprint = f"{request.user.pk}:{value[1]}"
+    # every representation other than JSON gets its own ETag
+    renderer = getattr(request, "accepted_renderer", None)
+    if renderer is not None and renderer.format != "json":
+        fingerprint += f":{renderer.format}"
+    return hashlib.sha1(fingerprint.encode()).hexdigest()
+
+
+def _last_modified(value: Validator, pk: str | None) -> datetime.datetime | None:
+    if value is None or pk is None:
+        return None
+    return value[0]
+
+
+def conditional_get(
+    get_validator: Callable[[Request, str | None], Validator]
+) -> Callable:
+    """
+    Decorate an APIView `get` method to answer If-None-Match and
+    If-Modified-Since with 304 before the handler runs
+
+    The validator is computed once per request. Lists only get an ETag:
+    deleting a row does not move their last modification time, so
+    Last-Modified is sent for single objects only.
+
+    Args:
+        get_validator: callable - receives the request and the optional pk
+            and returns (last_modified, fingerprint) or None if the object
+            doesn't exist
+
+    Returns:
+        Callable: Method decorator
+    """
+
+    def validator(request: Request, pk: str | None = None) -> Validator:
+        if not hasattr(request, "_conditional_validator"):
+            request._conditional_validator = get_validator(request, pk)
+        return request._conditional_validator
+
+    def etag(request: Request, pk: str | None = None) -> str | None:
+        return _etag(request, validator(request, pk))
+
+    def last_modified(
+        request: Request, pk: str | None = None
+    ) -> datetime.datetime | None:
+        return _last_modified(validator(request, pk), pk)
+
+    return method_decorator(condition(etag_func=etag, last_modified_func=last_modified))
+
+
+def async_conditional_get(
+    get_validator: Callable[[HttpRequest, str | None], Awaitable[Validator]]
+) -> Callable:
+    """
+    Async version of conditional_get for `get` methods of async views,
+    django's `condition` decorator only supports sync views
+
+    Args:
+        get_validator: async callable - receives the request and the
+            optional pk and returns (last_modified, fingerprint) or None
+            if the object doesn't exist
+
+    Returns:
+        Callable: Method decorator
+    """
+
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        async def wrapper(
+            view, request: HttpRequest, pk: str | None = None
+        ) -> HttpResponse:
+            value = await get_validator(request, pk)
+            etag = _etag(request, value)
+            etag = quote_etag(etag) if etag else None
+            last_modified = _last_modified(value, pk)
+            last_modified = (
+                timegm(last_modified.utctimetuple()) if last_modified else None
+            )
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = await method(view, request, pk)
+
+            if last_modified and not response.has_header("Last-Modified"):
+                response.headers["Last-Modified"] = http_date(last_modified)
+            if etag:
+                response.headers.setdefault("ETag", etag)
+            return response
+
+        return wrapper
+
+    return decorator
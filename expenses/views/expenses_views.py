@@ -1,25 +1,81 @@
+import codecs
+import csv
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
 
+from expenses.pagination import KeysetPagination
 from expenses.serializers import (
+    ExpensesBatchItemSerializer,
+    ExpensesBulkUpdateSerializer,
     ExpensesUpdateSerializer,
     ExpensesWriteSerializer,
     ExpensesReadSerializer,
+    ExpensesSummarySerializer,
+    expenses_list_data,
 )
 from expenses.services import (
     get_expense_by_id,
-    get_expenses_with_filters,
+    get_expense_validator,
+    get_expenses_validator,
+    get_expense_rows_with_filters,
+    get_categories_by_expense,
+    iterate_expenses_with_filters,
+    get_expenses_summary,
     create_expense,
+    create_expenses_batch,
     update_expense,
+    update_expenses_with_filters,
     delete_expense,
+    delete_expenses_with_filters,
+    import_expenses_csv,
 )
+from .conditional import Validator, conditional_get
 from .permissions import IsOwnerOrAdmin
 
 
+ALLOWED_FILTERS = [
+    "start_date",
+    "end_date",
+    "min_value",
+    "max_value",
+    "categories",
+    "categories_match",
+    "q",
+]
+
+
+def get_filters(request: Request) -> dict[str, str]:
+    """
+    Collect supported expense filters from the query string
+
+    Args:
+        request: Request - the HTTP request object
+
+    Returns:
+        dict: Filters accepted by get_expenses_with_filters
+    """
+    return {
+        key: request.query_params[key]
+        for key in ALLOWED_FILTERS
+        if key in request.query_params
+    }
+
+
+def get_validator(request: Request, pk: str | None = None) -> Validator:
+    if pk:
+        return get_expense_validator(request.user, pk)
+    return get_expenses_validator(request.user, get_filters(request))
+
+
 class ExpensesApiView(APIView):
     """
     API View for managing user expenses
@@ -32,15 +88,22 @@ class ExpensesApiView(APIView):
     - Delete expense (DELETE /{id})
 
     Supports filtering by date range, value range, and categories for listing.
+    Listing is keyset-paginated by (spent_at, id), see KeysetPagination.
     Requires authentication for all operations.
     """
 
     permission_classes: list = [IsAuthenticated]  # todo add IsOwnerOrAdmin
 
+    @conditional_get(get_validator)
     def get(self, request: Request, pk: str | None = None) -> Response:
         """
         Retrieve expense/expenses
 
+        Supports conditional requests: responses carry an ETag (and
+        Last-Modified for a single expense) and matching If-None-Match /
+        If-Modified-Since headers are answered with 304 without running
+        the query.
+
         Args:
             request: Request - the HTTP request object
             pk: str | None - optional expense ID for single expense retrieval
@@ -51,14 +114,23 @@ class ExpensesApiView(APIView):
             - min_value: filter expenses with value >= this amount
             - max_value: filter expenses with value <= this amount
             - categories: comma-separated list of category IDs to filter by
+            - categories_match: any (default) or all of the categories
+            - q: words the description must contain, the last one may be
+              the beginning of a word
+            - cursor: opaque token from the `next` / `previous` links
+            - page_size: number of expenses per page
 
         Returns:
             Response:
                 - Single expense details if pk provided
-                - List of filtered expenses if no pk provided
+                - Page of filtered expenses ordered by newest spent_at first,
+                  or by relevance first with `q`, with `next` / `previous`
+                  cursor links if no pk provided
 
         Status Codes:
             200: Successfully retrieved data
+            304: Data not modified since the client's copy
+            400: Invalid cursor, page_size or categories_match
             404: Expense not found (when pk provided)
         """
 
@@ -67,22 +139,15 @@ class ExpensesApiView(APIView):
             serializer = ExpensesReadSerializer(expense)
             return Response(serializer.data)
 
-        allowed_filters = [
-            "start_date",
-            "end_date",
-            "min_value",
-            "max_value",
-            "categories",
-        ]
-        filters = {
-            key: request.query_params[key]
-            for key in allowed_filters
-            if key in request.query_params
-        }
-
-        expenses = get_expenses_with_filters(request.user, filters)
-        serializer = ExpensesReadSerializer(expenses, many=True)
-        return Response(serializer.data)
+        # values() rows and expenses_list_data instead of model instances
+        # and ExpensesReadSerializer, the response is the same
+        rows = get_expense_rows_with_filters(request.user, get_filters(request))
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        categories = get_categories_by_expense(
+            [row["id"] for row in page], [row["spent_at"] for row in page]
+        )
+        return paginator.get_paginated_response(expenses_list_data(page, categories))
 
     def post(self, request: Request) -> Response:
         """
@@ -151,3 +216,320 @@ class ExpensesApiView(APIView):
         """
         delete_expense(request.user, pk)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ExpensesSummaryApiView(APIView):
+    """
+    API View for per-category breakdown of user expenses
+
+    - Summary of filtered expenses grouped by category (GET /summary/)
+
+    Accepts the same filters as the expenses list.
+    Requires authentication for all operations.
+    """
+
+    permission_classes: list = [IsAuthenticated]
+
+    def get(self, request: Request) -> Response:
+        """
+        Retrieve total, count, min, max and average value per category
+
+        Args:
+            request: Request - the HTTP request object
+
+        Query Parameters:
+            - start_date: filter expenses from this date (YYYY-MM-DD)
+            - end_date: filter expenses until this date (YYYY-MM-DD)
+            - min_value: filter expenses with value >= this amount
+            - max_value: filter expenses with value <= this amount
+            - categories: comma-separated list of category IDs to filter by
+
+        Returns:
+            Response: List of per-category aggregates ordered by total
+
+        Status Codes:
+            200: Successfully retrieved data
+        """
+        summary = get_expenses_summary(request.user, get_filters(request))
+        serializer = ExpensesSummarySerializer(summary, many=True)
+        return Response(serializer.data)
+
+
+class ExpensesBatchApiView(APIView):
+    """
+    API View for creating many expenses in one request
+
+    - Create expenses from a JSON array (POST /batch/)
+
+    All items are validated first, valid ones are then inserted in a single
+    transaction with bulk inserts.
+    Requires authentication for all operations.
+    """
+
+    permission_classes: list = [IsAuthenticated]
+
+    def post(self, request: Request) -> Response:
+        """
+        Create a batch of expenses
+
+        Args:
+            request: Request - the HTTP request object with a list of expenses,
+                every item has the same fields as for POST /expenses/
+
+        Returns:
+            Response: List with one result per item in request order:
+                - {"index": i, "id": "<uuid>"} for created expenses
+                - {"index": i, "errors": {...}} for rejected items
+
+        Status Codes:
+            201: All expenses successfully created
+            207: Some items were rejected, the others were created
+            400: Request is not a list, is too large or no item is valid
+        """
+        items = request.data
+        max_size = settings.EXPENSES_BATCH_MAX_SIZE
+        if not isinstance(items, list) or not items:
+            raise ValidationError("Expected a non-empty list of expenses")
+        if len(items) > max_size:
+            raise ValidationError(f"Batch is limited to {max_size} expenses")
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = ExpensesBatchItemSerializer(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {"index": index, "errors": serializer.errors}
+
+        created = []
+        if valid:
+            created = create_expenses_batch(request.user, [data for _, data in valid])
+
+        for (index, _), expense in zip(valid, created):
+            if expense is None:
+                results[index] = {
+                    "index": index,
+                    "errors": {"categories": ["Unknown category"]},
+                }
+            else:
+                results[index] = {"index": index, "id": str(expense.id)}
+
+        created_count = sum(1 for expense in created if expense is not None)
+        if created_count == len(items):
+            status_code = status.HTTP_201_CREATED
+        elif created_count:
+            status_code = status.HTTP_207_MULTI_STATUS
+        else:
+            status_code = status.HTTP_400_BAD_REQUEST
+
+        return Response(results, status=status_code)
+
+
+class ExpensesBulkApiView(APIView):
+    """
+    API View for changing all expenses matching the list filters at once
+
+    - Update matching expenses (PATCH /bulk/)
+    - Delete matching expenses (DELETE /bulk/)
+
+    Changes are applied with set-based statements in batches of bounded size,
+    at least one filter is required.
+    Requires authentication for all operations.
+    """
+
+    permission_classes: list = [IsAuthenticated]
+
+    def get_required_filters(self, request: Request) -> dict[str, str]:
+        filters = get_filters(request)
+        if not filters:
+            raise ValidationError(
+                f"At least one filter is required: {', '.join(ALLOWED_FILTERS)}"
+            )
+        # the list ignores half of a date range, here it would widen the
+        # change to every expense
+        if bool(filters.get("start_date")) != bool(filters.get("end_date")):
+            raise ValidationError("start_date and end_date must be given together")
+        return filters
+
+    def patch(self, request: Request) -> Response:
+        """
+        Update expenses matching the filters
+
+        Args:
+            request: Request - the HTTP request object with changes including:
+                - description: str - optional new description
+                - add_categories: list - optional category IDs to add
+                - remove_categories: list - optional category IDs to remove
+
+        Query Parameters:
+            Same filters as for the expenses list
+
+        Returns:
+            Response: {"updated": <number of updated expenses>}
+
+        Status Codes:
+            200: Expenses successfully updated
+            400: Invalid input data, or no filter narrowing the expenses
+        """
+        filters = self.get_required_filters(request)
+        serializer = ExpensesBulkUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            raise ValidationError(str(serializer.errors))
+
+        updated = update_expenses_with_filters(
+            request.user, filters, serializer.validated_data
+        )
+        return Response({"updated": updated})
+
+    def delete(self, request: Request) -> Response:
+        """
+        Delete expenses matching the filters
+
+        Args:
+            request: Request - the HTTP request object
+
+        Query Parameters:
+            Same filters as for the expenses list
+
+        Returns:
+            Response: {"deleted": <number of deleted expenses>}
+
+        Status Codes:
+            200: Expenses successfully deleted
+            400: No filter narrowing the expenses
+        """
+        filters = self.get_required_filters(request)
+        deleted = delete_expenses_with_filters(request.user, filters)
+        return Response({"deleted": deleted})
+
+
+EXPORT_CSV_COLUMNS = [
+    "id",
+    "value",
+    "spent_at",
+    "description",
+    "categories",
+    "created_at",
+    "updated_at",
+]
+
+
+class _Echo:
+    """File-like object which returns written values instead of buffering"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def _csv_lines(rows: Iterable[dict]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_CSV_COLUMNS)
+    for row in rows:
+        row["categories"] = ";".join(category["name"] for category in row["categories"])
+        yield writer.writerow([row[column] for column in EXPORT_CSV_COLUMNS])
+
+
+def _ndjson_lines(rows: Iterable[dict]) -> Iterator[str]:
+    encoder = JSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + "\n"
+
+
+class ExpensesExportApiView(APIView):
+    """
+    API View for exporting user expenses
+
+    - Stream filtered expenses as CSV or NDJSON (GET /export/)
+
+    Rows are written to the response as they are fetched from the database,
+    so memory usage does not depend on the number of exported expenses.
+    Requires authentication for all operations.
+    """
+
+    permission_classes: list = [IsAuthenticated]
+
+    export_formats = {
+        "csv": ("text/csv", _csv_lines),
+        "ndjson": ("application/x-ndjson", _ndjson_lines),
+    }
+    chunk_size = 2000
+
+    def get(self, request: Request) -> StreamingHttpResponse:
+        """
+        Export expenses ordered by spent_at
+
+        Args:
+            request: Request - the HTTP request object
+
+        Query Parameters:
+            - file_format: csv (default) or ndjson
+            - same filters as for the expenses list
+
+        Returns:
+            StreamingHttpResponse: Expenses as an attachment, CSV categories
+                are category names separated by ";", NDJSON lines have the
+                same schema as the expenses list items
+
+        Status Codes:
+            200: Export started
+            400: Unknown file_format
+        """
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in self.export_formats:
+            expected = ", ".join(self.export_formats)
+            raise ValidationError(f"Unknown file_format, expected one of: {expected}")
+        content_type, render_lines = self.export_formats[file_format]
+
+        expenses = iterate_expenses_with_filters(
+            request.user, get_filters(request), chunk_size=self.chunk_size
+        )
+        rows = (ExpensesReadSerializer(expense).data for expense in expenses)
+
+        response = StreamingHttpResponse(render_lines(rows), content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="expenses.{file_format}"'
+        )
+        return response
+
+
+class ExpensesImportApiView(APIView):
+    """
+    API View for importing user expenses
+
+    - Import expenses from an uploaded CSV file (POST /import/)
+
+    The file is parsed while it is read and loaded in chunks, see
+    import_expenses_csv for the expected columns.
+    Requires authentication for all operations.
+    """
+
+    permission_classes: list = [IsAuthenticated]
+
+    def post(self, request: Request) -> Response:
+        """
+        Import expenses from the CSV file in the `file` form field
+
+        Args:
+            request: Request - multipart request with the CSV file
+
+        Query Parameters:
+            - atomic: true to import all rows or none of them
+
+        Returns:
+            Response: imported, skipped and created_categories counts and
+                errors of skipped rows
+
+        Status Codes:
+            201: File imported
+            400: No file, invalid header, file not readable as UTF-8 CSV,
+                or invalid row in atomic mode
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError("CSV file is required in the file field")
+
+        atomic = request.query_params.get("atomic", "").lower() in ("1", "true")
+        lines = codecs.iterdecode(upload, "utf-8-sig")
+        result = import_expenses_csv(request.user, lines, atomic=atomic)
+        return Response(result, status=status.HTTP_201_CREATED)
@@ -0,0 +1,66 @@
+from rest_framework import status
+from rest_framework.views import APIView
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from expenses.serializers import CategoriesReadSerializer, ExpensesReadSerializer
+from expenses.services import SyncTokenExpired, get_changes_since
+
+
+class SyncApiView(APIView):
+    """
+    API View for delta synchronization of expenses and categories
+
+    - Changes since the previous sync (GET /sync/?token=...)
+
+    Clients store the returned token and pass it to the next call, the
+    response then only contains rows changed since that call.
+    Requires authentication for all operations.
+    """
+
+    permission_classes: list = [IsAuthenticated]
+
+    def get(self, request: Request) -> Response:
+        """
+        Retrieve changes since the sync token
+
+        Args:
+            request: Request - the HTTP request object
+
+        Query Parameters:
+            - token: token from the previous sync, omit for a full sync
+
+        Returns:
+            Response:
+                - token: pass it to the next sync
+                - expenses: created or updated expenses
+                - categories: created or updated categories
+                - deleted_expenses: IDs of deleted expenses
+                - deleted_categories: IDs of deleted categories, their
+                  links to expenses are gone as well
+
+        Status Codes:
+            200: Successfully retrieved changes
+            400: Invalid token
+            410: Token is too old, sync again without a token
+        """
+        try:
+            changes = get_changes_since(request.user, request.query_params.get("token"))
+        except SyncTokenExpired:
+            return Response(
+                {"exception": "Sync token expired, full sync required"},
+                status=status.HTTP_410_GONE,
+            )
+
+        return Response(
+            {
+                "token": changes["token"],
+                "expenses": ExpensesReadSerializer(changes["expenses"], many=True).data,
+                "categories": CategoriesReadSerializer(
+                    changes["categories"], many=True
+                ).data,
+                "deleted_expenses": changes["deleted_expenses"],
+                "deleted_categories": changes["deleted_categories"],
+            }
+        )
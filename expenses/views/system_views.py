@@ -2,6 +2,8 @@
 
 from django.http import HttpRequest, HttpResponse
 
+from expenses.services.MetricsService import render_metrics
+
 
 def hello_ping(request: HttpRequest) -> HttpResponse:
     """
@@ -33,3 +35,22 @@ def hello_world(request: HttpRequest) -> HttpResponse:
         200: Always returns successful response
     """
     return HttpResponse("<h1>Hello world!</h1>")
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Request, cache and connection pool metrics of the serving process for
+    Prometheus
+
+    Args:
+        request: HttpRequest - the HTTP request object
+
+    Returns:
+        HttpResponse: Metrics in the Prometheus text exposition format
+
+    Status Codes:
+        200: Always returns successful response
+    """
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )